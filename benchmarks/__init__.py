@@ -0,0 +1 @@
+"""Performance benchmarks of example Connexion application package"""
@@ -0,0 +1,70 @@
+"""Common benchmarks utilities"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+import conexample
+import conexample.db.sql.db
+from conexample.db.sql.models import Base, Entry
+
+SEED_BATCH_SIZE = 10000
+
+
+@contextmanager
+def database(uri=None):
+    """Binds application database handlers to the benchmark database and yields its engine.
+
+    If uri is not provided, temporary SQLite database is used. Schema is created before and dropped
+    after the benchmark, so never point it to the database holding any valuable data."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        if uri is None:
+            uri = "sqlite:///" + os.path.join(directory, "benchmark.sqlite")
+            conexample.SETTINGS["DATABASE_SQL_CONNECTION_POOL"] = None
+            conexample.SETTINGS["DATABASE_SQL_POOL_OVERFLOW"] = None
+
+        conexample.SETTINGS["DATABASE_SQL_DATABASE_URI"] = uri
+
+        engine = conexample.db.sql.db.create_engine()
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        conexample.db.sql.db.session_bind(engine)
+
+        try:
+            yield engine
+        finally:
+            Base.metadata.drop_all(engine)
+            engine.dispose()
+
+
+def entry_name(index):
+    """Returns name of the index-th seeded entry."""
+    return "entry%08d" % index
+
+
+def seed_entries(engine, count, start=0):
+    """Inserts count entries into the database."""
+
+    table = Entry.__table__
+
+    for offset in range(start, start + count, SEED_BATCH_SIZE):
+        engine.execute(
+            table.insert(),
+            [
+                {"name": entry_name(index), "rating": index % 11}
+                for index in range(offset, min(offset + SEED_BATCH_SIZE, start + count))
+            ],
+        )
+
+
+def print_table(header, rows):
+    """Prints rows as plain text table."""
+
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [
+        max(len(row[column]) for row in [header] + rows)
+        for column in range(len(header))
+    ]
+
+    for row in [header] + rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,62 @@
+"""Compares per-row cost of listing entries through ORM entities hydration and re-wrapping in every
+layer with the column projection read path passing EntryRecord objects through all the layers.
+
+Usage: python -m benchmarks.entry_projection [--rows 100000] [--repeat 5]"""
+import argparse
+from dataclasses import dataclass
+from timeit import repeat
+
+from conexample.core import ApplicationCore
+from conexample.db.sql import SQLDatabase
+from conexample.db.sql.models import Entry
+
+from .common import database, print_table, seed_entries
+
+
+@dataclass(frozen=True)
+class _LegacyCoreEntry:
+    name: str
+    rating: int
+
+
+def _orm_listing(database_handler):
+    # Listing path preceding the column projection: ORM entities converted to DatabaseEntry, then
+    # to core entries
+    with database_handler.session() as session:
+        entries = [entry.as_database_entry() for entry in session.query(Entry).all()]
+    return [_LegacyCoreEntry(name=entry.name, rating=entry.rating) for entry in entries]
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-uri", help="benchmark database, SQLite by default")
+    args = parser.parse_args()
+
+    with database(args.database_uri) as engine:
+        seed_entries(engine, args.rows)
+
+        database_handler = SQLDatabase()
+        core = ApplicationCore(database_handler)
+
+        paths = (
+            ("ORM entities", lambda: _orm_listing(database_handler)),
+            ("column projection", core.get_entries),
+        )
+
+        results = []
+        for label, func in paths:
+            assert len(func()) == args.rows
+            best = min(repeat(func, number=1, repeat=args.repeat))
+            results.append(
+                (label, "%.1f" % (best * 1000), "%.2f" % (best / args.rows * 1e6))
+            )
+
+    print_table(("path", "listing [ms]", "per row [us]"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Measures throughput and latency of every operation of the REST API specification served through
+the full connexion stack (request validation, API, core and SQL database) of ConnexionExample, with
+the database seeded with 1k, 100k and 1M entries. Requests are sent one by one by the Flask test
+client, so the HTTP server is left out (see benchmarks.serving_concurrency). Results can be saved
+as a baseline and later runs compared against it, the run fails if any operation regressed by more
+than the threshold. A temporary SQLite database is used unless the URI is provided.
+
+Usage: python -m benchmarks.http_operations [--sizes 1000] [--save FILE] [--compare FILE]"""
+import argparse
+import json
+import random
+import time
+from collections import deque
+
+import yaml
+
+import conexample
+from conexample.api.rest.specification import SPEC_PATH
+from conexample.application import ConnexionExample
+from conexample.db.sql.stats import check_rating_counts
+
+from .common import database, entry_name, print_table, seed_entries
+
+OPERATION_PREFIX = "conexample.api."
+METHODS = ("get", "put", "post", "delete", "patch")
+BATCH_SIZE = 10
+
+# Measured values of the results and whether higher values are better
+MEASURES = (("throughput", True), ("p50", False), ("p95", False), ("p99", False))
+
+
+def _operation_ids():
+    """Returns operationIds of the specification, without the conexample.api prefix."""
+
+    with open(SPEC_PATH) as spec_file:
+        specification = yaml.safe_load(spec_file)
+
+    return [
+        operation["operationId"][len(OPERATION_PREFIX) :]
+        for path in specification["paths"].values()
+        for method, operation in path.items()
+        if method in METHODS
+    ]
+
+
+class Requests:
+    """Generators of the requests of the operations, returning (method, path, JSON body).
+
+    Reads and updates address random seeded entries. Created entries get new names and are deleted
+    again by the deletes, so the number of entries stays about the same across the runs."""
+
+    def __init__(self, entries, generator):
+        self.entries = entries
+        self.generator = generator
+        self.created = deque()
+        self.next_index = entries
+
+    def _seeded(self):
+        return entry_name(self.generator.randrange(self.entries))
+
+    def _rating(self):
+        return self.generator.randint(0, 10)
+
+    def entry_get(self):
+        """Returns request of conexample.api.entry.get"""
+        return "GET", "/v1/entry?limit=100", None
+
+    def entry_post(self):
+        """Returns request of conexample.api.entry.post"""
+
+        name = entry_name(self.next_index)
+        self.next_index += 1
+        self.created.append(name)
+        return "POST", "/v1/entry", {"name": name, "rating": self._rating()}
+
+    def entry_batch_post(self):
+        """Returns request of conexample.api.entry.batch.post"""
+
+        return (
+            "POST",
+            "/v1/batch/entry",
+            [
+                {"name": self._seeded(), "rating": self._rating()}
+                for _ in range(BATCH_SIZE)
+            ],
+        )
+
+    def entry_top_get(self):
+        """Returns request of conexample.api.entry.top.get"""
+        return "GET", "/v1/top/entry?n=10", None
+
+    def entry_search_get(self):
+        """Returns request of conexample.api.entry.search.get"""
+        return "GET", "/v1/search/entry?q=%s" % self._seeded()[:10], None
+
+    def stats_get(self):
+        """Returns request of conexample.api.stats.get"""
+        return "GET", "/v1/stats", None
+
+    def entry_element_get(self):
+        """Returns request of conexample.api.entry.element.get"""
+        return "GET", "/v1/entry/%s" % self._seeded(), None
+
+    def entry_element_post(self):
+        """Returns request of conexample.api.entry.element.post"""
+        return "POST", "/v1/entry/%s" % self._seeded(), {"rating": self._rating()}
+
+    def entry_element_delete(self):
+        """Returns request of conexample.api.entry.element.delete"""
+
+        name = self.created.popleft() if self.created else self._seeded()
+        return "DELETE", "/v1/entry/%s" % name, None
+
+    def get(self, operation_id):
+        """Returns generator of the requests of the operation, None if there is none."""
+        return getattr(self, operation_id.replace(".", "_"), None)
+
+
+def _percentile(values, percentile):
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+def _measure(client, requests, count, warmup):
+    """Sends warmup and count requests, returns result of the latter and the number of errors."""
+
+    latencies = []
+    errors = 0
+
+    for index in range(warmup + count):
+        method, path, body = requests()
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        latency = time.perf_counter() - started
+
+        if index < warmup:
+            continue
+        if response.status_code >= 300:
+            errors += 1
+        latencies.append(latency)
+
+    latencies.sort()
+    return (
+        {
+            "throughput": len(latencies) / sum(latencies),
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+        },
+        errors,
+    )
+
+
+def _regressions(result, baseline, threshold):
+    """Returns measures of the result regressed against the baseline by more than the threshold."""
+
+    regressed = []
+
+    for measure, higher_is_better in MEASURES:
+        if measure not in baseline:
+            continue
+        if higher_is_better and result[measure] < baseline[measure] * (1 - threshold):
+            regressed.append(measure)
+        elif not higher_is_better and result[measure] > baseline[measure] * (
+            1 + threshold
+        ):
+            regressed.append(measure)
+
+    return regressed
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--uri", help="database URI, temporary SQLite database by default"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument(
+        "--requests", type=int, default=500, help="measured requests per operation"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="unmeasured requests per operation"
+    )
+    parser.add_argument(
+        "--operations", nargs="+", help="operationIds to run, all by default"
+    )
+    parser.add_argument("--save", metavar="FILE", help="save results as a baseline")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="compare results with a saved baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative change of a result considered a regression",
+    )
+    args = parser.parse_args()
+
+    operation_ids = args.operations or _operation_ids()
+    missing = [
+        operation_id
+        for operation_id in operation_ids
+        if Requests(1, None).get(operation_id) is None
+    ]
+    if missing:
+        raise SystemExit("No requests of the operations: %s" % ", ".join(missing))
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    conexample.SETTINGS["LOGGING_LEVEL"] = "error"
+    saved = {}
+    rows = []
+    regressions = []
+
+    for size in args.sizes:
+        with database(args.uri) as engine:
+            seed_entries(engine, size)
+            check_rating_counts(repair=True)
+
+            application = ConnexionExample()
+            application.prepare()
+            requests = Requests(size, random.Random(0))
+
+            with application.api.app.test_client() as client:
+                for operation_id in operation_ids:
+                    result, errors = _measure(
+                        client, requests.get(operation_id), args.requests, args.warmup
+                    )
+                    saved.setdefault(str(size), {})[operation_id] = result
+
+                    regressed = _regressions(
+                        result,
+                        baseline.get(str(size), {}).get(operation_id, {}),
+                        args.threshold,
+                    )
+                    if regressed:
+                        regressions.append((size, operation_id, regressed))
+
+                    rows.append(
+                        (
+                            size,
+                            operation_id,
+                            "%.0f" % result["throughput"],
+                            "%.2f" % result["p50"],
+                            "%.2f" % result["p95"],
+                            "%.2f" % result["p99"],
+                            errors,
+                        )
+                        + ((", ".join(regressed) or "-",) if args.compare else ())
+                    )
+
+    print_table(
+        ("entries", "operation", "req/s", "p50 [ms]", "p95 [ms]", "p99 [ms]", "errors")
+        + (("regressed",) if args.compare else ()),
+        rows,
+    )
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(saved, baseline_file, indent=2, sort_keys=True)
+
+    if regressions:
+        raise SystemExit(
+            "%d operations regressed by more than %.0f %%"
+            % (len(regressions), args.threshold * 100)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compares encoding time of large GET /entry payloads with connexion's default Flask jsonifier
+and the REST API JSON backends.
+
+Usage: python -m benchmarks.json_encoding [--entries 1000 100000] [--repeat 5]"""
+import argparse
+from functools import partial
+from timeit import repeat
+
+import flask
+from connexion.jsonifier import Jsonifier
+
+from conexample.api.rest.encoding import BACKENDS, get_backend
+from conexample.interface import EntryRecord
+
+from .common import entry_name, print_table
+
+
+def _flask_default(entries):
+    # Serialization path preceding the backends: entries converted to dicts and encoded by the
+    # connexion Flask jsonifier
+    body = [{"name": entry.name, "rating": entry.rating} for entry in entries]
+    return Jsonifier(flask.json, indent=2).dumps(body)
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encoders = [("flask default", _flask_default)]
+    for name in BACKENDS:
+        try:
+            encoders.append((name, get_backend(name).dumps))
+        except ValueError as ex:
+            print("Skipping %s: %s" % (name, ex))
+
+    results = []
+    with flask.Flask(__name__).app_context():
+        for count in args.entries:
+            entries = [
+                EntryRecord(entry_name(index), index % 11) for index in range(count)
+            ]
+
+            baseline = None
+            for label, encode in encoders:
+                best = min(
+                    repeat(partial(encode, entries), number=1, repeat=args.repeat)
+                )
+                baseline = baseline or best
+                results.append(
+                    (count, label, "%.2f" % (best * 1000), "%.1fx" % (baseline / best),)
+                )
+
+    print_table(("entries", "encoder", "encode [ms]", "speedup"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Measures build time and memory of the trigram index of entry names and latency of prefix and typo
+queries served by it.
+
+Usage: python -m benchmarks.name_search [--entries 1000000] [--queries 1000] [--memory]"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from conexample.search import TrigramIndex
+
+from .common import print_table
+
+SYLLABLES = [
+    consonant + vowel for consonant in "bcdfghklmnprstvz" for vowel in "aeiou"
+] + ["-", "_"]
+
+
+def _names(count, generator):
+    names = set()
+
+    while len(names) < count:
+        names.add(
+            "".join(generator.choice(SYLLABLES) for _ in range(generator.randint(3, 6)))
+        )
+
+    return sorted(names)
+
+
+def _typo(name, generator):
+    position = generator.randrange(len(name))
+    return (
+        name[:position]
+        + generator.choice("abcdefghijklmnopqrstuvwxyz")
+        + name[position + 1 :]
+    )
+
+
+def _measure(index, queries, limit):
+    latencies = []
+
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return (
+        "%.3f" % (latencies[len(latencies) // 2] * 1000),
+        "%.3f"
+        % (latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000),
+    )
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="trace memory of the index, slows the build down several times",
+    )
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    names = _names(args.entries, generator)
+    samples = [generator.choice(names) for _ in range(args.queries)]
+
+    if args.memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    index = TrigramIndex(names)
+    build = time.perf_counter() - started
+
+    if args.memory:
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print("index memory: %.1f MiB" % (memory / 2 ** 20))
+
+    print("build time: %.2f s (%d names)" % (build, len(index)))
+
+    print_table(
+        ("query", "p50 [ms]", "p99 [ms]"),
+        [
+            ("prefix (3 characters)",)
+            + _measure(index, [name[:3] for name in samples], args.limit),
+            ("prefix (6 characters)",)
+            + _measure(index, [name[:6] for name in samples], args.limit),
+            ("typo",)
+            + _measure(index, [_typo(name, generator) for name in samples], args.limit),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measures per call overhead of the operation metrics recorded by the request_context decorators of
+the API and core layers and by the database sessions.
+
+Usage: python -m benchmarks.operation_metrics [--calls 200000] [--repeat 5]"""
+import argparse
+import timeit
+
+from conexample import metrics
+from conexample.api.rest import request_context as api_request_context
+from conexample.core import request_context as core_request_context
+
+from .common import print_table
+
+
+def _call():
+    return None
+
+
+class Api:  # pylint: disable=too-few-public-methods
+    """Stand-in of the API class, handler operationIds are derived from"""
+
+    class entry:  # pylint: disable=invalid-name,too-few-public-methods
+        """Container for conexample.api.entry.* routes"""
+
+        @staticmethod
+        @api_request_context
+        def get():
+            """Implements conexample.api.entry.get"""
+            return None
+
+
+def _measure(func, calls, repeat):
+    """Returns the best time (in nanoseconds) of a call of the function"""
+
+    return min(timeit.repeat(func, number=calls, repeat=repeat)) / calls * 1e9
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not metrics.ENABLED:
+        raise SystemExit("prometheus_client is not installed")
+
+    histogram = metrics.OPERATION_DURATION
+
+    modes = [
+        ("undecorated call", _call),
+        ("core request_context", core_request_context(_call)),
+        ("API request_context", Api.entry.get),
+        ("observe_operation()", lambda: metrics.observe_operation("core", 0.001)),
+        (
+            "Histogram.labels().observe()",
+            lambda: histogram.labels("benchmark", "core").observe(0.001),
+        ),
+    ]
+
+    baseline = None
+    results = []
+
+    for name, func in modes:
+        cost = _measure(func, args.calls, args.repeat)
+        baseline = cost if baseline is None else baseline
+        results.append((name, "%.0f" % cost, "%.0f" % (cost - baseline)))
+
+    print_table(("mode", "per call [ns]", "overhead [ns]"), results)
+
+
+if __name__ == "__main__":
+    main()
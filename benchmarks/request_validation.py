@@ -0,0 +1,81 @@
+"""Compares per-request cost of request body validation with connexion's interpreted jsonschema
+validator and the validators compiled at startup.
+
+Usage: python -m benchmarks.request_validation [--number 100] [--repeat 5]"""
+import argparse
+import os
+from functools import partial
+from timeit import repeat
+
+from connexion.decorators.validation import RequestBodyValidator
+from connexion.spec import Specification
+
+import conexample.api.rest
+from conexample.api.rest.validation import CompiledRequestBodyValidator
+
+from .common import entry_name, print_table
+
+SPEC_PATH = os.path.join(os.path.dirname(conexample.api.rest.__file__), "api.yml")
+
+
+def _body_schema(spec, path):
+    return spec["paths"][path]["post"]["requestBody"]["content"]["application/json"][
+        "schema"
+    ]
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    spec = Specification.load(SPEC_PATH)
+
+    cases = (
+        ("POST /entry", "/entry", {"name": entry_name(0), "rating": 5}),
+        (
+            "POST /batch/entry (100 entries)",
+            "/batch/entry",
+            [{"name": entry_name(index), "rating": 5} for index in range(100)],
+        ),
+        (
+            "POST /batch/entry (1000 entries)",
+            "/batch/entry",
+            [{"name": entry_name(index), "rating": 5} for index in range(1000)],
+        ),
+    )
+
+    results = []
+    for label, path, body in cases:
+        timings = []
+
+        for validator_class in (RequestBodyValidator, CompiledRequestBodyValidator):
+            validator = validator_class(
+                _body_schema(spec, path), ["application/json"], None
+            )
+            best = min(
+                repeat(
+                    partial(validator.validate_schema, body, path),
+                    number=args.number,
+                    repeat=args.repeat,
+                )
+            )
+            timings.append(best / args.number * 1e6)
+
+        results.append(
+            (
+                label,
+                "%.1f" % timings[0],
+                "%.1f" % timings[1],
+                "%.1fx" % (timings[0] / timings[1]),
+            )
+        )
+
+    print_table(("body", "interpreted [us]", "compiled [us]", "speedup"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Measures throughput and latency of GET /v1/entry/{name} at high concurrency served by the WSGI
+entrypoint with uWSGI configured by uwsgi.yml and by the ASGI entrypoint with uvicorn, both with the
+same number of worker processes and a temporary SQLite database. Requests are sent by keep-alive
+connections of an asyncio load generator running in this process. If uWSGI is not installed,
+gunicorn sync workers serve the WSGI entrypoint instead.
+
+Usage: python -m benchmarks.serving_concurrency [--workers 2] [--concurrency 256] [--duration 10]"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from .common import database, entry_name, print_table, seed_entries
+
+UWSGI_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uwsgi.yml")
+
+
+def _servers(workers, port):
+    """Returns (label, command, environment) of the compared servers."""
+
+    if shutil.which("uwsgi"):
+        wsgi = (
+            "WSGI (uWSGI)",
+            ["uwsgi", "--yaml", UWSGI_CONFIG, "--disable-logging"],
+            {
+                "UWSGI_BIND": "127.0.0.1:%d" % port,
+                "UWSGI_PROCESSES": str(workers),
+                "UWSGI_PROTOCOL": "http",
+            },
+        )
+    else:
+        wsgi = (
+            "WSGI (gunicorn sync)",
+            [sys.executable, "-m", "gunicorn", "--workers", str(workers)]
+            + ["--bind", "127.0.0.1:%d" % port, "--log-level", "warning"]
+            + ["conexample.wsgi.api.rest:app"],
+            {},
+        )
+
+    asgi = (
+        "ASGI (uvicorn)",
+        [sys.executable, "-m", "uvicorn", "--workers", str(workers)]
+        + ["--port", str(port), "--log-level", "warning", "--no-access-log"]
+        + ["conexample.asgi.api.rest:app"],
+        {},
+    )
+
+    return [wsgi, asgi]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited with %d" % process.returncode)
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start in %.0f seconds" % timeout)
+
+
+async def _response(reader):
+    """Reads one response and returns its status and whether the server closes the connection."""
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(
+        (name.strip().lower(), value.strip().lower())
+        for name, _, value in (line.partition(":") for line in lines[1:] if line)
+    )
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return int(lines[0].split()[1]), headers.get("connection") == "close"
+
+
+async def _client(port, entries, deadline, latencies, errors):
+    writer = None
+    while time.monotonic() < deadline:
+        name = entry_name(random.randrange(entries))
+        started = time.perf_counter()
+        reused = writer is not None
+        try:
+            # Sync workers do not keep connections alive, those are opened again per request
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                b"GET /v1/entry/%s HTTP/1.1\r\nHost: localhost\r\n\r\n" % name.encode()
+            )
+            status, close = await _response(reader)
+        except (OSError, asyncio.IncompleteReadError) as ex:
+            if reused and not getattr(ex, "partial", b""):
+                # Connection closed after the previous response without notice, as uWSGI does
+                writer.close()
+                writer = None
+                continue
+            status, close = None, True
+
+        if status == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(status)
+
+        if close and writer is not None:
+            writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def _load(port, entries, concurrency, duration):
+    latencies = []
+    errors = []
+    started = time.monotonic()
+    await asyncio.gather(
+        *(
+            _client(port, entries, started + duration, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    return latencies, errors, time.monotonic() - started
+
+
+def _percentile(values, percentile):
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--entries", type=int, default=10000)
+    args = parser.parse_args()
+
+    results = []
+
+    with database() as engine:
+        seed_entries(engine, args.entries)
+
+        env = dict(
+            os.environ,
+            DATABASE_SQL_DATABASE_URI=str(engine.url),
+            DATABASE_SQL_CONNECTION_POOL="",
+            DATABASE_SQL_POOL_OVERFLOW="",
+            LOGGING_LEVEL="error",
+        )
+
+        for index in range(2):
+            port = _free_port()
+            label, command, server_env = _servers(args.workers, port)[index]
+            process = subprocess.Popen(
+                command, env=dict(env, **server_env), stderr=subprocess.DEVNULL
+            )
+            try:
+                _wait(port, process)
+                latencies, errors, elapsed = asyncio.run(
+                    _load(port, args.entries, args.concurrency, args.duration)
+                )
+            finally:
+                process.terminate()
+                process.wait()
+
+            latencies.sort()
+            results.append(
+                (
+                    label,
+                    args.workers,
+                    args.concurrency,
+                    "%.0f" % (len(latencies) / elapsed),
+                    "%.1f" % (_percentile(latencies, 50) * 1000),
+                    "%.1f" % (_percentile(latencies, 99) * 1000),
+                    len(errors),
+                )
+            )
+
+    print_table(
+        (
+            "server",
+            "workers",
+            "concurrency",
+            "req/s",
+            "p50 [ms]",
+            "p99 [ms]",
+            "errors",
+        ),
+        results,
+    )
+
+
+if __name__ == "__main__":
+    main()
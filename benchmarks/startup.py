@@ -0,0 +1,102 @@
+"""Reports worker startup time split into the application import and ConnexionExample.prepare(),
+with and without the specification cache. The REST API specification loading done by prepare() is
+reported separately: the YAML file parsed and validated without the cache, the cached document
+validated with it. Every measurement runs in a fresh interpreter.
+
+Usage: python -m benchmarks.startup [--repeat 5]"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from statistics import median
+from time import perf_counter
+
+from .common import print_table
+
+PHASES = ("import", "prepare()", "total", "spec loading (in prepare())")
+
+
+def _child():
+    start = perf_counter()
+    # pylint: disable=import-outside-toplevel
+    from connexion.spec import Specification
+
+    from conexample.api.rest.specification import SPEC_PATH, SpecificationCache
+    from conexample.application import ConnexionExample
+
+    imported = perf_counter()
+
+    application = ConnexionExample()
+    prepare_start = perf_counter()
+    application.prepare()
+    prepared = perf_counter()
+
+    # Same loading as done by prepare(), measured on its own
+    specification = SpecificationCache().load()
+    load_start = perf_counter()
+    Specification.load(specification or SPEC_PATH)
+    loaded = perf_counter()
+
+    json.dump(
+        [
+            imported - start,
+            prepared - prepare_start,
+            imported - start + prepared - prepare_start,
+            loaded - load_start,
+        ],
+        sys.stdout,
+    )
+
+
+def _measure(cache_dir, repeat):
+    env = dict(
+        os.environ,
+        API_REST_SPEC_CACHE_DIR=cache_dir,
+        DATABASE_SQL_DATABASE_URI="sqlite://",
+        LOGGING_LEVEL="error",
+    )
+
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child"],
+            env=env,
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output))
+
+    return [median(timings) for timings in zip(*runs)]
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child()
+        return
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        uncached = _measure("", args.repeat)
+        # First run stores the specification in the cache
+        _measure(cache_dir, 1)
+        cached = _measure(cache_dir, args.repeat)
+
+    print_table(
+        ("phase", "uncached [ms]", "cached [ms]"),
+        [
+            (phase, "%.1f" % (before * 1000), "%.1f" % (after * 1000))
+            for phase, before, after in zip(PHASES, uncached, cached)
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
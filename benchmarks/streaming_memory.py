@@ -0,0 +1,69 @@
+"""Compares peak memory allocated while serving the whole entries table with the streaming mode of
+GET /v1/entry against building the complete listing in memory.
+
+Usage: python -m benchmarks.streaming_memory [--rows 10000 100000 ...]"""
+import argparse
+import json
+import tracemalloc
+
+from conexample.api.rest import RestApi
+from conexample.core import ApplicationCore
+from conexample.db.sql import SQLDatabase
+
+from .common import database, print_table, seed_entries
+
+
+def _peak_allocation(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _materialized(core):
+    # Equivalent of the listing served in a single, prebuilt response
+    json.dumps(
+        [{"name": entry.name, "rating": entry.rating} for entry in core.get_entries()]
+    )
+
+
+def _streamed(client):
+    response = client.get("/v1/entry?stream=true", buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    assert size
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--database-uri", help="benchmark database, SQLite by default")
+    args = parser.parse_args()
+
+    results = []
+
+    for rows in args.rows:
+        with database(args.database_uri) as engine:
+            seed_entries(engine, rows)
+
+            core = ApplicationCore(SQLDatabase())
+            client = RestApi(core).app.test_client()
+
+            materialized = _peak_allocation(lambda: _materialized(core))
+            streamed = _peak_allocation(lambda: _streamed(client))
+
+            results.append(
+                (rows, "%.1f" % (materialized / 2 ** 20), "%.1f" % (streamed / 2 ** 20))
+            )
+
+    print_table(("rows", "materialized peak [MiB]", "streamed peak [MiB]"), results)
+
+
+if __name__ == "__main__":
+    main()
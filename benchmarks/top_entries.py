@@ -0,0 +1,89 @@
+"""Measures latency of top rated entries listing served by the index ordered query, by the same
+query without the (rating DESC, name) index and by sorting all the entries in Python.
+
+Usage: python -m benchmarks.top_entries [--entries 1000000] [--sizes 10 100 1000] [--repeat 200]"""
+import argparse
+import time
+
+from conexample.db.sql import SQLDatabase
+from conexample.db.sql.models import Entry
+
+from .common import database, print_table, seed_entries
+
+
+def _sorted_entries(sql, limit):
+    return sorted(sql.get_entries(), key=lambda entry: (-entry.rating, entry.name))[
+        :limit
+    ]
+
+
+def _measure(func, limit, repeat):
+    latencies = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(limit)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return (
+        "%.3f" % (latencies[len(latencies) // 2] * 1000),
+        "%.3f"
+        % (latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000),
+    )
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--uri", help="database URI, temporary SQLite database by default"
+    )
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument(
+        "--slow-repeat",
+        type=int,
+        default=3,
+        help="repetitions of the modes reading the whole table",
+    )
+    args = parser.parse_args()
+
+    results = []
+
+    with database(args.uri) as engine:
+        seed_entries(engine, args.entries)
+        sql = SQLDatabase()
+
+        for size in args.sizes:
+            results.append(
+                ("indexed query", size)
+                + _measure(sql.get_top_entries, size, args.repeat)
+            )
+
+        index = next(
+            index
+            for index in Entry.__table__.indexes
+            if index.name == "ix_entries_rating_name"
+        )
+        index.drop(engine)
+
+        for size in args.sizes:
+            results.append(
+                ("unindexed query", size)
+                + _measure(sql.get_top_entries, size, args.slow_repeat)
+            )
+            results.append(
+                ("get_entries() sorted", size)
+                + _measure(
+                    lambda limit: _sorted_entries(sql, limit), size, args.slow_repeat
+                )
+            )
+
+    print_table(("mode", "n", "p50 [ms]", "p99 [ms]"), results)
+
+
+if __name__ == "__main__":
+    main()
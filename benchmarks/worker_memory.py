@@ -0,0 +1,153 @@
+"""Measures per worker unique memory (USS) of N forked workers with the application loaded lazily
+in every worker, preloaded in the master and preloaded with gc.freeze, like the uWSGI WSGI
+entrypoint does. Every worker serves a few requests and runs a full garbage collection before it
+is measured. Linux only.
+
+Workers of a running uWSGI master can be measured with --pid.
+
+Usage: python -m benchmarks.worker_memory [--workers 4] [--requests 200] [--pid MASTER_PID]"""
+import argparse
+import gc
+import json
+import os
+import signal
+import subprocess
+import sys
+
+MODES = ("lazy", "preload", "preload + gc.freeze")
+
+
+def _memory(pid):
+    """Returns (USS, PSS) of the process in KiB."""
+
+    values = {}
+    with open("/proc/%d/smaps_rollup" % pid) as rollup:
+        for line in rollup.readlines()[1:]:
+            key, value = line.split(":")
+            values[key] = int(value.split()[0])
+
+    return values["Private_Clean"] + values["Private_Dirty"], values["Pss"]
+
+
+def _children(pid):
+    with open("/proc/%d/task/%d/children" % (pid, pid)) as children:
+        return [int(child) for child in children.read().split()]
+
+
+def _load():
+    # pylint: disable=import-outside-toplevel
+    from conexample.application import ConnexionExample
+
+    application = ConnexionExample()
+    application.prepare()
+    return application
+
+
+def _serve(application, requests):
+    with application.api.app.test_client() as client:
+        for index in range(requests):
+            client.get("/v1/entry?limit=100")
+            client.get("/v1/entry/entry%08d" % index)
+    gc.collect()
+
+
+def _master(mode, workers, requests):
+    """Forks the workers, measures them once all of them are ready and prints the results."""
+
+    application = None
+    if mode != "lazy":
+        application = _load()
+        if mode == "preload + gc.freeze":
+            gc.freeze()
+
+    ready_read, ready_write = os.pipe()
+    pids = []
+
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            if application is None:
+                application = _load()
+            else:
+                application.post_fork()
+            _serve(application, requests)
+            os.write(ready_write, b".")
+            signal.pause()
+        pids.append(pid)
+
+    os.close(ready_write)
+    for _ in range(workers):
+        os.read(ready_read, 1)
+
+    json.dump([_memory(pid) for pid in pids], sys.stdout)
+
+    for pid in pids:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def _summary(label, memory):
+    uss = [value[0] for value in memory]
+    pss = [value[1] for value in memory]
+    return (
+        label,
+        len(memory),
+        "%.1f" % (sum(uss) / len(uss) / 1024),
+        "%.1f" % (sum(pss) / len(pss) / 1024),
+        "%.1f" % (sum(uss) / 1024),
+    )
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pid", type=int, help="uWSGI master process to measure")
+    parser.add_argument("--master", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.master:
+        _master(args.master, args.workers, args.requests)
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from .common import database, print_table, seed_entries
+
+    header = ("mode", "workers", "USS [MiB]", "PSS [MiB]", "total USS [MiB]")
+
+    if args.pid:
+        memory = [_memory(pid) for pid in _children(args.pid)]
+        print_table(header, [_summary("uWSGI", memory)])
+        return
+
+    with database() as engine:
+        seed_entries(engine, args.requests)
+
+        env = dict(
+            os.environ,
+            DATABASE_SQL_DATABASE_URI=str(engine.url),
+            DATABASE_SQL_CONNECTION_POOL="",
+            DATABASE_SQL_POOL_OVERFLOW="",
+            LOGGING_LEVEL="error",
+        )
+
+        results = []
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.worker_memory"]
+                + ["--master", mode, "--workers", str(args.workers)]
+                + ["--requests", str(args.requests)],
+                env=env,
+                stdout=subprocess.PIPE,
+                check=True,
+            ).stdout
+            results.append(_summary(mode, json.loads(output)))
+
+    print_table(header, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measures throughput and latency of concurrent single entry writes committed one by one and
+committed together by the write batching database handler with batch sizes from 1 to 256.
+
+Writes committed one by one are also measured without the entries version update, which
+serializes concurrent writers on the single version row.
+
+Usage: python -m benchmarks.write_batching [--threads 256] [--writes 5000] [--sizes 1 4 16 ...]"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from conexample.db.batch import BatchingDatabase
+from conexample.db.sql import SQLDatabase
+from conexample.interface import DatabaseException
+
+from .common import database, entry_name, print_table, seed_entries
+
+
+def _write(handler, index, entries):
+    started = time.perf_counter()
+    try:
+        handler.set_entry_rating(entry_name(index % entries), index % 11)
+    except DatabaseException:
+        return None
+    return time.perf_counter() - started
+
+
+def _run(handler, threads, writes, entries):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(
+            executor.map(lambda index: _write(handler, index, entries), range(writes))
+        )
+    elapsed = time.perf_counter() - started
+
+    errors = latencies.count(None)
+    latencies = sorted(latency for latency in latencies if latency is not None)
+    return (
+        "%.0f" % (len(latencies) / elapsed),
+        "%.1f" % (latencies[len(latencies) // 2] * 1000),
+        "%.1f"
+        % (latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000),
+        errors,
+    )
+
+
+def main():
+    """Runs the benchmark"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--uri", help="database URI, temporary SQLite database by default"
+    )
+    parser.add_argument("--threads", type=int, default=256)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    results = []
+
+    with database(args.uri) as engine:
+        seed_entries(engine, args.entries)
+        sql = SQLDatabase()
+
+        results.append(
+            ("unbatched", "-")
+            + _run(sql, args.threads, args.writes, args.entries)
+            + ("%.2f" % 1,)
+        )
+
+        with patch.object(SQLDatabase, "_bump_entries_version"):
+            results.append(
+                ("unbatched, no version", "-")
+                + _run(sql, args.threads, args.writes, args.entries)
+                + ("%.2f" % 1,)
+            )
+
+        for size in args.sizes:
+            batching = BatchingDatabase(sql, size=size, delay=args.delay)
+            row = _run(batching, args.threads, args.writes, args.entries)
+            stats = batching.stats
+            results.append(
+                ("batched", size)
+                + row
+                + ("%.2f" % (stats.writes / (stats.batches or 1)),)
+            )
+
+    print_table(
+        ("mode", "size", "writes/s", "p50 [ms]", "p99 [ms]", "errors", "avg batch"),
+        results,
+    )
+
+
+if __name__ == "__main__":
+    main()
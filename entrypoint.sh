@@ -5,6 +5,11 @@ set -e
 case $1 in
     conexample)
         alembic -c /migrations/alembic.ini upgrade head
+        # Metrics files of the previous run would be aggregated with the metrics of new workers
+        if [ -n "$METRICS_MULTIPROC_DIR" ]; then
+            rm -rf "$METRICS_MULTIPROC_DIR"
+            mkdir -p "$METRICS_MULTIPROC_DIR"
+        fi
         exec uwsgi --yaml uwsgi.yml
         exit $?
         ;;
@@ -0,0 +1,29 @@
+"""Entries table version
+
+Revision ID: 3b8e4c1d2a6f
+Revises: f2f1e5825262
+Create Date: 2026-10-18 10:02:11.402913+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b8e4c1d2a6f"
+down_revision = "f2f1e5825262"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_versions = op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("table_name"),
+    )
+    op.bulk_insert(table_versions, [{"table_name": "entries", "version": 1}])
+
+
+def downgrade():
+    op.drop_table("table_versions")
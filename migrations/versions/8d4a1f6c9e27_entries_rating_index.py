@@ -0,0 +1,25 @@
+"""Entries rating index
+
+Revision ID: 8d4a1f6c9e27
+Revises: 3b8e4c1d2a6f
+Create Date: 2026-10-18 14:21:37.118406+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d4a1f6c9e27"
+down_revision = "3b8e4c1d2a6f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_entries_rating_name", "entries", [sa.text("rating DESC"), "name"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_entries_rating_name", table_name="entries")
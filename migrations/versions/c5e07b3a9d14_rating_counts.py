@@ -0,0 +1,34 @@
+"""Rating counts
+
+Revision ID: c5e07b3a9d14
+Revises: 8d4a1f6c9e27
+Create Date: 2026-10-18 15:03:52.640271+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5e07b3a9d14"
+down_revision = "8d4a1f6c9e27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "rating_counts",
+        sa.Column("rating", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("rating"),
+    )
+    # Entries are locked, so the counts match the entries when the migration commits
+    op.execute("LOCK TABLE entries IN SHARE MODE")
+    op.execute(
+        "INSERT INTO rating_counts (rating, count) "
+        "SELECT rating, count(*) FROM entries GROUP BY rating"
+    )
+
+
+def downgrade():
+    op.drop_table("rating_counts")
@@ -45,9 +45,15 @@ setup(
     package_dir={"": "src"},
     package_data={"conexample": ["*.env"], "conexample.api.rest": ["*.yml"],},
     install_requires=requirements,
-    extras_require={"dev": requirements_dev},
+    extras_require={
+        "asgi": ["uvicorn"],
+        "dev": requirements_dev,
+        "fast": ["fastjsonschema", "orjson"],
+        "metrics": ["prometheus_client"],
+    },
     entry_points="""
         [console_scripts]
         conexample-dev=conexample.entrypoint:run_dev
+        conexample-load=conexample.load:main
     """,
 )
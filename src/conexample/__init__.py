@@ -1,17 +1,30 @@
 """Example Connexion application package"""
-import sys
 from collections import defaultdict
 from os import environ, path
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv
 
 from .version import __version__
 
-if "CONEXAMPLE_CONFIG" in environ and path.isfile(environ["CONEXAMPLE_CONFIG"]):
-    load_dotenv(dotenv_path=environ["CONEXAMPLE_CONFIG"])
-else:
-    load_dotenv()
 
-load_dotenv(path.join(__path__[0], "defaults.env"))
+def _load_settings():
+    """Completes the environment with the variables of the configuration file (CONEXAMPLE_CONFIG,
+    or .env found by python-dotenv) and then of defaults.env, in a single pass. Variables already
+    set take precedence. Returns the settings."""
 
-SETTINGS = defaultdict(lambda: None, environ)
+    if "CONEXAMPLE_CONFIG" in environ and path.isfile(environ["CONEXAMPLE_CONFIG"]):
+        config = environ["CONEXAMPLE_CONFIG"]
+    else:
+        config = find_dotenv()
+
+    for dotenv_path in (config, path.join(__path__[0], "defaults.env")):
+        if not dotenv_path:
+            continue
+        for name, value in dotenv_values(dotenv_path).items():
+            if value is not None:
+                environ.setdefault(name, value)
+
+    return defaultdict(lambda: None, environ)
+
+
+SETTINGS = _load_settings()
@@ -1,18 +1,46 @@
 """Flask & Connexion base REST API implementation"""
+import hashlib
 import logging
-import os
+import math
+from base64 import b64decode, urlsafe_b64encode
 from functools import partial, wraps
+from itertools import chain
+from time import perf_counter, time
+from urllib.parse import urlencode
 
 import connexion
 import connexion.utils
+from connexion.apis.flask_api import FlaskApi
 from connexion.resolver import Resolver
+from flask import Response, request
 from werkzeug.exceptions import BadRequest, InternalServerError, NotFound
-
-from ...interface import Api, CoreEntryNotFound, CoreException, CoreInvalidRequest
+from werkzeug.http import dump_cookie, quote_etag
+
+from ... import SETTINGS, metrics
+from ...interface import (
+    READ_ROUTING,
+    Api,
+    CoreEntry,
+    CoreEntryNotFound,
+    CoreException,
+    CoreInvalidRequest,
+    ReadRouting,
+)
+from .cache import ResponseCache
+from .encoding import BackendJSONDecoder, BackendJsonifier, StdlibJSON, get_backend
+from .specification import SPEC_PATH, SpecificationCache
+from .validation import get_validator_map
 
 LOGGER = logging.getLogger("api.rest")
 OPERATION_ID_PREFIX = "conexample.api"
 
+# Number of entries serialized into a single chunk of streamed response
+STREAM_CHUNK_SIZE = 1000
+
+# Cookie holding time of the last write of the client, set by the responses to write requests
+WRITE_COOKIE = "conexample-write"
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+
 
 def _make_response(status, details, title, headers=None):
     return (
@@ -22,16 +50,241 @@ def _make_response(status, details, title, headers=None):
     )
 
 
+def _make_write_result(result):
+    item = {"name": result.name, "status": result.status.value}
+    if result.details is not None:
+        item["details"] = result.details
+    return item
+
+
+def _encode_cursor(name):
+    return urlsafe_b64encode(name.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        # Unlike urlsafe_b64decode, characters out of the alphabet are not silently discarded
+        name = b64decode(
+            cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True
+        ).decode()
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+
+    if not name:
+        raise BadRequest("Invalid cursor")
+
+    return name
+
+
+def _entries_etag(version):
+    return "entries-%d" % version
+
+
+def _entry_etag(entry):
+    return hashlib.sha1(
+        ("%s\0%d\0%s" % (entry.name, entry.rating, entry.modified.isoformat())).encode()
+    ).hexdigest()
+
+
+class _EntriesStream:
+    """Encoder of entries into JSON array chunks of STREAM_CHUNK_SIZE entries."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.opening = b"["
+        self.chunk = []
+
+    def _serialize(self):
+        # Strip brackets of the encoded chunk array
+        data = self.opening + self.backend.dumps(self.chunk)[1:-1]
+        self.opening = b","
+        self.chunk = []
+        return data
+
+    def push(self, entry):
+        """Adds the entry. Returns encoded chunk, if it is complete, otherwise None."""
+
+        self.chunk.append(entry)
+        return self._serialize() if len(self.chunk) == STREAM_CHUNK_SIZE else None
+
+    def close(self):
+        """Returns encoded rest of the entries closing the array."""
+
+        return (self._serialize() if self.chunk else b"") + b"]"
+
+
+def _stream_entries(backend, first, entries):
+    """Yields JSON array of the entries in chunks of STREAM_CHUNK_SIZE entries."""
+
+    stream = _EntriesStream(backend)
+
+    for entry in chain((first,), entries):
+        data = stream.push(entry)
+        if data is not None:
+            yield data
+
+    yield stream.close()
+
+
+def _read_your_writes_window():
+    """Returns time (in seconds) after a write of a client for which its reads are served by the
+    primary database, 0 if reads are never served by read replicas."""
+
+    if not SETTINGS["DATABASE_SQL_REPLICA_URIS"]:
+        return 0
+    return float(SETTINGS["DATABASE_SQL_READ_YOUR_WRITES"] or 0)
+
+
+def _read_routing(cookies, window):
+    """Returns read routing of the request with the cookies. Reads of the client which wrote less
+    than window seconds ago are served by the primary database."""
+
+    try:
+        last_write = float(cookies.get(WRITE_COOKIE, ""))
+    except ValueError:
+        return ReadRouting()
+
+    return ReadRouting(primary=time() - last_write < window)
+
+
+def _write_cookie(window):
+    """Returns Set-Cookie header value recording the write of the client for window seconds."""
+
+    return dump_cookie(
+        WRITE_COOKIE,
+        "%.3f" % time(),
+        max_age=math.ceil(window),
+        path="/",
+        httponly=True,
+    )
+
+
+def _server_timing(queries):
+    """Returns Server-Timing header value reporting the database queries of the request."""
+    return 'db;desc="%d queries";dur=%.3f' % (queries.count, queries.duration * 1000)
+
+
+def _readiness(ready):
+    """Returns (body, status) of the readiness report. Not ready service responds with 503, so
+    it is left out of the load balancing until ready."""
+    return {"ready": ready}, 200 if ready else 503
+
+
+def _http_exception(ex):
+    """Returns HTTP exception reporting the core exception."""
+
+    if isinstance(ex, CoreEntryNotFound):
+        return NotFound("Entry not found")
+
+    if isinstance(ex, CoreInvalidRequest):
+        return BadRequest(str(ex))
+
+    LOGGER.error("Internal error: %s", ex)
+    return InternalServerError(str(ex))
+
+
+def _conditional(etag, if_none_match):
+    """Returns headers of the response representing the entity tagged with etag, and whether the
+    request precondition makes the response not modified."""
+
+    return {"ETag": quote_etag(etag)}, if_none_match.contains_weak(etag)
+
+
+def _entries_page(backend, entries, limit):
+    """Returns (payload, next page cursor) of the entries page. Entries are fetched with one more
+    entry than limit, to find out whether there is a next page."""
+
+    body = entries[:limit]
+    next_cursor = _encode_cursor(body[-1].name) if len(entries) > limit else None
+    return backend.dumps(body), next_cursor
+
+
+def _top_entries_page(backend, entries):
+    """Returns (payload, None) of the top rated entries, in the entries page form."""
+
+    return backend.dumps(list(entries)), None
+
+
+def _stats_page(backend, stats):
+    """Returns (payload, None) of the rating statistics, in the entries page form."""
+
+    return (
+        backend.dumps(
+            {
+                "count": stats.count,
+                "sum": stats.sum,
+                "mean": stats.mean,
+                "min": stats.min,
+                "max": stats.max,
+                "histogram": [
+                    {"rating": rating, "count": count}
+                    for rating, count in stats.histogram.items()
+                ],
+            }
+        ),
+        None,
+    )
+
+
+def _link_next_page(headers, base_url, limit, next_cursor):
+    """Adds link to the next entries page to the headers, if there is one."""
+
+    if next_cursor is not None:
+        next_page = "%s?%s" % (
+            base_url,
+            urlencode({"limit": limit, "cursor": next_cursor}),
+        )
+        headers["Link"] = '<%s>; rel="next"' % next_page
+
+
+def _write_response(created, location):
+    if created:
+        return _make_response(201, "Entry created", "Created", {"Location": location})
+
+    return _make_response(200, "Entry updated", "OK", {"Location": location})
+
+
+def _entry_body(entry):
+    return {"name": entry.name, "rating": entry.rating}
+
+
+class _FlaskApi(FlaskApi):
+    """Connexion Flask API serializing responses with the json_backend"""
+
+    json_backend = StdlibJSON()
+
+    @classmethod
+    def _set_jsonifier(cls):
+        cls.jsonifier = BackendJsonifier(cls.json_backend)
+
+
+def _operation_id(func):
+    """Returns operationId of the handler, a function of the API class container classes."""
+    return "%s.%s" % (OPERATION_ID_PREFIX, func.__qualname__.split(".", 1)[1])
+
+
 def request_context(func):
-    """Decorator handling common request errands"""
+    """Decorator handling common request errands. The handler call is timed and its errors counted
+    in the API layer metrics of the operation, the metrics of the layers below included."""
+
+    operation = _operation_id(func)
 
     @wraps(func)
     def wrapper(*args, **kwargs):
+        token = metrics.OPERATION.set(operation)
+        started = perf_counter()
+        error = None
         try:
             return func(*args, **kwargs)
         except CoreException as ex:
-            LOGGER.error("Internal error: %s", ex)
-            raise InternalServerError(str(ex))
+            error = _http_exception(ex)
+            raise error
+        except Exception as ex:
+            error = ex
+            raise
+        finally:
+            metrics.observe_operation("api", perf_counter() - started, error)
+            metrics.OPERATION.reset(token)
 
     return wrapper
 
@@ -44,32 +297,114 @@ class RestApi(Api, connexion.FlaskApp):
 
         @staticmethod
         @request_context
-        def get(handler):
+        def get(handler, limit, cursor=None, stream=False):
             """Implements conexample.api.entry.get"""
-            return handler.core.get_entries()
+
+            after = _decode_cursor(cursor) if cursor is not None else None
+
+            # Version is read before entries, so the tag never claims contents newer than served
+            version = handler.core.get_entries_version()
+            headers, not_modified = _conditional(
+                _entries_etag(version), request.if_none_match
+            )
+
+            if not_modified:
+                return None, 304, headers
+
+            if stream:
+                entries = handler.core.iter_entries(after=after)
+
+                # Fetch the first entry upfront, so errors are reported before the response
+                # status is sent
+                first = next(entries, None)
+                if first is None:
+                    return [], 200, headers
+
+                return Response(
+                    _stream_entries(handler.json, first, entries),
+                    mimetype="application/json",
+                    headers=headers,
+                )
+
+            page = handler.response_cache.get(version, (limit, after))
+
+            if page is None:
+                page = _entries_page(
+                    handler.json,
+                    list(handler.core.get_entries(limit=limit + 1, after=after)),
+                    limit,
+                )
+                handler.response_cache.set(version, (limit, after), page)
+
+            payload, next_cursor = page
+            _link_next_page(headers, request.base_url, limit, next_cursor)
+
+            return Response(payload, mimetype="application/json", headers=headers)
 
         @staticmethod
         @request_context
         def post(handler, body):
             """Implements conexample.api.entry.post"""
-            try:
-                created = handler.core.set_entry_rating(
-                    name=body["name"], rating=body["rating"]
+
+            created = handler.core.set_entry_rating(
+                name=body["name"], rating=body["rating"]
+            )
+            return _write_response(created, "entry/%s" % body["name"])
+
+        class batch:  # pylint: disable=invalid-name,too-few-public-methods
+            """Container for conexample.api.entry.batch.* routes"""
+
+            @staticmethod
+            @request_context
+            def post(handler, body):
+                """Implements conexample.api.entry.batch.post"""
+
+                results = handler.core.set_entries_rating(
+                    [
+                        CoreEntry(name=item["name"], rating=item["rating"])
+                        for item in body
+                    ]
                 )
-            except CoreInvalidRequest as ex:
-                raise BadRequest(str(ex))
-
-            if created:
-                return _make_response(
-                    201,
-                    "Entry created",
-                    "Created",
-                    {"Location": "entry/%s" % body["name"]},
+
+                return [_make_write_result(result) for result in results]
+
+        class top:  # pylint: disable=invalid-name,too-few-public-methods
+            """Container for conexample.api.entry.top.* routes"""
+
+            @staticmethod
+            @request_context
+            def get(handler, n):  # pylint: disable=invalid-name
+                """Implements conexample.api.entry.top.get"""
+
+                version = handler.core.get_entries_version()
+                headers, not_modified = _conditional(
+                    _entries_etag(version), request.if_none_match
                 )
 
-            return _make_response(
-                200, "Entry updated", "OK", {"Location": "entry/%s" % body["name"]}
-            )
+                if not_modified:
+                    return None, 304, headers
+
+                page = handler.response_cache.get(version, ("top", n))
+
+                if page is None:
+                    page = _top_entries_page(
+                        handler.json, handler.core.get_top_entries(n)
+                    )
+                    handler.response_cache.set(version, ("top", n), page)
+
+                payload, _ = page
+
+                return Response(payload, mimetype="application/json", headers=headers)
+
+        class search:  # pylint: disable=invalid-name,too-few-public-methods
+            """Container for conexample.api.entry.search.* routes"""
+
+            @staticmethod
+            @request_context
+            def get(handler, q, limit):  # pylint: disable=invalid-name
+                """Implements conexample.api.entry.search.get"""
+
+                return handler.core.search_entries(q, limit)
 
         class element:  # pylint: disable=invalid-name
             """Container for conexample.api.entry.element.* routes"""
@@ -79,58 +414,155 @@ class RestApi(Api, connexion.FlaskApp):
             def get(handler, name):
                 """Implements conexample.api.entry.element.get"""
 
-                try:
-                    return {"name": name, "rating": handler.core.get_rating(name)}
-                except CoreEntryNotFound:
-                    raise NotFound("Entry not found")
+                entry = handler.core.get_entry(name)
+                headers, not_modified = _conditional(
+                    _entry_etag(entry), request.if_none_match
+                )
+
+                if not_modified:
+                    return None, 304, headers
+
+                return _entry_body(entry), 200, headers
 
             @staticmethod
             @request_context
             def post(handler, name, body):
                 """Implements conexample.api.entry.element.post"""
 
-                try:
-                    created = handler.core.set_entry_rating(
-                        name=name, rating=body["rating"]
-                    )
-                except CoreInvalidRequest as ex:
-                    raise BadRequest(str(ex))
-
-                if created:
-                    return _make_response(
-                        201, "Entry created", "Created", {"Location": "%s" % name}
-                    )
-
-                return _make_response(
-                    200, "Entry updated", "OK", {"Location": "%s" % name}
+                created = handler.core.set_entry_rating(
+                    name=name, rating=body["rating"]
                 )
+                return _write_response(created, "%s" % name)
 
             @staticmethod
             @request_context
             def delete(handler, name):
                 """Implements conexample.api.entry.element.delete"""
 
-                try:
-                    handler.core.delete_entry(name)
-                except CoreEntryNotFound:
-                    raise NotFound("Entry not found")
-
+                handler.core.delete_entry(name)
                 return _make_response(200, "Entry deleted", "OK")
 
+    class stats:  # pylint: disable=invalid-name,too-few-public-methods
+        """Container for conexample.api.stats.* routes"""
+
+        @staticmethod
+        @request_context
+        def get(handler):
+            """Implements conexample.api.stats.get"""
+
+            version = handler.core.get_entries_version()
+            headers, not_modified = _conditional(
+                _entries_etag(version), request.if_none_match
+            )
+
+            if not_modified:
+                return None, 304, headers
+
+            page = handler.response_cache.get(version, "stats")
+
+            if page is None:
+                page = _stats_page(handler.json, handler.core.get_rating_stats())
+                handler.response_cache.set(version, "stats", page)
+
+            payload, _ = page
+
+            return Response(payload, mimetype="application/json", headers=headers)
+
     def __init__(self, core):
         # pylint: disable=super-init-not-called
         self.core = core
+        self.response_cache = ResponseCache()
+        self.json = get_backend(SETTINGS["API_REST_JSON_ENCODER"])
 
         connexion.FlaskApp.__init__(  # pylint: disable=non-parent-init-called
             self, __name__
         )
 
-        self.add_api(
-            os.path.join(os.path.dirname(__file__), "api.yml"),
+        # Reads of every request are routed to the same read replica, or to the primary database
+        # if the client has just written
+        self.replicas = bool(SETTINGS["DATABASE_SQL_REPLICA_URIS"])
+        self.read_your_writes = _read_your_writes_window()
+        if self.replicas:
+            self.app.before_request(self._route_reads)
+            self.app.after_request(self._record_write)
+            self.app.teardown_request(self._reset_read_routing)
+
+        # Database queries of every request are reported in Server-Timing header
+        self.app.before_request(self._count_queries)
+        self.app.after_request(self._report_queries)
+        self.app.teardown_request(self._reset_queries)
+
+        # Jsonifier and decoder are class level, thus, they are bound to the backend through
+        # per instance subclasses
+        self.api_cls = type("FlaskApi", (_FlaskApi,), {"json_backend": self.json})
+        self.app.json_decoder = type(
+            "JSONDecoder", (BackendJSONDecoder,), {"backend": self.json}
+        )
+
+        if metrics.ENABLED:
+            self.app.add_url_rule("/metrics", "metrics", self._metrics)
+
+        self.app.add_url_rule("/ready", "ready", self._ready)
+
+        # Cached specification is already parsed, so the YAML parsing and template rendering are
+        # skipped. connexion 2.6 validates every specification passed to add_api, the cached one
+        # included, and provides no way to skip it
+        specification_cache = SpecificationCache()
+        specification = specification_cache.load()
+
+        api = self.add_api(
+            specification or SPEC_PATH,
             resolver=Resolver(self.func_resolv),
             strict_validation=True,
+            validator_map=get_validator_map(SETTINGS["API_REST_VALIDATION"]),
         )
 
+        if specification is None:
+            specification_cache.store(api.specification)
+
+    @staticmethod
+    def _metrics():
+        content_type, body = metrics.exposition()
+        return Response(body, content_type=content_type)
+
+    def _ready(self):
+        body, status = _readiness(self.ready)
+        return Response(
+            self.json.dumps(body), status=status, mimetype="application/json"
+        )
+
+    @staticmethod
+    def _count_queries():
+        metrics.REQUEST_QUERIES.set(metrics.RequestQueries())
+
+    @staticmethod
+    def _report_queries(response):
+        queries = metrics.REQUEST_QUERIES.get()
+        if queries is not None:
+            response.headers["Server-Timing"] = _server_timing(queries)
+        return response
+
+    @staticmethod
+    def _reset_queries(exception):  # pylint: disable=unused-argument
+        metrics.REQUEST_QUERIES.set(None)
+
+    def _route_reads(self):
+        READ_ROUTING.set(_read_routing(request.cookies, self.read_your_writes))
+
+    @staticmethod
+    def _reset_read_routing(exception):  # pylint: disable=unused-argument
+        # Threads serving the requests are reused, so routing of the request is never left behind
+        READ_ROUTING.set(None)
+
+    def _record_write(self, response):
+        if (
+            self.read_your_writes
+            and request.method in WRITE_METHODS
+            and response.status_code < 400
+        ):
+            response.headers.add("Set-Cookie", _write_cookie(self.read_your_writes))
+        return response
+
     def func_resolv(self, function_name):
         """Resolves request handlers based on OpenAPI specified operation ids"""
 
@@ -0,0 +1,655 @@
+"""ASGI REST API implementation on top of the asynchronous core
+
+Serves the same api.yml specification as RestApi. Requests are routed, validated and responded to
+without blocking the event loop, thus, a single process serves many requests waiting for the
+database concurrently."""
+import logging
+import re
+from functools import wraps
+from time import perf_counter
+from urllib.parse import parse_qsl
+
+from connexion.json_schema import Draft4RequestValidator
+from connexion.spec import Specification
+from jsonschema import ValidationError, draft4_format_checker
+from werkzeug.exceptions import (
+    BadRequest,
+    HTTPException,
+    MethodNotAllowed,
+    NotFound,
+    UnsupportedMediaType,
+)
+from werkzeug.http import parse_cookie, parse_etags
+
+from ... import SETTINGS, metrics
+from ...interface import READ_ROUTING, Api, CoreEntry, CoreException
+from . import (
+    OPERATION_ID_PREFIX,
+    WRITE_METHODS,
+    _conditional,
+    _decode_cursor,
+    _entries_etag,
+    _entries_page,
+    _EntriesStream,
+    _entry_body,
+    _entry_etag,
+    _http_exception,
+    _link_next_page,
+    _make_response,
+    _make_write_result,
+    _operation_id,
+    _read_routing,
+    _read_your_writes_window,
+    _readiness,
+    _server_timing,
+    _stats_page,
+    _top_entries_page,
+    _write_cookie,
+    _write_response,
+)
+from .cache import ResponseCache
+from .encoding import get_backend
+from .specification import SPEC_PATH, SpecificationCache
+from .validation import compile_schema, compiled_accepts
+
+LOGGER = logging.getLogger("api.rest.asgi")
+
+
+def _boolean(value):
+    if value.lower() not in ("true", "false"):
+        raise ValueError(value)
+    return value.lower() == "true"
+
+
+# Parameter value conversions of the schema types
+PARAMETER_TYPES = {"integer": int, "number": float, "boolean": _boolean, "string": str}
+
+
+def _format_error(exception):
+    path = ".".join(str(item) for item in exception.path)
+    return exception.message + (" - '%s'" % path if path else "")
+
+
+async def _stream_entries(backend, first, entries):
+    """Yields JSON array of the entries in chunks of STREAM_CHUNK_SIZE entries."""
+
+    async def chain():
+        yield first
+        async for entry in entries:
+            yield entry
+
+    stream = _EntriesStream(backend)
+
+    async for entry in chain():
+        data = stream.push(entry)
+        if data is not None:
+            yield data
+
+    yield stream.close()
+
+
+def request_context(func):
+    """Decorator handling common request errands. The handler call is timed and its errors counted
+    in the API layer metrics of the operation, the metrics of the layers below included."""
+
+    operation = _operation_id(func)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = metrics.OPERATION.set(operation)
+        started = perf_counter()
+        error = None
+        try:
+            return await func(*args, **kwargs)
+        except CoreException as ex:
+            error = _http_exception(ex)
+            raise error
+        except Exception as ex:
+            error = ex
+            raise
+        finally:
+            metrics.observe_operation("api", perf_counter() - started, error)
+            metrics.OPERATION.reset(token)
+
+    return wrapper
+
+
+class ExtraParameters(BadRequest):
+    """Request has parameters not present in the specification. Connexion responds to such
+    requests with untitled problem."""
+
+    name = None
+
+
+class Request:
+    """Parsed ASGI request"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = parse_qsl(
+            scope["query_string"].decode("latin-1"), keep_blank_values=True
+        )
+        self.headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        self.body = body
+
+        host = self.headers.get("host") or "%s:%d" % tuple(
+            scope.get("server") or ("localhost", 80)
+        )
+        self.base_url = "%s://%s%s" % (scope.get("scheme", "http"), host, self.path)
+        self.if_none_match = parse_etags(self.headers.get("if-none-match"))
+
+
+class Operation:
+    """Request handling plan of the specification operation: parameters and request body
+    validation followed by the handler call."""
+
+    def __init__(self, handler, parameters, body_schema):
+        self.handler = handler
+        self.parameters = parameters
+        self.body_schema = body_schema
+
+        if body_schema is not None:
+            self.body_validator = Draft4RequestValidator(
+                body_schema, format_checker=draft4_format_checker
+            )
+            self.compiled_body_validator = compile_schema(body_schema)
+
+    def _parameter(self, parameter, value):
+        schema = parameter.get("schema", {})
+
+        try:
+            value = PARAMETER_TYPES.get(schema.get("type"), str)(value)
+        except ValueError:
+            raise BadRequest(
+                "Wrong type, expected '%s' for %s parameter '%s'"
+                % (schema.get("type"), parameter["in"], parameter["name"])
+            )
+
+        try:
+            Draft4RequestValidator(schema).validate(value)
+        except ValidationError as ex:
+            # Connexion reports the whole validation error for parameters
+            raise BadRequest(str(ex))
+
+        return value
+
+    def _arguments(self, api, request, path_parameters):
+        arguments = {}
+        values = {"path": path_parameters, "query": dict(request.query)}
+
+        extra = set(values["query"]).difference(
+            parameter["name"]
+            for parameter in self.parameters
+            if parameter["in"] == "query"
+        )
+        if extra:
+            raise ExtraParameters(
+                "Extra query parameter(s) %s not in spec" % ", ".join(sorted(extra))
+            )
+
+        for parameter in self.parameters:
+            name = parameter["name"]
+            value = values.get(parameter["in"], {}).get(name)
+
+            if value is not None:
+                arguments[name] = self._parameter(parameter, value)
+            elif "default" in parameter.get("schema", {}):
+                arguments[name] = parameter["schema"]["default"]
+            elif parameter.get("required"):
+                raise BadRequest("Missing %s parameter '%s'" % (parameter["in"], name))
+
+        if self.body_schema is not None:
+            arguments["body"] = self._body(api, request)
+
+        return arguments
+
+    def _body(self, api, request):
+        content_type = request.headers.get("content-type", "").split(";")[0]
+        if request.body and content_type != "application/json":
+            raise UnsupportedMediaType(
+                "Invalid Content-type (%s), expected JSON data" % content_type
+            )
+
+        try:
+            body = api.json.loads(request.body) if request.body else None
+        except ValueError:
+            raise BadRequest("Request body is not valid JSON")
+
+        # Compiled validator accepts valid bodies, the interpreted one reports errors
+        if compiled_accepts(self.compiled_body_validator, body):
+            return body
+
+        try:
+            self.body_validator.validate(body)
+        except ValidationError as ex:
+            raise BadRequest(_format_error(ex))
+
+        return body
+
+    async def __call__(self, api, request, path_parameters):
+        return await self.handler(
+            api, request, **self._arguments(api, request, path_parameters)
+        )
+
+
+class AsgiRestApi(Api):
+    """ASGI API handler serving the REST API specification with the asynchronous core.
+
+    Request handling shared with RestApi is implemented by the helpers of the rest module, so the
+    handlers differ in the core calls only."""
+
+    class entry:  # pylint: disable=invalid-name
+        """Container for conexample.api.entry.* routes"""
+
+        @staticmethod
+        @request_context
+        async def get(handler, request, limit, cursor=None, stream=False):
+            """Implements conexample.api.entry.get"""
+
+            after = _decode_cursor(cursor) if cursor is not None else None
+
+            # Version is read before entries, so the tag never claims contents newer than served
+            version = await handler.core.get_entries_version()
+            headers, not_modified = _conditional(
+                _entries_etag(version), request.if_none_match
+            )
+
+            if not_modified:
+                return None, 304, headers
+
+            if stream:
+                entries = handler.core.iter_entries(after=after)
+
+                # Fetch the first entry upfront, so errors are reported before the response
+                # status is sent
+                try:
+                    first = await entries.__anext__()
+                except StopAsyncIteration:
+                    return [], 200, headers
+
+                return _stream_entries(handler.json, first, entries), 200, headers
+
+            page = handler.response_cache.get(version, (limit, after))
+
+            if page is None:
+                page = _entries_page(
+                    handler.json,
+                    list(await handler.core.get_entries(limit=limit + 1, after=after)),
+                    limit,
+                )
+                handler.response_cache.set(version, (limit, after), page)
+
+            payload, next_cursor = page
+            _link_next_page(headers, request.base_url, limit, next_cursor)
+
+            return payload, 200, headers
+
+        @staticmethod
+        @request_context
+        async def post(handler, request, body):
+            """Implements conexample.api.entry.post"""
+            # pylint: disable=unused-argument
+
+            created = await handler.core.set_entry_rating(
+                name=body["name"], rating=body["rating"]
+            )
+            return _write_response(created, "entry/%s" % body["name"])
+
+        class batch:  # pylint: disable=invalid-name,too-few-public-methods
+            """Container for conexample.api.entry.batch.* routes"""
+
+            @staticmethod
+            @request_context
+            async def post(handler, request, body):
+                """Implements conexample.api.entry.batch.post"""
+                # pylint: disable=unused-argument
+
+                results = await handler.core.set_entries_rating(
+                    [
+                        CoreEntry(name=item["name"], rating=item["rating"])
+                        for item in body
+                    ]
+                )
+
+                return [_make_write_result(result) for result in results]
+
+        class top:  # pylint: disable=invalid-name,too-few-public-methods
+            """Container for conexample.api.entry.top.* routes"""
+
+            @staticmethod
+            @request_context
+            async def get(handler, request, n):  # pylint: disable=invalid-name
+                """Implements conexample.api.entry.top.get"""
+
+                version = await handler.core.get_entries_version()
+                headers, not_modified = _conditional(
+                    _entries_etag(version), request.if_none_match
+                )
+
+                if not_modified:
+                    return None, 304, headers
+
+                page = handler.response_cache.get(version, ("top", n))
+
+                if page is None:
+                    page = _top_entries_page(
+                        handler.json, await handler.core.get_top_entries(n)
+                    )
+                    handler.response_cache.set(version, ("top", n), page)
+
+                payload, _ = page
+
+                return payload, 200, headers
+
+        class search:  # pylint: disable=invalid-name,too-few-public-methods
+            """Container for conexample.api.entry.search.* routes"""
+
+            @staticmethod
+            @request_context
+            async def get(handler, request, q, limit):  # pylint: disable=invalid-name
+                """Implements conexample.api.entry.search.get"""
+                # pylint: disable=unused-argument
+
+                return await handler.core.search_entries(q, limit)
+
+        class element:  # pylint: disable=invalid-name
+            """Container for conexample.api.entry.element.* routes"""
+
+            @staticmethod
+            @request_context
+            async def get(handler, request, name):
+                """Implements conexample.api.entry.element.get"""
+
+                entry = await handler.core.get_entry(name)
+                headers, not_modified = _conditional(
+                    _entry_etag(entry), request.if_none_match
+                )
+
+                if not_modified:
+                    return None, 304, headers
+
+                return _entry_body(entry), 200, headers
+
+            @staticmethod
+            @request_context
+            async def post(handler, request, name, body):
+                """Implements conexample.api.entry.element.post"""
+                # pylint: disable=unused-argument
+
+                created = await handler.core.set_entry_rating(
+                    name=name, rating=body["rating"]
+                )
+                return _write_response(created, "%s" % name)
+
+            @staticmethod
+            @request_context
+            async def delete(handler, request, name):
+                """Implements conexample.api.entry.element.delete"""
+                # pylint: disable=unused-argument
+
+                await handler.core.delete_entry(name)
+                return _make_response(200, "Entry deleted", "OK")
+
+    class stats:  # pylint: disable=invalid-name,too-few-public-methods
+        """Container for conexample.api.stats.* routes"""
+
+        @staticmethod
+        @request_context
+        async def get(handler, request):
+            """Implements conexample.api.stats.get"""
+
+            version = await handler.core.get_entries_version()
+            headers, not_modified = _conditional(
+                _entries_etag(version), request.if_none_match
+            )
+
+            if not_modified:
+                return None, 304, headers
+
+            page = handler.response_cache.get(version, "stats")
+
+            if page is None:
+                page = _stats_page(handler.json, await handler.core.get_rating_stats())
+                handler.response_cache.set(version, "stats", page)
+
+            payload, _ = page
+
+            return payload, 200, headers
+
+    @staticmethod
+    async def openapi_json(handler, request):
+        """Serves the specification, as connexion does at {base_path}/openapi.json"""
+        # pylint: disable=unused-argument
+
+        return handler.specification_json
+
+    @staticmethod
+    async def serve_metrics(handler, request):
+        """Serves the metrics in the Prometheus text format, as RestApi does at /metrics"""
+        # pylint: disable=unused-argument
+
+        content_type, body = metrics.exposition()
+        return body, 200, {"Content-Type": content_type}
+
+    @staticmethod
+    async def serve_ready(handler, request):
+        """Reports readiness of the service, as RestApi does at /ready"""
+        # pylint: disable=unused-argument
+
+        body, status = _readiness(handler.ready)
+        return body, status, None
+
+    def __init__(self, core):
+        # pylint: disable=super-init-not-called
+        self.core = core
+        self.response_cache = ResponseCache()
+        self.json = get_backend(SETTINGS["API_REST_JSON_ENCODER"])
+        # Coroutine functions awaited on the lifespan startup, before connections are accepted
+        self.startup_hooks = []
+        self.replicas = bool(SETTINGS["DATABASE_SQL_REPLICA_URIS"])
+        self.read_your_writes = _read_your_writes_window()
+
+        specification_cache = SpecificationCache()
+        raw_specification = specification_cache.load()
+        specification = Specification.load(raw_specification or SPEC_PATH)
+        if raw_specification is None:
+            specification_cache.store(specification)
+
+        self.specification_json = self.json.dumps(
+            specification.with_base_path(specification.base_path).raw
+        )
+        self.routes = self._routes(specification)
+
+    def _routes(self, specification):
+        """Returns (path pattern, {method: operation}) pairs of the specification paths. Paths
+        without parameters are matched first."""
+
+        routes = []
+
+        for path, path_item in specification["paths"].items():
+            pattern = re.compile(
+                "^%s%s$"
+                % (
+                    re.escape(specification.base_path),
+                    re.sub(r"\\{(\w+)\\}", r"(?P<\1>[^/]+)", re.escape(path)),
+                )
+            )
+
+            operations = {}
+            for method, operation in path_item.items():
+                if method == "parameters":
+                    continue
+
+                body_schema = (
+                    operation.get("requestBody", {})
+                    .get("content", {})
+                    .get("application/json", {})
+                    .get("schema")
+                )
+                operations[method.upper()] = Operation(
+                    self.func_resolv(operation["operationId"]),
+                    path_item.get("parameters", []) + operation.get("parameters", []),
+                    body_schema,
+                )
+
+            routes.append((pattern, operations))
+
+        routes.append(
+            (
+                re.compile("^%s/openapi\\.json$" % re.escape(specification.base_path)),
+                {"GET": Operation(self.openapi_json, [], None)},
+            )
+        )
+
+        if metrics.ENABLED:
+            routes.append(
+                (
+                    re.compile("^/metrics$"),
+                    {"GET": Operation(self.serve_metrics, [], None)},
+                )
+            )
+
+        routes.append(
+            (re.compile("^/ready$"), {"GET": Operation(self.serve_ready, [], None)})
+        )
+
+        return sorted(routes, key=lambda route: route[0].groups)
+
+    def func_resolv(self, function_name):
+        """Resolves request handlers based on OpenAPI specified operation ids"""
+
+        if not function_name.startswith(OPERATION_ID_PREFIX):
+            raise ImportError()
+
+        subject = self
+        handler_path = function_name[len(OPERATION_ID_PREFIX) + 1 :].split(".")
+        for step in handler_path:
+            subject = getattr(subject, step)
+
+        return subject
+
+    def _match(self, request):
+        allowed = False
+
+        for pattern, operations in self.routes:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+
+            if request.method in operations:
+                return operations[request.method], match.groupdict()
+
+            allowed = True
+
+        if allowed:
+            raise MethodNotAllowed()
+
+        raise NotFound()
+
+    async def handle(self, request):
+        """Returns (status, headers, body) of the response to the request. Body is either bytes or
+        asynchronous iterator of bytes."""
+
+        queries = metrics.RequestQueries()
+        metrics.REQUEST_QUERIES.set(queries)
+
+        if self.replicas:
+            READ_ROUTING.set(
+                _read_routing(
+                    parse_cookie(request.headers.get("cookie")), self.read_your_writes
+                )
+            )
+
+        try:
+            operation, path_parameters = self._match(request)
+            result = await operation(self, request, path_parameters)
+        except HTTPException as ex:
+            return (
+                ex.code,
+                {
+                    "Content-Type": "application/problem+json",
+                    "Server-Timing": _server_timing(queries),
+                },
+                self.json.dumps(
+                    {
+                        "detail": ex.description,
+                        "status": ex.code,
+                        "title": ex.name,
+                        "type": "about:blank",
+                    }
+                ),
+            )
+
+        body, status, headers = (
+            result if isinstance(result, tuple) else (result, 200, None)
+        )
+        headers = dict(headers or {})
+        headers["Server-Timing"] = _server_timing(queries)
+
+        if self.read_your_writes and request.method in WRITE_METHODS and status < 400:
+            headers["Set-Cookie"] = _write_cookie(self.read_your_writes)
+
+        if body is None:
+            return status, headers, b""
+
+        headers.setdefault("Content-Type", "application/json")
+
+        if not isinstance(body, bytes) and not hasattr(body, "__aiter__"):
+            body = self.json.dumps(body)
+
+        return status, headers, body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    for hook in self.startup_hooks:
+                        await hook()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        status, headers, body = await self.handle(Request(scope, body))
+
+        if isinstance(body, bytes):
+            headers["Content-Length"] = len(body)
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.lower().encode("latin-1"), str(value).encode("latin-1"))
+                    for name, value in headers.items()
+                ],
+            }
+        )
+
+        if isinstance(body, bytes):
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async for chunk in body:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    def run(self, host="127.0.0.1", port=5000):
+        """Runs the API with uvicorn development server"""
+
+        import uvicorn  # pylint: disable=import-outside-toplevel
+
+        uvicorn.run(self, host=host, port=port)
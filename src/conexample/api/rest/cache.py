@@ -0,0 +1,92 @@
+"""Versioned cache of serialized REST API responses"""
+import threading
+from dataclasses import dataclass
+
+from ... import SETTINGS
+from ...cache import LRUCache
+
+
+@dataclass
+class ResponseCacheStats:
+    """Response cache usage counters."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    oversized: int = 0
+    size: int = 0
+
+
+class ResponseCache:
+    """Per worker cache of serialized responses of a versioned resource.
+
+    All the responses are cached for a single version of the resource. Request for a newer version
+    drops all the cached responses, thus, every response is generated once per resource version,
+    not once per request. Responses larger than max_body bytes are not cached."""
+
+    def __init__(self, size=None, max_body=None):
+        size = (
+            size
+            if size is not None
+            else int(SETTINGS["API_REST_RESPONSE_CACHE_SIZE"] or 0)
+        )
+
+        self.max_body = max_body or int(
+            SETTINGS["API_REST_RESPONSE_CACHE_MAX_BODY"] or 0
+        )
+        self.version = None
+
+        self._responses = LRUCache(size)
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self._oversized = 0
+
+    def _track_version(self, version):
+        """Returns True if the version is the current version of the resource. Must be called with
+        the lock acquired."""
+
+        if self.version is None or version > self.version:
+            if self.version is not None:
+                self._invalidations += 1
+            self.version = version
+            self._responses.clear()
+
+        return version == self.version
+
+    def get(self, version, key):
+        """Returns response cached under the key for the resource version, or None."""
+
+        with self._lock:
+            if not self._track_version(version):
+                return None
+
+            return self._responses.get(key)
+
+    def set(self, version, key, response):
+        """Caches (body, metadata) response under the key for the resource version. Body is the
+        serialized response payload, metadata is cached along with it as is."""
+
+        body, _ = response
+
+        with self._lock:
+            if self.max_body and len(body) > self.max_body:
+                self._oversized += 1
+            elif self._track_version(version):
+                self._responses.set(key, response)
+
+    @property
+    def stats(self):
+        """Returns cache usage counters."""
+
+        stats = self._responses.stats
+
+        with self._lock:
+            return ResponseCacheStats(
+                hits=stats.hits,
+                misses=stats.misses,
+                evictions=stats.evictions,
+                invalidations=self._invalidations,
+                oversized=self._oversized,
+                size=stats.size,
+            )
@@ -0,0 +1,97 @@
+"""JSON encoding backends of the REST API"""
+import json
+
+from connexion.jsonifier import Jsonifier
+
+from ...interface import EntryRecord
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _entry_record(obj):
+    if isinstance(obj, EntryRecord):
+        return {"name": obj.name, "rating": obj.rating}
+    raise TypeError("Type is not JSON serializable: %s" % type(obj).__name__)
+
+
+class StdlibJSON:
+    """JSON backend based on the standard library json module.
+
+    Standard library encodes named tuples as arrays, so entry records are converted to objects
+    before encoding."""
+
+    name = "stdlib"
+
+    @classmethod
+    def _native(cls, obj):
+        if isinstance(obj, EntryRecord):
+            return {"name": obj.name, "rating": obj.rating}
+        if isinstance(obj, dict):
+            return {key: cls._native(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [cls._native(value) for value in obj]
+        return obj
+
+    def dumps(self, obj):
+        """Returns JSON document of the object as bytes."""
+        return json.dumps(self._native(obj)).encode()
+
+    @staticmethod
+    def loads(data):
+        """Returns object decoded from the JSON document."""
+        return json.loads(data)
+
+
+class OrjsonJSON:
+    """JSON backend based on the orjson library. Entry records are encoded natively."""
+
+    name = "orjson"
+
+    @staticmethod
+    def dumps(obj):
+        """Returns JSON document of the object as bytes."""
+        return orjson.dumps(obj, default=_entry_record)
+
+    @staticmethod
+    def loads(data):
+        """Returns object decoded from the JSON document."""
+        return orjson.loads(data)
+
+
+BACKENDS = {StdlibJSON.name: StdlibJSON, OrjsonJSON.name: OrjsonJSON}
+
+
+def get_backend(name="auto"):
+    """Returns JSON backend of the provided name. For auto, orjson is used if available."""
+
+    name = (name or "auto").lower()
+
+    if name == "auto":
+        name = OrjsonJSON.name if orjson is not None else StdlibJSON.name
+
+    if name not in BACKENDS:
+        raise ValueError("Unknown JSON encoder: %s" % name)
+
+    if name == OrjsonJSON.name and orjson is None:
+        raise ValueError("JSON encoder orjson requires the orjson package")
+
+    return BACKENDS[name]()
+
+
+class BackendJsonifier(Jsonifier):
+    """Connexion jsonifier serializing with the JSON backend"""
+
+    def dumps(self, data, **kwargs):
+        return self.json.dumps(data) + b"\n"
+
+
+class BackendJSONDecoder(json.JSONDecoder):
+    """Flask request JSON decoder parsing with the JSON backend"""
+
+    backend = StdlibJSON()
+
+    def decode(self, s, *args, **kwargs):  # pylint: disable=arguments-differ
+        return self.backend.loads(s)
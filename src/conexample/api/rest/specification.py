@@ -0,0 +1,86 @@
+"""Cache of the parsed REST API specification
+
+Cached specification can be prepared at build time with
+
+    python -m conexample.api.rest.specification
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import connexion
+from connexion.spec import Specification
+
+from ... import SETTINGS
+
+LOGGER = logging.getLogger("api.rest.specification")
+
+SPEC_PATH = os.path.join(os.path.dirname(__file__), "api.yml")
+
+
+class SpecificationCache:
+    """Cache of the parsed and validated specifications, stored as JSON documents in the directory.
+
+    Cached documents are keyed by hash of the specification file contents and connexion version,
+    thus, any change of the specification invalidates its cached document. If directory is not
+    provided nor configured, the cache is disabled."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or SETTINGS["API_REST_SPEC_CACHE_DIR"] or None
+
+    def _cache_path(self, path):
+        digest = hashlib.sha256(connexion.__version__.encode())
+        with open(path, "rb") as spec_file:
+            digest.update(spec_file.read())
+        return os.path.join(self.directory, "api-%s.json" % digest.hexdigest())
+
+    def load(self, path=SPEC_PATH):
+        """Returns cached specification of the file or None, if it is not cached."""
+
+        if self.directory is None:
+            return None
+
+        try:
+            with open(self._cache_path(path), "r") as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as ex:
+            LOGGER.warning("Failed to load cached specification: %s", ex)
+            return None
+
+    def store(self, specification, path=SPEC_PATH):
+        """Stores parsed and validated specification of the file."""
+
+        if self.directory is None:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            cache_path = self._cache_path(path)
+
+            # Concurrently starting workers may store the specification at the same time, so it is
+            # written to a temporary file first and atomically moved into place
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.directory, suffix=".tmp", delete=False
+            ) as cache_file:
+                json.dump(specification.raw, cache_file)
+            os.replace(cache_file.name, cache_path)
+        except OSError as ex:
+            LOGGER.warning("Failed to store cached specification: %s", ex)
+
+
+def main():
+    """Stores the parsed and validated REST API specification in the cache"""
+
+    cache = SpecificationCache()
+    if cache.directory is None:
+        raise SystemExit("API_REST_SPEC_CACHE_DIR is not set")
+
+    cache.store(Specification.load(SPEC_PATH))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compiled request body validation of the REST API"""
+import logging
+
+from connexion.decorators.validation import RequestBodyValidator
+
+try:
+    import fastjsonschema
+except ImportError:  # pragma: no cover
+    fastjsonschema = None
+
+LOGGER = logging.getLogger("api.rest.validation")
+
+# Keywords connexion's request validator interprets differently than the plain JSON schema
+INTERPRETED_KEYWORDS = frozenset(
+    ("nullable", "x-nullable", "readOnly", "writeOnly", "x-writeOnly", "format")
+)
+
+DRAFT4 = "http://json-schema.org/draft-04/schema#"
+
+
+def _keywords(schema):
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            yield key
+            yield from _keywords(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            yield from _keywords(value)
+
+
+def compile_schema(schema):
+    """Returns validation function generated from the Draft 4 schema. Returns None, if the schema
+    uses keywords the function would not validate the same way as connexion's interpreted
+    validator."""
+
+    if fastjsonschema is None:
+        return None
+
+    unsupported = INTERPRETED_KEYWORDS.intersection(_keywords(schema))
+    if unsupported:
+        LOGGER.debug("Schema not compiled due to keywords: %s", ", ".join(unsupported))
+        return None
+
+    return fastjsonschema.compile(
+        dict(schema, **{"$schema": DRAFT4}), use_default=False
+    )
+
+
+def compiled_accepts(compiled, data):
+    """Returns True if the compiled validation function accepts the data. Returns False for
+    missing function."""
+
+    if compiled is None:
+        return False
+
+    try:
+        compiled(data)
+    except fastjsonschema.JsonSchemaException:
+        return False
+
+    return True
+
+
+def get_validator_map(mode="auto"):
+    """Returns connexion validator map for the validation mode. For auto, request bodies are
+    validated by compiled validators if fastjsonschema is available."""
+
+    mode = (mode or "auto").lower()
+
+    if mode == "auto":
+        mode = "compiled" if fastjsonschema is not None else "interpreted"
+
+    if mode == "interpreted":
+        return {}
+
+    if mode != "compiled":
+        raise ValueError("Unknown validation mode: %s" % mode)
+
+    if fastjsonschema is None:
+        raise ValueError("Compiled validation requires the fastjsonschema package")
+
+    return {"body": CompiledRequestBodyValidator}
+
+
+class CompiledRequestBodyValidator(RequestBodyValidator):
+    """Request body validator checking bodies with the validation function compiled at startup.
+
+    Only the valid bodies are accepted by the compiled function. Invalid ones are validated again
+    by connexion's interpreted validator, so error responses are the same in both modes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compiled = compile_schema(self.schema)
+
+    def validate_schema(self, data, url):
+        if compiled_accepts(self.compiled, data):
+            return None
+
+        return super().validate_schema(data, url)
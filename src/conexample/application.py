@@ -1,13 +1,64 @@
-"""Application objects of example Connexion application package"""
+"""Application objects of example Connexion application package
+
+The application layers (connexion and Flask of the API, SQLAlchemy of the database, the metrics) are
+imported on first use of their names (PEP 562), i.e. by prepare(), so importing the module, e.g. by
+tooling, stays cheap."""
 import logging
+from importlib import import_module
+from typing import TYPE_CHECKING
 
 from . import SETTINGS, __version__
-from .api.rest import RestApi as Api
-from .core import ApplicationCore as Core
-from .db.sql import SQLDatabase as Db
+from .interface import CoreException
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import metrics
+    from .api.rest import RestApi as Api
+    from .api.rest.asgi import AsgiRestApi as AsyncApi
+    from .core import ApplicationCore as Core
+    from .core import AsyncApplicationCore as AsyncCore
+    from .db.batch import BatchingDatabase as BatchingDb
+    from .db.cache import CachedDatabase as CachedDb
+    from .db.sql import SQLDatabase as Db
+    from .db.sql.aio import AsyncSQLDatabase as AsyncDb
+    from .db.sql.db import engine_dispose
 
 LOGGER = logging.getLogger(__package__)
 
+# Lazily imported names: (module, its attribute, or None for the module itself)
+_LAZY = {
+    "Api": (".api.rest", "RestApi"),
+    "AsyncApi": (".api.rest.asgi", "AsgiRestApi"),
+    "Core": (".core", "ApplicationCore"),
+    "AsyncCore": (".core", "AsyncApplicationCore"),
+    "BatchingDb": (".db.batch", "BatchingDatabase"),
+    "CachedDb": (".db.cache", "CachedDatabase"),
+    "Db": (".db.sql", "SQLDatabase"),
+    "AsyncDb": (".db.sql.aio", "AsyncSQLDatabase"),
+    "engine_dispose": (".db.sql.db", "engine_dispose"),
+    "metrics": (".metrics", None),
+}
+
+
+def __getattr__(name):
+    """Imports the lazily imported name on first access."""
+
+    if name not in _LAZY:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    module, attribute = _LAZY[name]
+    value = import_module(module, __package__)
+    value = globals()[name] = value if attribute is None else getattr(value, attribute)
+    return value
+
+
+def _import(*names):
+    """Imports the lazily imported names, unless imported (or replaced) already, so the functions
+    of the module can refer to them as to globals."""
+
+    for name in names:
+        if name not in globals():
+            __getattr__(name)
+
 
 class ConnexionExample:
     """Main application objet of Connexion application package"""
@@ -36,20 +87,90 @@ class ConnexionExample:
 
         LOGGER.info("Connexion example version: %s", __version__)
 
-    def prepare(self):
-        """Prepares the service"""
+    @staticmethod
+    def _database():
+        """Returns database handler configured by the settings"""
+
+        _import("Db", "BatchingDb", "CachedDb")
+        LOGGER.info("Starting database interface")
+        database = Db()
+
+        if int(SETTINGS["DATABASE_BATCH_SIZE"] or 0) > 1:
+            LOGGER.info("Enabling database write batching.")
+            database = BatchingDb(database)
+
+        if int(SETTINGS["DATABASE_CACHE_SIZE"] or 0):
+            LOGGER.info("Enabling database cache.")
+            database = CachedDb(database)
+
+        return database
+
+    @staticmethod
+    def _warm_up_settings():
+        """Returns (connections, hot entries) of the warm-up configured by the settings"""
+
+        return (
+            int(SETTINGS["DATABASE_WARMUP_CONNECTIONS"] or 0),
+            int(SETTINGS["DATABASE_WARMUP_HOT_ENTRIES"] or 0),
+        )
+
+    def prepare(self, warm_up=True):
+        """Prepares the service. Unless warm_up is unset, the process is warmed up and reported
+        ready at once. Services prepared before forking the workers warm them up by post_fork."""
 
         LOGGER.info("Starting conexample service.")
 
-        LOGGER.info("Starting database interface")
-        self.database = Db()
+        _import("Core", "Api")
+        self.database = self._database()
 
         LOGGER.info("Starting core logic.")
         self.core = Core(database=self.database)
 
+        if (SETTINGS["CORE_SEARCH_INDEX_PRELOAD"] or "").lower() == "true":
+            LOGGER.info("Loading search index.")
+            try:
+                self.core.load_search_index()
+            except CoreException:
+                LOGGER.error(
+                    "Failed to load search index, it is loaded on first search."
+                )
+
         LOGGER.info("Starting API provider.")
         self.api = Api(core=self.core)
 
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self):
+        """Opens DATABASE_WARMUP_CONNECTIONS pooled database connections, pings the database and
+        reads DATABASE_WARMUP_HOT_ENTRIES top rated entries, then reports the service ready through
+        the API. Failed warm-up is logged only, connections are opened on demand then."""
+
+        connections, hot_entries = self._warm_up_settings()
+
+        if connections or hot_entries:
+            LOGGER.info("Warming up database connections.")
+            try:
+                self.core.warm_up(connections, hot_entries)
+            except CoreException:
+                LOGGER.error(
+                    "Failed to warm up, database connections are opened on demand."
+                )
+
+        self.api.ready = True
+
+    def post_fork(self):
+        """Re-initializes process specific resources in the worker process forked after prepare
+        and warms the worker up"""
+
+        LOGGER.info("Re-initializing worker process resources.")
+        _import("engine_dispose", "metrics")
+        engine_dispose()
+        metrics.process_started()
+
+        if self.api is not None:
+            self.warm_up()
+
     def start(self):
         """Starts connexion example application developement server in a blocking manner"""
 
@@ -68,3 +189,41 @@ class ConnexionExample:
         # Terminate and free resources managed by any of application modules
 
         LOGGER.info("System finished gracefully.")
+
+
+class AsyncConnexionExample(ConnexionExample):
+    """Application object of Connexion application package served via ASGI"""
+
+    def prepare(self, warm_up=True):
+        """Prepares the service. Unless warm_up is unset, the worker is warmed up on the ASGI
+        lifespan startup, before the server accepts connections."""
+
+        LOGGER.info("Starting conexample asynchronous service.")
+
+        _import("AsyncDb", "AsyncCore", "AsyncApi")
+        self.database = AsyncDb(self._database())
+
+        LOGGER.info("Starting core logic.")
+        self.core = AsyncCore(database=self.database)
+
+        LOGGER.info("Starting API provider.")
+        self.api = AsyncApi(core=self.core)
+
+        if warm_up:
+            self.api.startup_hooks.append(self.warm_up)
+
+    async def warm_up(self):
+        """See ConnexionExample.warm_up"""
+
+        connections, hot_entries = self._warm_up_settings()
+
+        if connections or hot_entries:
+            LOGGER.info("Warming up database connections.")
+            try:
+                await self.core.warm_up(connections, hot_entries)
+            except CoreException:
+                LOGGER.error(
+                    "Failed to warm up, database connections are opened on demand."
+                )
+
+        self.api.ready = True
@@ -0,0 +1,8 @@
+"""example Connexion application ASGI application entrypoint"""
+from ...application import AsyncConnexionExample
+
+# pylint: disable=invalid-name
+
+conexample = AsyncConnexionExample()
+conexample.prepare()
+app = conexample.api
@@ -0,0 +1,85 @@
+"""In-process caching primitives"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from time import monotonic
+
+
+@dataclass
+class CacheStats:
+    """Cache usage counters."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    size: int = 0
+
+
+class LRUCache:
+    """Thread safe least recently used cache with optional entries time to live.
+
+    Entries above maxsize are evicted in least recently used order. When ttl (in seconds) is set,
+    entries older than ttl are treated as absent."""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key, default=None):
+        """Returns cached value for the key or default, if there is no valid value cached."""
+
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                self._stats.misses += 1
+                return default
+
+            if expires is not None and expires <= monotonic():
+                del self._data[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Stores the value under the key, evicting least recently used entries if needed."""
+
+        if self.maxsize <= 0:
+            return
+
+        expires = monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def pop(self, key):
+        """Removes the key from the cache, if present."""
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Removes all entries from the cache."""
+
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def stats(self):
+        """Returns snapshot of the cache usage counters."""
+
+        with self._lock:
+            return replace(self._stats, size=len(self._data))
@@ -1,30 +1,104 @@
 """Application domain logic"""
+import asyncio
 import logging
+import threading
 from functools import wraps
+from inspect import isasyncgenfunction, iscoroutinefunction, isgeneratorfunction
+from time import monotonic, perf_counter
 
+from . import SETTINGS, metrics
 from .interface import (
+    AsyncCore,
     Core,
-    CoreEntry,
+    CoreEntryDetails,
     CoreEntryNotFound,
+    CoreEntryWriteResult,
+    CoreEntryWriteStatus,
+    CoreException,
     CoreInternalError,
     CoreInvalidRequest,
+    CoreRatingStats,
     DatabaseEntryNotFound,
     DatabaseException,
 )
+from .search import SearchIndex
 
 LOGGER = logging.getLogger("core")
 
 
 def request_context(func):
-    """Decorator handling common request errands"""
+    """Decorator handling common request errands. Calls are timed and their errors counted in the
+    core layer metrics of the served operation. Generators are not timed, as their consumers are
+    interleaved with them."""
+
+    if isasyncgenfunction(func):
+
+        @wraps(func)
+        async def async_generator_wrapper(*args, **kwargs):
+            try:
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                except DatabaseException as ex:
+                    LOGGER.error("Internal error: %s", ex)
+                    raise CoreInternalError(ex)
+            except Exception as ex:
+                metrics.observe_operation("core", error=ex)
+                raise
+
+        return async_generator_wrapper
+
+    if iscoroutinefunction(func):
+
+        @wraps(func)
+        async def coroutine_wrapper(*args, **kwargs):
+            started = perf_counter()
+            error = None
+            try:
+                return await func(*args, **kwargs)
+            except DatabaseException as ex:
+                LOGGER.error("Internal error: %s", ex)
+                error = CoreInternalError(ex)
+                raise error
+            except Exception as ex:
+                error = ex
+                raise
+            finally:
+                metrics.observe_operation("core", perf_counter() - started, error)
+
+        return coroutine_wrapper
+
+    if isgeneratorfunction(func):
+
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            try:
+                try:
+                    yield from func(*args, **kwargs)
+                except DatabaseException as ex:
+                    LOGGER.error("Internal error: %s", ex)
+                    raise CoreInternalError(ex)
+            except Exception as ex:
+                metrics.observe_operation("core", error=ex)
+                raise
+
+        return generator_wrapper
 
     @wraps(func)
     def wrapper(*args, **kwargs):
+        started = perf_counter()
+        error = None
         try:
             return func(*args, **kwargs)
         except DatabaseException as ex:
             LOGGER.error("Internal error: %s", ex)
-            raise CoreInternalError(ex)
+            error = CoreInternalError(ex)
+            raise error
+        except Exception as ex:
+            error = ex
+            raise
+        finally:
+            metrics.observe_operation("core", perf_counter() - started, error)
 
     return wrapper
 
@@ -37,6 +111,7 @@ class ApplicationCore(Core):
     def __init__(self, database):
         # pylint: disable=super-init-not-called
         self.database = database
+        self.search_index = SearchIndex(float(SETTINGS["CORE_SEARCH_INDEX_TTL"] or 0))
 
     @request_context
     def get_rating(self, name):
@@ -46,21 +121,262 @@ class ApplicationCore(Core):
             raise CoreEntryNotFound()
 
     @request_context
-    def set_entry_rating(self, name, rating):
+    def get_entry(self, name):
+        try:
+            entry = self.database.get_entry(name)
+        except DatabaseEntryNotFound:
+            raise CoreEntryNotFound()
 
+        return CoreEntryDetails(
+            name=entry.name, rating=entry.rating, modified=entry.modified
+        )
+
+    @staticmethod
+    def _validate_rating(name, rating):
         if name == "cassandra" and rating > 1:
             raise CoreInvalidRequest("cassandra cannot be rated above 1")
 
-        return self.database.set_entry_rating(name, rating)
+    @request_context
+    def set_entry_rating(self, name, rating):
+
+        self._validate_rating(name, rating)
+
+        created = self.database.set_entry_rating(name, rating)
+        if created:
+            self.search_index.update(added=[name])
+
+        return created
+
+    @classmethod
+    def _validate_entries(cls, entries):
+        """Returns results list with rejected entries results filled in, and (index, entry) pairs
+        of the accepted entries."""
+
+        results = []
+        accepted = []
+
+        for entry in entries:
+            try:
+                cls._validate_rating(entry.name, entry.rating)
+            except CoreInvalidRequest as ex:
+                results.append(
+                    CoreEntryWriteResult(
+                        name=entry.name,
+                        status=CoreEntryWriteStatus.REJECTED,
+                        details=str(ex),
+                    )
+                )
+            else:
+                accepted.append((len(results), entry))
+                results.append(None)
+
+        return results, accepted
+
+    @staticmethod
+    def _fill_write_results(results, accepted, created):
+        for (index, entry), entry_created in zip(accepted, created):
+            results[index] = CoreEntryWriteResult(
+                name=entry.name,
+                status=CoreEntryWriteStatus.CREATED
+                if entry_created
+                else CoreEntryWriteStatus.UPDATED,
+            )
+
+        return results
+
+    @staticmethod
+    def _created_names(accepted, created):
+        return [
+            entry.name
+            for (_, entry), entry_created in zip(accepted, created)
+            if entry_created
+        ]
+
+    @request_context
+    def set_entries_rating(self, entries):
+
+        results, accepted = self._validate_entries(entries)
+
+        if accepted:
+            created = self.database.set_entries_rating(
+                [(entry.name, entry.rating) for _, entry in accepted]
+            )
+            self._fill_write_results(results, accepted, created)
+            self.search_index.update(added=self._created_names(accepted, created))
+
+        return results
 
     @request_context
     def delete_entry(self, name):
         if not self.database.delete_entry(name):
             raise CoreEntryNotFound()
 
+        self.search_index.update(removed=[name])
+
     @request_context
-    def get_entries(self):
-        return [
-            CoreEntry(name=entry.name, rating=entry.rating)
-            for entry in self.database.get_entries()
-        ]
+    def get_entries(self, limit=None, after=None):
+        return self.database.get_entries(limit=limit, after=after)
+
+    @request_context
+    def get_top_entries(self, limit):
+        return self.database.get_top_entries(limit)
+
+    @request_context
+    def iter_entries(self, after=None):
+        yield from self.database.iter_entries(after=after)
+
+    @request_context
+    def get_entries_version(self):
+        return self.database.get_entries_version()
+
+    @staticmethod
+    def _rating_stats(histogram):
+        count = sum(histogram.values())
+        total = sum(rating * entries for rating, entries in histogram.items())
+
+        return CoreRatingStats(
+            count=count,
+            sum=total,
+            mean=total / count if count else None,
+            min=min(histogram, default=None),
+            max=max(histogram, default=None),
+            histogram=dict(sorted(histogram.items())),
+        )
+
+    @request_context
+    def get_rating_stats(self):
+        return self._rating_stats(self.database.get_rating_histogram())
+
+    @request_context
+    def load_search_index(self):
+        self.search_index.load(entry.name for entry in self.database.iter_entries())
+
+    def _reload_search_index(self):
+        try:
+            self.load_search_index()
+        except CoreException as ex:
+            LOGGER.error("Failed to reload search index: %s", ex)
+
+    @request_context
+    def search_entries(self, query, limit):
+        if not self.search_index.loaded:
+            self.load_search_index()
+        elif self.search_index.stale:
+            # Stale index keeps serving searches until reloaded
+            threading.Thread(
+                target=self._reload_search_index, name="search-index", daemon=True
+            ).start()
+
+        return self.search_index.search(query, limit)
+
+    @request_context
+    def warm_up(self, connections, hot_entries):
+        self.database.warm_up(connections, hot_entries)
+
+
+class AsyncApplicationCore(AsyncCore):
+    """Implements application domain core logic on top of the asynchronous database handler. Domain
+    rules are shared with ApplicationCore."""
+
+    # pylint: disable=protected-access
+
+    def __init__(self, database):
+        # pylint: disable=super-init-not-called
+        self.database = database
+        self.search_index = SearchIndex(float(SETTINGS["CORE_SEARCH_INDEX_TTL"] or 0))
+
+    @request_context
+    async def get_entry(self, name):
+        try:
+            entry = await self.database.get_entry(name)
+        except DatabaseEntryNotFound:
+            raise CoreEntryNotFound()
+
+        return CoreEntryDetails(
+            name=entry.name, rating=entry.rating, modified=entry.modified
+        )
+
+    @request_context
+    async def set_entry_rating(self, name, rating):
+
+        ApplicationCore._validate_rating(name, rating)
+
+        created = await self.database.set_entry_rating(name, rating)
+        if created:
+            self.search_index.update(added=[name])
+
+        return created
+
+    @request_context
+    async def set_entries_rating(self, entries):
+
+        results, accepted = ApplicationCore._validate_entries(entries)
+
+        if accepted:
+            created = await self.database.set_entries_rating(
+                [(entry.name, entry.rating) for _, entry in accepted]
+            )
+            ApplicationCore._fill_write_results(results, accepted, created)
+            self.search_index.update(
+                added=ApplicationCore._created_names(accepted, created)
+            )
+
+        return results
+
+    @request_context
+    async def delete_entry(self, name):
+        if not await self.database.delete_entry(name):
+            raise CoreEntryNotFound()
+
+        self.search_index.update(removed=[name])
+
+    @request_context
+    async def get_entries(self, limit=None, after=None):
+        return await self.database.get_entries(limit=limit, after=after)
+
+    @request_context
+    async def get_top_entries(self, limit):
+        return await self.database.get_top_entries(limit)
+
+    @request_context
+    async def iter_entries(self, after=None):
+        async for entry in self.database.iter_entries(after=after):
+            yield entry
+
+    @request_context
+    async def get_entries_version(self):
+        return await self.database.get_entries_version()
+
+    @request_context
+    async def get_rating_stats(self):
+        return ApplicationCore._rating_stats(await self.database.get_rating_histogram())
+
+    @request_context
+    async def load_search_index(self):
+        requested = monotonic()
+        names = [entry.name async for entry in self.database.iter_entries()]
+
+        # Index is built off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.search_index.load, names, requested
+        )
+
+    async def _reload_search_index(self):
+        try:
+            await self.load_search_index()
+        except CoreException as ex:
+            LOGGER.error("Failed to reload search index: %s", ex)
+
+    @request_context
+    async def search_entries(self, query, limit):
+        if not self.search_index.loaded:
+            await self.load_search_index()
+        elif self.search_index.stale:
+            # Stale index keeps serving searches until reloaded
+            asyncio.ensure_future(self._reload_search_index())
+
+        return self.search_index.search(query, limit)
+
+    @request_context
+    async def warm_up(self, connections, hot_entries):
+        await self.database.warm_up(connections, hot_entries)
@@ -0,0 +1,142 @@
+"""Write batching database handler implementation"""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from time import monotonic
+
+from ... import SETTINGS
+from ...interface import Database, DatabaseException
+
+LOGGER = logging.getLogger("db.batch")
+
+
+@dataclass
+class BatchStats:
+    """Write batching counters."""
+
+    batches: int = 0
+    writes: int = 0
+
+
+class BatchingDatabase(Database):
+    """Database handler committing concurrent single entry writes together (group commit).
+
+    Writes of set_entry_rating are queued and committed by a background flusher thread with a single
+    set_entries_rating call of the wrapped database handler, once size writes are queued or delay
+    seconds after the first queued write. Every caller waits for the commit of its write and gets
+    its own result. Writes are applied in the queue order, so the last queued rating of a name wins
+    and only its first write in the batch may be reported as created. Failure of the batch is raised
+    to all of its callers. Other calls are passed to the wrapped handler directly.
+
+    Batching pays off with multiple threads writing in a worker process (threaded WSGI workers or
+    the ASGI database thread pool). Sequential writes are only delayed by it."""
+
+    def __init__(self, database, size=None, delay=None):
+        self.database = database
+
+        self.size = size or int(SETTINGS["DATABASE_BATCH_SIZE"] or 0) or 1
+        self.delay = (
+            delay if delay is not None else float(SETTINGS["DATABASE_BATCH_DELAY"] or 0)
+        )
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self._stats = BatchStats()
+
+    @property
+    def stats(self):
+        """Returns write batching counters."""
+        with self._lock:
+            return replace(self._stats)
+
+    def _pending(self):
+        """Returns queue of pending writes. The flusher thread is started on first write of the
+        process, thus, after forking."""
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.SimpleQueue()
+                threading.Thread(
+                    target=self._flusher,
+                    args=(self._queue,),
+                    name="db-batch",
+                    daemon=True,
+                ).start()
+
+            return self._queue
+
+    def _flusher(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = monotonic() + self.delay
+
+            while len(batch) < self.size:
+                try:
+                    batch.append(pending.get(timeout=max(deadline - monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Commits the batch and resolves futures of all its writes. Never raises, so the flusher
+        thread outlives failed batches."""
+
+        try:
+            created = self.database.set_entries_rating(
+                [(name, rating) for name, rating, _ in batch]
+            )
+
+            if len(created) != len(batch):
+                raise DatabaseException(
+                    "%d results returned for %d writes" % (len(created), len(batch))
+                )
+
+            with self._lock:
+                self._stats.batches += 1
+                self._stats.writes += len(batch)
+
+            for (_, _, future), result in zip(batch, created):
+                future.set_result(result)
+        except Exception as ex:  # pylint: disable=broad-except
+            LOGGER.debug("Batch of %d writes failed: %s", len(batch), ex)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(ex)
+
+    def set_entry_rating(self, name, rating):
+        future = Future()
+        self._pending().put((name, rating, future))
+        return future.result()
+
+    def get_entry(self, name):
+        return self.database.get_entry(name)
+
+    def set_entries_rating(self, entries):
+        return self.database.set_entries_rating(entries)
+
+    def delete_entry(self, name):
+        return self.database.delete_entry(name)
+
+    def get_entries(self, limit=None, after=None):
+        return self.database.get_entries(limit=limit, after=after)
+
+    def get_top_entries(self, limit):
+        return self.database.get_top_entries(limit)
+
+    def get_entries_version(self):
+        return self.database.get_entries_version()
+
+    def get_rating_histogram(self):
+        return self.database.get_rating_histogram()
+
+    def iter_entries(self, after=None):
+        return self.database.iter_entries(after=after)
+
+    def warm_up(self, connections, hot_entries):
+        return self.database.warm_up(connections, hot_entries)
@@ -0,0 +1,151 @@
+"""Read-through caching database handler implementation"""
+import logging
+import threading
+
+from ... import SETTINGS
+from ...cache import LRUCache
+from ...interface import Database
+
+LOGGER = logging.getLogger("db.cache")
+
+# Number of distinct entries listing pages kept in the cache
+LISTINGS_CACHE_SIZE = 32
+
+
+class CachedDatabase(Database):
+    """Database handler serving reads of the wrapped database handler from an in-process LRU cache.
+
+    Entries are cached for at most ttl seconds, thus, with multiple worker processes, changes made
+    by other processes become visible after that time. Changes made through the handler itself
+    invalidate affected cache entries immediately. Zero size or ttl disables the cache."""
+
+    def __init__(self, database, size=None, ttl=None):
+        self.database = database
+
+        size = size if size is not None else int(SETTINGS["DATABASE_CACHE_SIZE"] or 0)
+        ttl = ttl if ttl is not None else float(SETTINGS["DATABASE_CACHE_TTL"] or 0)
+
+        if ttl <= 0:
+            # Entries cached forever would never show changes made by other processes
+            size = 0
+
+        self._entries = LRUCache(size, ttl)
+        self._listings = LRUCache(LISTINGS_CACHE_SIZE if size else 0, ttl)
+
+        # Incremented by every invalidation, so values loaded before it are not cached after it
+        self._generation = 0
+        # Newest entries version loaded from the wrapped handler
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """Returns cache usage counters."""
+        return {"entries": self._entries.stats, "listings": self._listings.stats}
+
+    def _invalidate(self, name):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(name)
+            self._listings.clear()
+
+    def _observe_version(self, version):
+        """Drops cached listings when a newer entries version is loaded, so listings cached from
+        an older version are never served along with the newer one."""
+
+        with self._lock:
+            if self._version is not None and version > self._version:
+                self._generation += 1
+                self._listings.clear()
+
+            if self._version is None or version > self._version:
+                self._version = version
+
+    def _store(self, cache, key, value, generation):
+        """Caches the value loaded in the generation, unless cache was invalidated meanwhile."""
+
+        with self._lock:
+            if generation == self._generation:
+                cache.set(key, value)
+
+    def get_entry(self, name):
+        entry = self._entries.get(name)
+
+        if entry is None:
+            generation = self._generation
+            entry = self.database.get_entry(name)
+            self._store(self._entries, name, entry, generation)
+
+        return entry
+
+    def set_entry_rating(self, name, rating):
+        try:
+            return self.database.set_entry_rating(name, rating)
+        finally:
+            self._invalidate(name)
+
+    def set_entries_rating(self, entries):
+        entries = list(entries)
+
+        try:
+            return self.database.set_entries_rating(entries)
+        finally:
+            for name, _ in entries:
+                self._invalidate(name)
+
+    def delete_entry(self, name):
+        try:
+            return self.database.delete_entry(name)
+        finally:
+            self._invalidate(name)
+
+    def get_entries(self, limit=None, after=None):
+        entries = self._listings.get((limit, after))
+
+        if entries is None:
+            generation = self._generation
+            entries = tuple(self.database.get_entries(limit=limit, after=after))
+            self._store(self._listings, (limit, after), entries, generation)
+
+        return entries
+
+    def get_top_entries(self, limit):
+        entries = self._listings.get(("top", limit))
+
+        if entries is None:
+            generation = self._generation
+            entries = tuple(self.database.get_top_entries(limit))
+            self._store(self._listings, ("top", limit), entries, generation)
+
+        return entries
+
+    def get_entries_version(self):
+        version = self._listings.get("version")
+
+        if version is None:
+            version = self.database.get_entries_version()
+            self._observe_version(version)
+            self._store(self._listings, "version", version, self._generation)
+
+        return version
+
+    def get_rating_histogram(self):
+        histogram = self._listings.get("histogram")
+
+        if histogram is None:
+            generation = self._generation
+            histogram = self.database.get_rating_histogram()
+            self._store(self._listings, "histogram", histogram, generation)
+
+        return dict(histogram)
+
+    def iter_entries(self, after=None):
+        # Streamed listings are meant to be too large to be cached
+        return self.database.iter_entries(after=after)
+
+    def warm_up(self, connections, hot_entries):
+        # Hot entries are read through the cache, so they are cached
+        self.database.warm_up(connections, 0)
+
+        for entry in self.get_top_entries(hot_entries) if hot_entries else ():
+            self.get_entry(entry.name)
@@ -1,22 +1,69 @@
 """SQL database handler implementation"""
 import logging
+from collections import Counter
 from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
 
 import sqlalchemy.exc
+from sqlalchemy import literal_column, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import scoped_session
 
+from ... import metrics
 from ...interface import (
+    READ_ROUTING,
     Database,
     DatabaseEntryNotFound,
     DatabaseException,
     DatabaseStorageUnavailable,
+    EntryRecord,
 )
 from . import db
-from .models import Entry
+from .models import Entry, RatingCount, TableVersion
 
 LOGGER = logging.getLogger("db.sql")
 
 
+# Maximum number of entries written with a single bulk upsert statement
+POSTGRESQL_BULK_CHUNK = 1000
+
+# Number of rows fetched at once from the server side cursor while streaming entries
+STREAM_BATCH_SIZE = 1000
+
+# Maximum number of entries locked with a single select statement
+LOCK_CHUNK = 500
+
+# Number of attempts of the write before giving up on concurrent creations of its entries
+WRITE_ATTEMPTS = 3
+
+
+class _ConcurrentCreation(Exception):
+    """Entry missing when the write started was created by a concurrent write."""
+
+
+def _postgresql_upsert(entries):
+    """Returns single statement upsert of the (name, rating) pairs. Names must be unique. The
+    statement returns (name, created) rows."""
+
+    # The dialect is imported by the engines of PostgreSQL databases only, not by the module
+    from sqlalchemy.dialects import (
+        postgresql,
+    )  # pylint: disable=import-outside-toplevel
+
+    statement = postgresql.insert(Entry.__table__).values(
+        [{"name": name, "rating": rating} for name, rating in entries]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[Entry.__table__.c.name],
+        set_={"rating": statement.excluded.rating, "modified": datetime.utcnow()},
+    ).returning(
+        Entry.__table__.c.name,
+        # xmax of freshly inserted row version is always 0
+        literal_column("xmax = 0"),
+    )
+
+
 class SQLDatabase(Database):
     """SQLAlchemy based database handler"""
 
@@ -31,14 +78,47 @@ class SQLDatabase(Database):
             if db.Session.kw["bind"] is None:
                 engine = db.create_engine()
                 db.session_bind(engine)
+                db.replicas_bind(db.create_replica_engines())
             self._session_maker = scoped_session(db.Session)
         return self._session_maker
 
+    @staticmethod
+    def _replica_session():
+        """Returns (session, engine) of a read replica serving reads of the current request, or
+        (None, None) if the reads are served by the primary database. Replica which fails to
+        connect is skipped by the following reads for DATABASE_SQL_REPLICA_RETRY seconds."""
+
+        routing = READ_ROUTING.get()
+        if routing is not None and routing.primary:
+            return None, None
+
+        for engine in db.Replicas.candidates(routing.replica if routing else None):
+            session = db.Session(bind=engine)
+            try:
+                session.connection()
+            except sqlalchemy.exc.OperationalError as ex:
+                session.close()
+                LOGGER.warning("Read replica %r unavailable: %s", engine.url, ex)
+                db.Replicas.mark_failed(engine)
+                continue
+
+            if routing is not None:
+                routing.replica = engine
+            return session, engine
+
+        return None, None
+
     @contextmanager
     def session(self, write=False):
-        """Provide a transactional scope around a series of operations."""
+        """Provide a transactional scope around a series of operations. Read-only sessions are
+        served by the read replicas, if any. Sessions are timed and their errors counted in the
+        database layer metrics of the served operation."""
 
-        session = self.session_maker()  # pylint: disable=not-callable
+        started = perf_counter()
+        error = None
+        session_maker = self.session_maker
+        session, replica = (None, None) if write else self._replica_session()
+        session = session or session_maker()  # pylint: disable=not-callable
 
         try:
             yield session
@@ -46,12 +126,20 @@ class SQLDatabase(Database):
                 session.commit()
         except sqlalchemy.exc.OperationalError as ex:
             session.rollback()
-            raise DatabaseStorageUnavailable(ex)
+            if replica is not None:
+                db.Replicas.mark_failed(replica)
+            error = DatabaseStorageUnavailable(ex)
+            raise error
         except sqlalchemy.exc.SQLAlchemyError as ex:  # WTF case
             session.rollback()
-            raise DatabaseException(ex)
+            error = DatabaseException(ex)
+            raise error
+        except Exception as ex:
+            error = ex
+            raise
         finally:
             session.close()
+            metrics.observe_operation("database", perf_counter() - started, error)
 
     def get_entry(self, name):
         with self.session() as session:
@@ -62,28 +150,291 @@ class SQLDatabase(Database):
 
             return entry.as_database_entry()
 
-    def set_entry_rating(self, name: str, rating: int):
-        with self.session(write=True) as session:
-            entry = session.query(Entry).filter(Entry.name == name).one_or_none()
+    @staticmethod
+    def _update_or_insert(session, update, insert):
+        """Portable upsert. Executes the update statement, or the insert statement if no row was
+        updated. Concurrent insertion of the same row is resolved by falling back to update when
+        insert violates uniqueness constraint. Returns True if the row was inserted."""
 
-            if entry:
-                entry.rating = rating
-                return False
+        # Most of the writes are updates, so try to update first
+        if session.execute(update).rowcount:
+            return False
 
-            session.add(Entry(name=name, rating=rating))
-            return True
+        try:
+            with session.begin_nested():
+                session.execute(insert)
+        except sqlalchemy.exc.IntegrityError:
+            session.execute(update)
+            return False
+
+        return True
+
+    @classmethod
+    def _bump_entries_version(cls, session):
+        """Increments entries table version in the scope of the session transaction.
+
+        The version row stays locked until the transaction is committed, thus, concurrent writers
+        are serialized on it. Versions taken from a sequence would not be, but sequence values are
+        not assigned in the commit order, so readers could miss changes committed after a higher
+        version had been observed. The update is the last statement of every write, so the row is
+        locked for the commit only."""
+
+        table = TableVersion.__table__
+        cls._update_or_insert(
+            session,
+            table.update()
+            .where(table.c.table_name == Entry.__tablename__)
+            .values(version=table.c.version + 1),
+            table.insert().values(table_name=Entry.__tablename__, version=1),
+        )
+
+    @staticmethod
+    def _lock_sqlite(session):
+        """Takes the database write lock in the scope of the session transaction, if the database
+        is SQLite. SQLite ignores FOR UPDATE, and locks the whole database for writes instead, so
+        the lock is taken by a write matching no rows, before anything is read."""
+
+        if session.get_bind().dialect.name == "sqlite":
+            table = RatingCount.__table__
+            session.execute(
+                table.update()
+                .where(table.c.rating.is_(None))
+                .values(count=table.c.count)
+            )
+
+    @classmethod
+    def _lock_ratings(cls, session, names):
+        """Returns {name: rating} of the existing entries of the names, locked until the session
+        transaction ends. Entries are locked in the name order, as the upserts do."""
+
+        cls._lock_sqlite(session)
+
+        table = Entry.__table__
+        names = sorted(set(names))
+        ratings = {}
+
+        for offset in range(0, len(names), LOCK_CHUNK):
+            query = (
+                select([table.c.name, table.c.rating])
+                .where(table.c.name.in_(names[offset : offset + LOCK_CHUNK]))
+                .order_by(table.c.name)
+                .with_for_update()
+            )
+            ratings.update(session.execute(query).fetchall())
+
+        return ratings
+
+    @staticmethod
+    def _rating_deltas(previous, entries, created):
+        """Returns changes of the rating counts made by the upsert of the (name, rating) pairs,
+        given previous ratings of the entries and the upsert flags. Raises _ConcurrentCreation if
+        an entry missing from previous ratings was not created by the upsert. Its rating set by
+        the concurrent write is unknown then."""
+
+        created_names = {name for (name, _), flag in zip(entries, created) if flag}
+        deltas = Counter()
+
+        for name, rating in dict(entries).items():
+            if name in previous:
+                deltas[previous[name]] -= 1
+            elif name not in created_names:
+                raise _ConcurrentCreation(name)
+            deltas[rating] += 1
+
+        return deltas
+
+    @classmethod
+    def _update_rating_counts(cls, session, deltas):
+        """Applies the {rating: delta} changes to the rating counts in the scope of the session
+        transaction. Counts are locked in the rating order by all the writers, so concurrent
+        writes cannot deadlock on them."""
+
+        table = RatingCount.__table__
+
+        for rating, delta in sorted(deltas.items()):
+            if delta:
+                cls._update_or_insert(
+                    session,
+                    table.update()
+                    .where(table.c.rating == rating)
+                    .values(count=table.c.count + delta),
+                    table.insert().values(rating=rating, count=delta),
+                )
+
+    @classmethod
+    def _upsert_entry(cls, session, name, rating):
+        """Creates or updates the entry in the scope of the session transaction. Returns True if the
+        entry was created."""
+
+        if session.get_bind().dialect.name == "postgresql":
+            return session.execute(_postgresql_upsert([(name, rating)])).first()[1]
+
+        table = Entry.__table__
+        return cls._update_or_insert(
+            session,
+            table.update().where(table.c.name == name).values(rating=rating),
+            table.insert().values(name=name, rating=rating),
+        )
+
+    @classmethod
+    def _upsert_entries(cls, session, entries):
+        """Creates or updates the entries in the scope of the session transaction. Returns list of
+        flags, True for pairs that created the entry."""
+
+        if session.get_bind().dialect.name != "postgresql":
+            return [
+                cls._upsert_entry(session, name, rating) for name, rating in entries
+            ]
+
+        # Single statement cannot touch the same row twice, so only the last rating of every name
+        # is written, and the rest of occurrences are reported as updates.
+        ratings = dict(entries)
+        # Rows are locked in the same order by all the writers, so concurrent batches cannot
+        # deadlock on each other
+        names = sorted(ratings)
+        created = {}
+
+        for offset in range(0, len(names), POSTGRESQL_BULK_CHUNK):
+            chunk = names[offset : offset + POSTGRESQL_BULK_CHUNK]
+            created.update(
+                session.execute(
+                    _postgresql_upsert([(name, ratings[name]) for name in chunk])
+                ).fetchall()
+            )
+
+        return [created.pop(name, False) for name, _ in entries]
+
+    def _set_ratings(self, entries):
+        """Upserts the (name, rating) pairs along with the rating counts and the entries version
+        in a single transaction. Returns the upsert flags.
+
+        Previous ratings of the entries are locked before the upsert, so they stay valid for the
+        counts update. Entries missing then may be created by a concurrent write before the upsert,
+        and the transaction is retried with their ratings locked."""
+
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                with self.session(write=True) as session:
+                    previous = self._lock_ratings(
+                        session, [name for name, _ in entries]
+                    )
+                    created = self._upsert_entries(session, entries)
+                    self._update_rating_counts(
+                        session, self._rating_deltas(previous, entries, created)
+                    )
+                    self._bump_entries_version(session)
+                    return created
+            except _ConcurrentCreation as ex:
+                LOGGER.debug("Entry %s created concurrently (attempt %d)", ex, attempt)
+
+        raise DatabaseException("Entries repeatedly created by concurrent writes")
+
+    def set_entry_rating(self, name: str, rating: int):
+        return self._set_ratings([(name, rating)])[0]
+
+    def set_entries_rating(self, entries):
+        return self._set_ratings(list(entries))
 
     def delete_entry(self, name: str):
         with self.session(write=True) as session:
-            entry = session.query(Entry).filter(Entry.name == name).one_or_none()
+            self._lock_sqlite(session)
+            entry = (
+                session.query(Entry)
+                .filter(Entry.name == name)
+                .with_for_update()
+                .one_or_none()
+            )
 
             if not entry:
                 return False
 
             session.delete(entry)
+            self._update_rating_counts(session, {entry.rating: -1})
+            self._bump_entries_version(session)
             return True
 
-    def get_entries(self):
+    def get_entries_version(self):
+        table = TableVersion.__table__
+        query = select([table.c.version]).where(
+            table.c.table_name == Entry.__tablename__
+        )
+
         with self.session() as session:
-            entries = session.query(Entry).all()
-            return [entry.as_database_entry() for entry in entries]
+            return session.execute(query).scalar() or 0
+
+    def get_rating_histogram(self):
+        table = RatingCount.__table__
+        query = (
+            select([table.c.rating, table.c.count])
+            .where(table.c.count > 0)
+            .order_by(table.c.rating)
+        )
+
+        with self.session() as session:
+            return dict(session.execute(query).fetchall())
+
+    @staticmethod
+    def _entries_query(after):
+        """Returns ORM-free query of listed entries columns."""
+
+        table = Entry.__table__
+        query = select([table.c.name, table.c.rating]).order_by(table.c.name)
+
+        if after is not None:
+            query = query.where(table.c.name > after)
+
+        return query
+
+    def get_entries(self, limit=None, after=None):
+        query = self._entries_query(after)
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        with self.session() as session:
+            return [EntryRecord(*row) for row in session.execute(query)]
+
+    def get_top_entries(self, limit):
+        # Ordered the same way as the (rating DESC, name) index, so the rows are read from the
+        # index and the scan stops after limit rows
+        table = Entry.__table__
+        query = (
+            select([table.c.name, table.c.rating])
+            .order_by(table.c.rating.desc(), table.c.name)
+            .limit(limit)
+        )
+
+        with self.session() as session:
+            return [EntryRecord(*row) for row in session.execute(query)]
+
+    def iter_entries(self, after=None):
+        # Uses server side cursor where supported by the database driver
+        query = self._entries_query(after).execution_options(
+            stream_results=True, max_row_buffer=STREAM_BATCH_SIZE
+        )
+
+        with self.session() as session:
+            for row in session.execute(query):
+                yield EntryRecord(*row)
+
+    def warm_up(self, connections, hot_entries):
+        # Engines configured by the settings are created by the session maker
+        bind = self.session_maker.session_factory.kw["bind"]
+
+        if isinstance(bind, Engine):
+            try:
+                db.engine_warm_up(bind, connections)
+            except sqlalchemy.exc.OperationalError as ex:
+                raise DatabaseStorageUnavailable(ex)
+            except sqlalchemy.exc.SQLAlchemyError as ex:
+                raise DatabaseException(ex)
+
+        for engine in db.Replicas.engines:
+            try:
+                db.engine_warm_up(engine, connections)
+            except sqlalchemy.exc.OperationalError as ex:
+                LOGGER.warning("Read replica %r unavailable: %s", engine.url, ex)
+                db.Replicas.mark_failed(engine)
+
+        for entry in self.get_top_entries(hot_entries) if hot_entries else ():
+            self.get_entry(entry.name)
@@ -0,0 +1,75 @@
+"""Asynchronous SQL database handler implementation"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+
+from ... import SETTINGS
+from ...interface import AsyncDatabase
+from . import STREAM_BATCH_SIZE, SQLDatabase
+
+
+class AsyncSQLDatabase(AsyncDatabase):
+    """Asynchronous database handler running calls of the SQL database handler on a bounded thread
+    pool.
+
+    SQLAlchemy 1.3 has no asyncio support, thus, blocking calls are offloaded to worker threads,
+    the same way aiosqlite does. Number of threads follows the connection pool limits, so calls
+    occupying threads never wait for pooled connections."""
+
+    def __init__(self, database=None, max_workers=None):
+        self.database = database or SQLDatabase()
+
+        max_workers = max_workers or (
+            int(SETTINGS["DATABASE_SQL_CONNECTION_POOL"] or 0)
+            + int(SETTINGS["DATABASE_SQL_POOL_OVERFLOW"] or 0)
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or None, thread_name_prefix="db"
+        )
+
+    async def _run(self, func, *args, **kwargs):
+        # Executor does not propagate context variables, READ_ROUTING of the request included
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, partial(copy_context().run, func, *args, **kwargs)
+        )
+
+    async def get_entry(self, name):
+        return await self._run(self.database.get_entry, name)
+
+    async def set_entry_rating(self, name, rating):
+        return await self._run(self.database.set_entry_rating, name, rating)
+
+    async def set_entries_rating(self, entries):
+        return await self._run(self.database.set_entries_rating, list(entries))
+
+    async def delete_entry(self, name):
+        return await self._run(self.database.delete_entry, name)
+
+    async def get_entries(self, limit=None, after=None):
+        return await self._run(self.database.get_entries, limit=limit, after=after)
+
+    async def get_top_entries(self, limit):
+        return await self._run(self.database.get_top_entries, limit)
+
+    async def iter_entries(self, after=None):
+        # Entries are fetched in keyset pages, so no connection is held between the pages
+        while True:
+            entries = await self.get_entries(limit=STREAM_BATCH_SIZE, after=after)
+
+            for entry in entries:
+                yield entry
+
+            if len(entries) < STREAM_BATCH_SIZE:
+                return
+
+            after = entries[-1].name
+
+    async def get_entries_version(self):
+        return await self._run(self.database.get_entries_version)
+
+    async def get_rating_histogram(self):
+        return await self._run(self.database.get_rating_histogram)
+
+    async def warm_up(self, connections, hot_entries):
+        await self._run(self.database.warm_up, connections, hot_entries)
@@ -1,12 +1,138 @@
 """Basic SQLAlchemy database entities"""
+import logging
+import threading
+from time import monotonic, perf_counter
+
 from sqlalchemy import create_engine as create_engine_full
+from sqlalchemy import event, literal, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from ... import SETTINGS, metrics
+
+POOL_CONNECTS = metrics.counter(
+    "db_pool_connects", "Connections opened by the pool", ["database"]
+)
+POOL_OVERFLOW_CONNECTS = metrics.counter(
+    "db_pool_overflow_connects",
+    "Connections opened by the pool above its size",
+    ["database"],
+)
+POOL_CHECKOUTS = metrics.counter(
+    "db_pool_checkouts", "Connections checked out from the pool", ["database"]
+)
+POOL_CHECKINS = metrics.counter(
+    "db_pool_checkins", "Connections returned to the pool", ["database"]
+)
+POOL_CHECKED_OUT = metrics.gauge(
+    "db_pool_checked_out", "Connections currently checked out", ["database"]
+)
+POOL_OVERFLOW = metrics.gauge(
+    "db_pool_overflow", "Connections currently open above the pool size", ["database"]
+)
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time of waiting for a connection of the pool",
+    ["database"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+
+
+QUERY_DURATION = metrics.histogram(
+    "db_query_duration_seconds",
+    "Time of the database statements execution",
+    ["operation", "database"],
+    buckets=metrics.LATENCY_BUCKETS,
+)
+
+SLOW_QUERY_LOGGER = logging.getLogger("db.sql.slow")
+
+
+class TimedQueuePool(QueuePool):
+    """Queue pool measuring the time of waiting for a connection. Subclassed per database, with
+    the database name, so the name survives pool recreation on engine dispose."""
+
+    database = None
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.database).observe(perf_counter() - started)
+
+
+def _instrument_pool(engine, database):
+    """Counts events of the engine pool. Listeners are kept by the pool recreated on dispose."""
+
+    def overflow():
+        return (
+            max(engine.pool.overflow(), 0) if isinstance(engine.pool, QueuePool) else 0
+        )
+
+    def on_connect(*_):
+        POOL_CONNECTS.labels(database).inc()
+        if overflow():
+            POOL_OVERFLOW_CONNECTS.labels(database).inc()
 
-from ... import SETTINGS
+    def on_checkout(*_):
+        POOL_CHECKOUTS.labels(database).inc()
+        POOL_CHECKED_OUT.labels(database).inc()
+        POOL_OVERFLOW.labels(database).set(overflow())
 
+    def on_checkin(*_):
+        POOL_CHECKINS.labels(database).inc()
+        POOL_CHECKED_OUT.labels(database).dec()
+        POOL_OVERFLOW.labels(database).set(overflow())
 
-def create_engine(pool_size=None, max_overflow=None, **kwargs):
-    """Creates SQLAlchemy Engine object.
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+
+def _instrument_queries(engine, database):
+    """Times statements executed by the engine. Statements are counted in the queries of the
+    request, if any, and these slower than DATABASE_SQL_SLOW_QUERY seconds are logged."""
+
+    threshold = float(SETTINGS["DATABASE_SQL_SLOW_QUERY"] or 0)
+
+    # pylint: disable=too-many-arguments,unused-argument
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        # Statements of a connection are executed one by one, so one start time is enough. Start
+        # time of a failed statement is overwritten by the next one
+        conn.info["query_started"] = perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration = perf_counter() - conn.info["query_started"]
+        operation = metrics.OPERATION.get()
+
+        metrics.labelled(QUERY_DURATION, operation, database).observe(duration)
+
+        queries = metrics.REQUEST_QUERIES.get()
+        if queries is not None:
+            queries.count += 1
+            queries.duration += duration
+
+        if threshold and duration >= threshold:
+            SLOW_QUERY_LOGGER.warning(
+                "Slow query of %s (%s, %.3f s): %s",
+                operation,
+                database,
+                duration,
+                " ".join(statement.split()),
+            )
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def create_engine(
+    pool_size=None, max_overflow=None, uri=None, database="primary", **kwargs
+):
+    """Creates SQLAlchemy Engine object of the database uri, DATABASE_SQL_DATABASE_URI by default.
+    Events of its connection pool and its statements are exported as metrics labelled with the
+    database name.
 
     Please note that engine should be created after process forking!
     See:
@@ -24,13 +150,126 @@ def create_engine(pool_size=None, max_overflow=None, **kwargs):
             SETTINGS["DATABASE_SQL_POOL_OVERFLOW"]
         )
 
-    return create_engine_full(SETTINGS["DATABASE_SQL_DATABASE_URI"], **kwargs)
+    # Pool limits are the queue pool parameters
+    if (
+        "pool_size" in kwargs or "max_overflow" in kwargs
+    ) and "poolclass" not in kwargs:
+        kwargs["poolclass"] = type(
+            "TimedQueuePool", (TimedQueuePool,), {"database": database}
+        )
+
+    engine = create_engine_full(uri or SETTINGS["DATABASE_SQL_DATABASE_URI"], **kwargs)
+    _instrument_pool(engine, database)
+    _instrument_queries(engine, database)
+    return engine
+
+
+def create_replica_engines():
+    """Creates SQLAlchemy Engine objects of the read replicas, DATABASE_SQL_REPLICA_URIS separated
+    by whitespace or commas."""
+
+    uris = (SETTINGS["DATABASE_SQL_REPLICA_URIS"] or "").replace(",", " ").split()
+    return [
+        create_engine(uri=uri, database="replica%d" % number)
+        for number, uri in enumerate(uris, 1)
+    ]
+
+
+class ReplicaSet:
+    """Read replica engines, selected in round-robin order. Replica which failed is skipped for
+    retry seconds, then it is tried again."""
+
+    def __init__(self, engines=(), retry=0):
+        self.engines = list(engines)
+        self.retry = retry
+        self._failed = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def candidates(self, preferred=None):
+        """Returns available replica engines in the order they should be tried. Preferred engine
+        comes first, if available, followed by the rest in round-robin order."""
+
+        now = monotonic()
+
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % (len(self.engines) or 1)
+            available = [
+                engine
+                for engine in self.engines[start:] + self.engines[:start]
+                if self._failed.get(engine, 0) <= now
+            ]
+
+        if preferred in available:
+            available.remove(preferred)
+            available.insert(0, preferred)
+
+        return available
+
+    def mark_failed(self, engine):
+        """Skips the replica engine for retry seconds."""
+
+        with self._lock:
+            self._failed[engine] = monotonic() + self.retry
+
+    def dispose(self):
+        """Disposes connection pools of the replica engines."""
+
+        for engine in self.engines:
+            engine.dispose()
 
 
 # Be conformant with SQLAlchemy naming convention
 Session = sessionmaker()  # pylint: disable=invalid-name
 
+# Read replicas of the database bound to the global session maker object
+Replicas = ReplicaSet()  # pylint: disable=invalid-name
+
 
 def session_bind(engine):
     """Binds specific engine/connection to the global session maker object"""
     Session.configure(bind=engine)
+
+
+def replicas_bind(engines):
+    """Sets the read replica engines of the engine bound to the global session maker object"""
+
+    global Replicas  # pylint: disable=global-statement,invalid-name
+    Replicas = ReplicaSet(
+        engines, retry=float(SETTINGS["DATABASE_SQL_REPLICA_RETRY"] or 0)
+    )
+
+
+def engine_dispose():
+    """Disposes connection pools of the engine bound to the global session maker object and of its
+    read replicas.
+
+    Should be called in forked worker processes, so connections opened by the parent process are
+    never shared with the workers. New connections are opened on demand."""
+
+    engine = Session.kw["bind"]
+    if isinstance(engine, Engine):
+        engine.dispose()
+
+    Replicas.dispose()
+
+
+def engine_warm_up(engine, connections):
+    """Opens connections of the engine pool, at most the pool size, and pings the database over
+    every one of them. Connections are returned to the pool afterwards, so the following requests
+    reuse them. Pools which do not keep connections open are pinged over a single connection."""
+
+    size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+    opened = []
+
+    try:
+        for _ in range(min(connections, size)):
+            opened.append(engine.connect())
+            opened[-1].scalar(select([literal(1)]))
+    finally:
+        for connection in opened:
+            connection.close()
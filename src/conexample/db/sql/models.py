@@ -1,7 +1,7 @@
 """ORM models for key registry tables"""
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
 from sqlalchemy.ext.declarative import declarative_base
 
 from ...interface import DatabaseEntry
@@ -35,3 +35,26 @@ class Entry(Base):  # pylint: disable=too-few-public-methods
             created=self.created,
             modified=self.modified,
         )
+
+
+# Serves top rated entries listings in the index order
+Index("ix_entries_rating_name", Entry.rating.desc(), Entry.name)
+
+
+class RatingCount(Base):  # pylint: disable=too-few-public-methods
+    """Rating count model. Number of entries with the rating, maintained along with every
+    modification of the entries."""
+
+    __tablename__ = "rating_counts"
+
+    rating = Column(Integer, primary_key=True, autoincrement=False)
+    count = Column(Integer, nullable=False)
+
+
+class TableVersion(Base):  # pylint: disable=too-few-public-methods
+    """Table version model. Version is incremented on every modification of the table contents."""
+
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
@@ -0,0 +1,84 @@
+"""Consistency check of the rating counts
+
+Rating counts are maintained incrementally by the writes of SQLDatabase. The check recomputes them
+from the entries table and reports the differences, optionally repairing the stored counts
+
+    python -m conexample.db.sql.stats [--repair]
+"""
+import argparse
+
+from sqlalchemy import func, select, text
+
+from . import SQLDatabase
+from .models import Entry, RatingCount
+
+
+def _stored_histogram(session):
+    table = RatingCount.__table__
+    query = select([table.c.rating, table.c.count]).where(table.c.count != 0)
+    return dict(session.execute(query).fetchall())
+
+
+def _recomputed_histogram_query():
+    table = Entry.__table__
+    return select([table.c.rating, func.count()]).group_by(table.c.rating)
+
+
+def check_rating_counts(database=None, repair=False):
+    """Returns {rating: (stored count, recomputed count)} of the ratings with stored count differing
+    from the count of the entries. If repair is set, the stored counts are replaced with the
+    recomputed ones in the same transaction.
+
+    Repair locks the rating counts against writes, so writes committed meanwhile are either counted
+    by the recomputation or applied to the repaired counts."""
+
+    database = database or SQLDatabase()
+
+    with database.session(write=repair) as session:
+        table = RatingCount.__table__
+
+        if repair and session.get_bind().dialect.name == "postgresql":
+            session.execute(text("LOCK TABLE %s IN EXCLUSIVE MODE" % table.name))
+        elif repair:
+            SQLDatabase._lock_sqlite(session)  # pylint: disable=protected-access
+
+        stored = _stored_histogram(session)
+        recomputed = dict(session.execute(_recomputed_histogram_query()).fetchall())
+
+        differences = {
+            rating: (stored.get(rating, 0), recomputed.get(rating, 0))
+            for rating in set(stored) | set(recomputed)
+            if stored.get(rating, 0) != recomputed.get(rating, 0)
+        }
+
+        if repair and differences:
+            session.execute(table.delete())
+            session.execute(
+                table.insert().from_select(
+                    [table.c.rating, table.c.count], _recomputed_histogram_query()
+                )
+            )
+
+        return differences
+
+
+def main():
+    """Checks the rating counts, exits with status 1 if they differ from the entries"""
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--repair", action="store_true", help="replace the differing counts"
+    )
+    args = parser.parse_args()
+
+    differences = check_rating_counts(repair=args.repair)
+
+    for rating, (stored, recomputed) in sorted(differences.items()):
+        print("rating %d: stored %d, recomputed %d" % (rating, stored, recomputed))
+
+    if differences and not args.repair:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
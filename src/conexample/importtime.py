@@ -0,0 +1,163 @@
+"""Cold start import time report
+
+Imports a module in a fresh interpreter with -X importtime and breaks the time down by the imported
+modules and by their top level packages. Exits with status 1 if the import took longer than the
+budget, if provided
+
+    python -m conexample.importtime [module] [--top 20] [--repeat 3] [--budget MILLISECONDS]
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict, namedtuple
+
+# Self and cumulative import times are in microseconds, depth of the top level imports is 0
+ImportTime = namedtuple("ImportTime", "name self cumulative depth")
+
+DEFAULT_MODULE = "conexample.application"
+MARKER = "-- startup completed --\n"
+
+
+def _parse(output):
+    records = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        if not self_time.strip().isdigit():
+            continue
+
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append(ImportTime(name.strip(), int(self_time), int(cumulative), depth))
+
+    return records
+
+
+def measure(module=DEFAULT_MODULE, repeat=1):
+    """Returns ImportTime records of the modules imported by the import of the module in a fresh
+    interpreter, in the order their imports completed, the module itself being the last. Modules
+    imported by the interpreter startup are left out. Of repeated imports, the fastest is
+    returned."""
+
+    fastest = None
+
+    for _ in range(repeat):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                "import sys; sys.stderr.write(%r); import %s" % (MARKER, module),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=False,
+        )
+        if process.returncode:
+            raise RuntimeError(
+                "Failed to import %s: %s" % (module, process.stderr.strip())
+            )
+
+        # Imports of the interpreter startup are reported before the marker
+        records = _parse(process.stderr.split(MARKER, 1)[1])
+
+        if fastest is None or total(records) < total(fastest):
+            fastest = records
+
+    return fastest
+
+
+def total(records):
+    """Returns total time (in microseconds) of the top level imports of the records."""
+    return sum(record.cumulative for record in records if record.depth == 0)
+
+
+def by_package(records):
+    """Returns {top level package: (number of modules, self time in microseconds)} of the
+    records."""
+
+    packages = defaultdict(lambda: (0, 0))
+
+    for record in records:
+        count, self_time = packages[record.name.split(".")[0]]
+        packages[record.name.split(".")[0]] = (count + 1, self_time + record.self)
+
+    return dict(packages)
+
+
+def _print_table(header, rows):
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [
+        max(len(row[column]) for row in [header] + rows)
+        for column in range(len(header))
+    ]
+
+    for row in [header] + rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+    print()
+
+
+def main():
+    """Reports import time of a module, by default of the application"""
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("module", nargs="?", default=DEFAULT_MODULE)
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="number of the slowest packages and modules reported",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="report the fastest of the imports"
+    )
+    parser.add_argument(
+        "--budget", type=float, help="maximum import time in milliseconds"
+    )
+    args = parser.parse_args()
+
+    records = measure(args.module, args.repeat)
+    elapsed = total(records)
+
+    print(
+        "import %s: %.1f ms, %d modules\n" % (args.module, elapsed / 1000, len(records))
+    )
+
+    _print_table(
+        ("package", "modules", "self [ms]", "%"),
+        [
+            (
+                package,
+                count,
+                "%.1f" % (self_time / 1000),
+                "%.1f" % (self_time * 100 / elapsed),
+            )
+            for package, (count, self_time) in sorted(
+                by_package(records).items(), key=lambda item: -item[1][1]
+            )[: args.top]
+        ],
+    )
+
+    _print_table(
+        ("module", "self [ms]", "cumulative [ms]"),
+        [
+            (
+                record.name,
+                "%.1f" % (record.self / 1000),
+                "%.1f" % (record.cumulative / 1000),
+            )
+            for record in sorted(records, key=lambda record: -record.self)[: args.top]
+        ],
+    )
+
+    if args.budget is not None and elapsed / 1000 > args.budget:
+        print("Import time exceeds the budget of %.1f ms" % args.budget)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,34 @@
 """Interfaces definitions for internal application interactions."""
 from abc import ABCMeta, abstractmethod
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable
+from enum import Enum
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 
 class ConexampleException(Exception):
     """Generic conexample application exception."""
 
 
+class EntryRecord(NamedTuple):
+    """Compact, tuple backed entry data. Entries listings pass the same records through all the
+    application layers, without re-wrapping them on the way."""
+
+    name: str
+    rating: int
+
+
 ##
 # Database classes
 ##
@@ -40,6 +60,20 @@ class DatabaseEntry:
     modified: datetime
 
 
+@dataclass
+class ReadRouting:
+    """Routing of the reads of a request. The API provides it through READ_ROUTING context
+    variable. If primary is set, reads must be served by the primary database, e.g. as the client
+    has just written. Otherwise the database handler may serve them by a read replica, which it
+    stores as replica, so all the reads of the request are served by the same replica."""
+
+    primary: bool = False
+    replica: Any = None
+
+
+READ_ROUTING: ContextVar = ContextVar("read_routing", default=None)
+
+
 class Database(metaclass=ABCMeta):
     """Defines interface for database handler."""
 
@@ -53,14 +87,99 @@ class Database(metaclass=ABCMeta):
         """Sets rating for the entry with the provided name. If the entry already exists when called
         returns False, otherwise True."""
 
+    @abstractmethod
+    def set_entries_rating(self, entries: Iterable[Tuple[str, int]]) -> List[bool]:
+        """Sets ratings for the provided (name, rating) pairs in a single transaction. Returns a
+        list of flags following the order of provided pairs. Flag is True if the pair created the
+        entry, otherwise False."""
+
     @abstractmethod
     def delete_entry(self, name: str) -> bool:
         """Deletes registry entry with the provided name. Returns True if the entry existed,
         otherwise False."""
 
     @abstractmethod
-    def get_entries(self) -> Iterable[DatabaseEntry]:
-        """Returns all entries from the database."""
+    def get_entries(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> Iterable[EntryRecord]:
+        """Returns entries from the database ordered by name. If after is provided, only entries
+        with names following it are returned. If limit is provided, at most limit entries are
+        returned."""
+
+    @abstractmethod
+    def get_top_entries(self, limit: int) -> Iterable[EntryRecord]:
+        """Returns at most limit entries with the highest rating, ordered by rating descending and
+        by name."""
+
+    @abstractmethod
+    def iter_entries(self, after: Optional[str] = None) -> Iterator[EntryRecord]:
+        """Yields entries from the database ordered by name, without loading all of them into
+        memory at once. If after is provided, only entries with names following it are yielded.
+        Database resources are held until the iterator is exhausted or closed."""
+
+    @abstractmethod
+    def get_entries_version(self) -> int:
+        """Returns version of the entries table contents. The version is changed by every
+        modification of entries."""
+
+    @abstractmethod
+    def get_rating_histogram(self) -> Dict[int, int]:
+        """Returns numbers of entries by rating, for ratings of at least one entry. Counts are
+        maintained along with every modification of entries, so no entries are read."""
+
+    @abstractmethod
+    def warm_up(self, connections: int, hot_entries: int) -> None:
+        """Opens at most connections pooled database connections and checks them, then reads
+        hot_entries top rated entries, so they are cached by the handlers caching reads."""
+
+
+class AsyncDatabase(metaclass=ABCMeta):
+    """Defines interface for asynchronous database handler. Methods follow the Database interface
+    semantics."""
+
+    @abstractmethod
+    async def get_entry(self, name: str) -> DatabaseEntry:
+        """See Database.get_entry"""
+
+    @abstractmethod
+    async def set_entry_rating(self, name: str, rating: int) -> bool:
+        """See Database.set_entry_rating"""
+
+    @abstractmethod
+    async def set_entries_rating(
+        self, entries: Iterable[Tuple[str, int]]
+    ) -> List[bool]:
+        """See Database.set_entries_rating"""
+
+    @abstractmethod
+    async def delete_entry(self, name: str) -> bool:
+        """See Database.delete_entry"""
+
+    @abstractmethod
+    async def get_entries(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> Iterable[EntryRecord]:
+        """See Database.get_entries"""
+
+    @abstractmethod
+    async def get_top_entries(self, limit: int) -> Iterable[EntryRecord]:
+        """See Database.get_top_entries"""
+
+    @abstractmethod
+    def iter_entries(self, after: Optional[str] = None) -> AsyncIterator[EntryRecord]:
+        """See Database.iter_entries"""
+
+    @abstractmethod
+    async def get_entries_version(self) -> int:
+        """See Database.get_entries_version"""
+
+    @abstractmethod
+    async def get_rating_histogram(self) -> Dict[int, int]:
+        """See Database.get_rating_histogram"""
+
+    @abstractmethod
+    async def warm_up(self, connections: int, hot_entries: int) -> None:
+        """See Database.warm_up"""
 
 
 ##
@@ -88,12 +207,46 @@ class CoreEntryNotFound(CoreRequestUnsuccessful):
     """the request concerns inexistent entry."""
 
 
+# Core entry data
+CoreEntry = EntryRecord
+
+
 @dataclass(frozen=True)
-class CoreEntry:
-    """Core entry data."""
+class CoreEntryDetails:
+    """Core entry data along with its metadata."""
 
     name: str
     rating: int
+    modified: datetime
+
+
+@dataclass(frozen=True)
+class CoreRatingStats:
+    """Statistics of the entries ratings. Mean, min and max are None if there are no entries."""
+
+    count: int
+    sum: int
+    mean: Optional[float]
+    min: Optional[int]
+    max: Optional[int]
+    histogram: Dict[int, int]
+
+
+class CoreEntryWriteStatus(Enum):
+    """Outcome of the entry write request."""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    REJECTED = "rejected"
+
+
+@dataclass(frozen=True)
+class CoreEntryWriteResult:
+    """Result of the entry write request."""
+
+    name: str
+    status: CoreEntryWriteStatus
+    details: Optional[str] = None
 
 
 class Core(metaclass=ABCMeta):
@@ -108,18 +261,128 @@ class Core(metaclass=ABCMeta):
         """Returns raing for the entry with provided name. If the entry does not exist raises
         CoreEntryNotFound exception."""
 
+    @abstractmethod
+    def get_entry(self, name: str) -> CoreEntryDetails:
+        """Returns details of the entry with provided name. If the entry does not exist raises
+        CoreEntryNotFound exception."""
+
     @abstractmethod
     def set_entry_rating(self, name: str, rating: int) -> bool:
         """Sets rating for the entry with the provided name. If the entry already exists when called
         returns False, otherwise True."""
 
+    @abstractmethod
+    def set_entries_rating(
+        self, entries: Iterable[CoreEntry]
+    ) -> List[CoreEntryWriteResult]:
+        """Sets ratings for the provided entries in a single transaction. Entries that cannot be
+        rated as requested are rejected individually, without affecting the rest of entries.
+        Returns results following the order of provided entries."""
+
     @abstractmethod
     def delete_entry(self, name: str) -> None:
         """If the entry does not exist raises CoreEntryNotFound exception."""
 
     @abstractmethod
-    def get_entries(self) -> Iterable[CoreEntry]:
-        """Returns all entries from the database."""
+    def get_entries(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> Iterable[CoreEntry]:
+        """Returns entries ordered by name. If after is provided, only entries with names following
+        it are returned. If limit is provided, at most limit entries are returned."""
+
+    @abstractmethod
+    def get_top_entries(self, limit: int) -> Iterable[CoreEntry]:
+        """Returns at most limit entries with the highest rating, ordered by rating descending and
+        by name."""
+
+    @abstractmethod
+    def iter_entries(self, after: Optional[str] = None) -> Iterator[CoreEntry]:
+        """Yields entries ordered by name, without loading all of them into memory at once. If
+        after is provided, only entries with names following it are yielded."""
+
+    @abstractmethod
+    def get_entries_version(self) -> int:
+        """Returns version of the entries collection. The version is changed by every modification
+        of entries."""
+
+    @abstractmethod
+    def get_rating_stats(self) -> CoreRatingStats:
+        """Returns statistics of the entries ratings."""
+
+    @abstractmethod
+    def search_entries(self, query: str, limit: int) -> List[str]:
+        """Returns at most limit names of the entries matching the query, ranked. Names starting
+        with the query come first, followed by names similar to the query."""
+
+    @abstractmethod
+    def load_search_index(self) -> None:
+        """Loads index of the entry names serving the search from the database."""
+
+    @abstractmethod
+    def warm_up(self, connections: int, hot_entries: int) -> None:
+        """Prepares the database handler to serve the first requests quickly. See
+        Database.warm_up."""
+
+
+class AsyncCore(metaclass=ABCMeta):
+    """Defines interface for asynchronous core logic. Methods follow the Core interface
+    semantics."""
+
+    @abstractmethod
+    def __init__(self, database: AsyncDatabase) -> None:
+        """Class constructor template."""
+
+    @abstractmethod
+    async def get_entry(self, name: str) -> CoreEntryDetails:
+        """See Core.get_entry"""
+
+    @abstractmethod
+    async def set_entry_rating(self, name: str, rating: int) -> bool:
+        """See Core.set_entry_rating"""
+
+    @abstractmethod
+    async def set_entries_rating(
+        self, entries: Iterable[CoreEntry]
+    ) -> List[CoreEntryWriteResult]:
+        """See Core.set_entries_rating"""
+
+    @abstractmethod
+    async def delete_entry(self, name: str) -> None:
+        """See Core.delete_entry"""
+
+    @abstractmethod
+    async def get_entries(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> Iterable[CoreEntry]:
+        """See Core.get_entries"""
+
+    @abstractmethod
+    async def get_top_entries(self, limit: int) -> Iterable[CoreEntry]:
+        """See Core.get_top_entries"""
+
+    @abstractmethod
+    def iter_entries(self, after: Optional[str] = None) -> AsyncIterator[CoreEntry]:
+        """See Core.iter_entries"""
+
+    @abstractmethod
+    async def get_entries_version(self) -> int:
+        """See Core.get_entries_version"""
+
+    @abstractmethod
+    async def get_rating_stats(self) -> CoreRatingStats:
+        """See Core.get_rating_stats"""
+
+    @abstractmethod
+    async def search_entries(self, query: str, limit: int) -> List[str]:
+        """See Core.search_entries"""
+
+    @abstractmethod
+    async def load_search_index(self) -> None:
+        """See Core.load_search_index"""
+
+    @abstractmethod
+    async def warm_up(self, connections: int, hot_entries: int) -> None:
+        """See Core.warm_up"""
 
 
 ##
@@ -136,6 +399,9 @@ class Api(metaclass=ABCMeta):
 
     # pylint: disable=too-few-public-methods
 
+    # Whether the service is ready to serve requests, reported by GET /ready
+    ready = False
+
     @abstractmethod
     def __init__(self, core: Core) -> None:
         """Class constructor template"""
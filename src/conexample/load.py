@@ -0,0 +1,479 @@
+"""Load generator of a running conexample service
+
+Sends mixed read and write traffic to the REST API of the service, by concurrent threads or asyncio
+tasks over keep-alive connections, for the given duration. Entries are addressed by keys drawn
+uniformly or by Zipf's law (hot keys), and writes carry entry names and batches of the given sizes.
+Reports throughput and latency percentiles per operation, latency histogram and breakdown of the
+responses by status code, connection failures included.
+
+    conexample-load --url http://localhost:5000/v1 [--mode asyncio] [--concurrency 64] [--help]
+"""
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import accumulate
+from urllib.parse import urlsplit
+
+import requests
+
+OPERATIONS = ("get", "set", "batch", "delete", "list", "top", "search")
+DEFAULT_MIX = "get=80,set=15,batch=4,delete=1"
+
+# Upper bounds (in milliseconds) of the latency histogram buckets, the last one is unbounded
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+HISTOGRAM_WIDTH = 40
+
+PREFILL_BATCH_SIZE = 1000
+TIMEOUT = 30.0
+
+
+class Keys:
+    """Names of the entries addressed by the load. Keys are drawn uniformly or by Zipf's law with
+    the given exponent, the lower the key index, the hotter the key. Names are padded with zeros to
+    the name length."""
+
+    def __init__(self, count, distribution="uniform", exponent=1.0, name_length=16):
+        self.count = count
+        self.name_length = name_length
+        self._cumulative = None
+
+        if distribution == "zipf":
+            self._cumulative = list(
+                accumulate(1 / rank ** exponent for rank in range(1, count + 1))
+            )
+        elif distribution != "uniform":
+            raise ValueError("Unknown key distribution '%s'" % distribution)
+
+    def name(self, index):
+        """Returns name of the index-th key."""
+        return "k" + str(index).zfill(self.name_length - 1)
+
+    def draw(self, generator):
+        """Returns index of a key drawn with the random generator."""
+
+        if self._cumulative is None:
+            return generator.randrange(self.count)
+
+        return min(
+            bisect_left(self._cumulative, generator.random() * self._cumulative[-1]),
+            self.count - 1,
+        )
+
+
+def parse_mix(mix):
+    """Returns {operation: weight} of the operations mix given as comma separated
+    operation=weight."""
+
+    weights = {}
+
+    for item in mix.split(","):
+        operation, _, weight = item.partition("=")
+        operation = operation.strip()
+
+        if operation not in OPERATIONS:
+            raise ValueError(
+                "Unknown operation '%s', expected one of: %s"
+                % (operation, ", ".join(OPERATIONS))
+            )
+        try:
+            weights[operation] = float(weight)
+        except ValueError:
+            raise ValueError("Invalid weight of operation '%s'" % operation)
+
+    if sum(weights.values()) <= 0:
+        raise ValueError("Operations mix has no positive weight")
+
+    return weights
+
+
+class Traffic:
+    """Requests of the operations mix, addressing the keys"""
+
+    def __init__(self, mix, keys, batch_size=10):
+        self.keys = keys
+        self.batch_size = batch_size
+        self._operations = list(mix)
+        self._weights = list(accumulate(mix[operation] for operation in mix))
+
+    def _name(self, generator):
+        return self.keys.name(self.keys.draw(generator))
+
+    def request(self, generator):
+        """Returns (operation, method, path, JSON body) of a request drawn with the random
+        generator. Path is relative to the API URL."""
+
+        operation = self._operations[
+            bisect_left(self._weights, generator.random() * self._weights[-1])
+        ]
+
+        if operation == "get":
+            return operation, "GET", "/entry/%s" % self._name(generator), None
+        if operation == "set":
+            return (
+                operation,
+                "POST",
+                "/entry/%s" % self._name(generator),
+                {"rating": generator.randint(0, 10)},
+            )
+        if operation == "batch":
+            return (
+                operation,
+                "POST",
+                "/batch/entry",
+                [
+                    {"name": self._name(generator), "rating": generator.randint(0, 10)}
+                    for _ in range(self.batch_size)
+                ],
+            )
+        if operation == "delete":
+            return operation, "DELETE", "/entry/%s" % self._name(generator), None
+        if operation == "list":
+            return operation, "GET", "/entry?limit=100", None
+        if operation == "top":
+            return operation, "GET", "/top/entry?n=10", None
+        return operation, "GET", "/search/entry?q=%s" % self._name(generator)[:8], None
+
+
+class Results:
+    """Latencies (in seconds) of the responses by operation and counts of the statuses. Failed
+    requests are counted by the name of the exception instead of the status."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+
+    def record(self, operation, status, latency):
+        """Records response of the operation."""
+
+        self.latencies[operation].append(latency)
+        self.statuses[status] += 1
+
+    def merge(self, other):
+        """Adds results of the other results."""
+
+        for operation, latencies in other.latencies.items():
+            self.latencies[operation] += latencies
+        self.statuses.update(other.statuses)
+
+
+def _generator(seed, index):
+    """Returns random generator of the index-th worker, seeded if the seed is provided."""
+    return random.Random(None if seed is None else seed + index)
+
+
+def _thread_worker(url, traffic, generator, started, deadline, results):
+    # pylint: disable=too-many-arguments
+    with requests.Session() as session:
+        while time.monotonic() < deadline:
+            operation, method, path, body = traffic.request(generator)
+            request_started = time.perf_counter()
+            try:
+                status = session.request(
+                    method, url + path, json=body, timeout=TIMEOUT
+                ).status_code
+            except requests.RequestException as ex:
+                status = type(ex).__name__
+
+            if time.monotonic() >= started:
+                results.record(operation, status, time.perf_counter() - request_started)
+
+
+def run_threads(url, traffic, concurrency, warmup, duration, seed=None):
+    """Sends the traffic by concurrent threads, returns Results of the requests sent after the
+    warmup."""
+
+    started = time.monotonic() + warmup
+    deadline = started + duration
+    results = [Results() for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_thread_worker,
+            args=(url, traffic, _generator(seed, index), started)
+            + (deadline, results[index]),
+            daemon=True,
+        )
+        for index in range(concurrency)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = Results()
+    for result in results:
+        merged.merge(result)
+    return merged
+
+
+async def _read_response(reader):
+    """Reads one response, returns its status and whether the server closes the connection."""
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {
+        name.strip().lower(): value.strip().lower()
+        for name, _, value in (line.partition(":") for line in lines[1:] if line)
+    }
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+
+    return int(lines[0].split()[1]), headers.get("connection") == "close"
+
+
+async def _task_worker(url, traffic, generator, started, deadline, results):
+    # pylint: disable=too-many-arguments
+    host, port = url.hostname, url.port or (443 if url.scheme == "https" else 80)
+    context = ssl.create_default_context() if url.scheme == "https" else None
+    reader = writer = None
+
+    while time.monotonic() < deadline:
+        operation, method, path, body = traffic.request(generator)
+        payload = b"" if body is None else json.dumps(body).encode()
+        request = (
+            "%s %s%s HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n"
+            % (method, url.path, path, url.netloc, len(payload))
+            + ("Content-Type: application/json\r\n" if body is not None else "")
+            + "\r\n"
+        ).encode() + payload
+
+        request_started = time.perf_counter()
+        reused = writer is not None
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port, ssl=context)
+            writer.write(request)
+            status, close = await asyncio.wait_for(_read_response(reader), TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as ex:
+            if writer is not None:
+                writer.close()
+                writer = None
+            if (
+                reused
+                and isinstance(ex, asyncio.IncompleteReadError)
+                and not ex.partial
+            ):
+                # Keep-alive connection closed by the server meanwhile, the request is sent again
+                continue
+            status, close = type(ex).__name__, False
+
+        if time.monotonic() >= started:
+            results.record(operation, status, time.perf_counter() - request_started)
+
+        if close:
+            writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def _run_tasks(url, traffic, concurrency, warmup, duration, seed):
+    started = time.monotonic() + warmup
+    deadline = started + duration
+    results = Results()
+
+    await asyncio.gather(
+        *(
+            _task_worker(
+                url, traffic, _generator(seed, index), started, deadline, results,
+            )
+            for index in range(concurrency)
+        )
+    )
+
+    return results
+
+
+def run_asyncio(url, traffic, concurrency, warmup, duration, seed=None):
+    """Sends the traffic by concurrent asyncio tasks of one thread, returns Results of the
+    requests sent after the warmup."""
+
+    return asyncio.run(
+        _run_tasks(
+            urlsplit(url.rstrip("/")), traffic, concurrency, warmup, duration, seed
+        )
+    )
+
+
+def prefill(url, keys, generator):
+    """Stores entries of all the keys with random ratings."""
+
+    with requests.Session() as session:
+        for offset in range(0, keys.count, PREFILL_BATCH_SIZE):
+            response = session.post(
+                url + "/batch/entry",
+                json=[
+                    {"name": keys.name(index), "rating": generator.randint(0, 10)}
+                    for index in range(
+                        offset, min(offset + PREFILL_BATCH_SIZE, keys.count)
+                    )
+                ],
+                timeout=TIMEOUT,
+            )
+            response.raise_for_status()
+
+
+def _percentile(values, percentile):
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+def _print_table(header, rows):
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [
+        max(len(row[column]) for row in [header] + rows)
+        for column in range(len(header))
+    ]
+
+    for row in [header] + rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+    print()
+
+
+def report(results, duration):
+    """Prints the results of the load lasting duration seconds."""
+
+    latencies = sorted(
+        latency for values in results.latencies.values() for latency in values
+    )
+    total = len(latencies)
+
+    if not total:
+        print("No requests completed.")
+        return
+
+    errors = sum(
+        count
+        for status, count in results.statuses.items()
+        if not isinstance(status, int) or status >= 400
+    )
+    print(
+        "%d requests in %.1f s, %.1f req/s, %d errors (%.2f %%)\n"
+        % (total, duration, total / duration, errors, errors * 100 / total)
+    )
+
+    rows = []
+    for operation in OPERATIONS + ("all",):
+        values = (
+            latencies
+            if operation == "all"
+            else sorted(results.latencies.get(operation, ()))
+        )
+        if values:
+            rows.append(
+                (operation, len(values), "%.1f" % (len(values) / duration))
+                + tuple(
+                    "%.2f" % (_percentile(values, percentile) * 1000)
+                    for percentile in (50, 95, 99)
+                )
+                + ("%.2f" % (values[-1] * 1000),)
+            )
+    _print_table(
+        ("operation", "requests", "req/s", "p50 [ms]", "p95 [ms]", "p99 [ms]")
+        + ("max [ms]",),
+        rows,
+    )
+
+    counts = Counter(
+        bisect_left(HISTOGRAM_BUCKETS, latency * 1000) for latency in latencies
+    )
+    peak = max(counts.values())
+    _print_table(
+        ("latency [ms]", "requests", "%", ""),
+        [
+            (
+                "<= %g" % bound if bound != float("inf") else "> %g" % previous,
+                counts[index],
+                "%.2f" % (counts[index] * 100 / total),
+                "#" * round(counts[index] * HISTOGRAM_WIDTH / peak),
+            )
+            for index, (previous, bound) in enumerate(
+                zip((0,) + HISTOGRAM_BUCKETS, HISTOGRAM_BUCKETS)
+            )
+        ],
+    )
+
+    _print_table(
+        ("status", "responses", "%"),
+        [
+            (status, count, "%.2f" % (count * 100 / total))
+            for status, count in sorted(
+                results.statuses.items(), key=lambda item: str(item[0])
+            )
+        ],
+    )
+
+
+def main(argv=None):
+    """Generates load of a running conexample service"""
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--url", default="http://localhost:5000/v1", help="URL of the REST API"
+    )
+    parser.add_argument("--mode", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument(
+        "--warmup", type=float, default=0.0, help="seconds of unrecorded load"
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help="weights of the operations (%s), %s by default"
+        % (", ".join(OPERATIONS), DEFAULT_MIX),
+    )
+    parser.add_argument("--keys", type=int, default=10000, help="number of keys")
+    parser.add_argument(
+        "--distribution", choices=("uniform", "zipf"), default="uniform"
+    )
+    parser.add_argument(
+        "--zipf-exponent", type=float, default=1.0, help="the higher the hotter"
+    )
+    parser.add_argument(
+        "--name-length", type=int, default=16, help="length of the entry names"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=10, help="entries per batch write"
+    )
+    parser.add_argument(
+        "--prefill", action="store_true", help="store entries of all the keys first"
+    )
+    parser.add_argument("--seed", type=int, help="seed of the random generators")
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.name_length <= 100:
+        parser.error("name length must be between 1 and 100")
+    if not 1 <= args.batch_size <= 1000:
+        parser.error("batch size must be between 1 and 1000")
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    url = args.url.rstrip("/")
+    keys = Keys(args.keys, args.distribution, args.zipf_exponent, args.name_length)
+    traffic = Traffic(mix, keys, args.batch_size)
+
+    if args.prefill:
+        print("Storing %d entries." % keys.count)
+        prefill(url, keys, random.Random(args.seed))
+
+    run = run_asyncio if args.mode == "asyncio" else run_threads
+    results = run(url, traffic, args.concurrency, args.warmup, args.duration, args.seed)
+
+    report(results, args.duration)
@@ -0,0 +1,175 @@
+"""Prometheus metrics of the application
+
+Metrics are collected with prometheus_client, if installed (the metrics extra), otherwise they are
+discarded. Every worker process of a pre-forking server (uWSGI) holds its own metrics, so if
+METRICS_MULTIPROC_DIR is set, they are written to files of the directory shared by the workers and
+aggregated when exposed. The directory must be emptied before the server starts."""
+import atexit
+import os
+from contextvars import ContextVar
+
+from . import SETTINGS
+
+if SETTINGS["METRICS_MULTIPROC_DIR"]:
+    # prometheus_client picks the multiprocess mode up when imported
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", SETTINGS["METRICS_MULTIPROC_DIR"])
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+NAMESPACE = "conexample"
+ENABLED = prometheus_client is not None
+
+# Fixed latency buckets of the operations, few, so observations stay cheap
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+# operationId of the API operation served by the current context, if any
+OPERATION = ContextVar("operation", default="internal")
+
+
+class RequestQueries:
+    """Number of the database queries of a request and their total duration (in seconds). The API
+    provides it through REQUEST_QUERIES context variable, the database engines update it."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+REQUEST_QUERIES = ContextVar("request_queries", default=None)
+
+
+class _NullMetric:
+    """Stand-in of the metrics discarding the observations, if prometheus_client is not
+    installed"""
+
+    def labels(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Returns the metric itself."""
+        return self
+
+    def inc(self, amount=1):
+        """Discards the observation."""
+
+    def dec(self, amount=1):
+        """Discards the observation."""
+
+    def set(self, value):
+        """Discards the observation."""
+
+    def observe(self, amount):
+        """Discards the observation."""
+
+
+def counter(name, documentation, labelnames=()):
+    """Returns conexample_<name>_total counter."""
+
+    if not ENABLED:
+        return _NullMetric()
+    return prometheus_client.Counter(
+        name, documentation, labelnames, namespace=NAMESPACE
+    )
+
+
+def gauge(name, documentation, labelnames=()):
+    """Returns conexample_<name> gauge. Gauges of the processes are summed up, dead processes
+    excluded."""
+
+    if not ENABLED:
+        return _NullMetric()
+    return prometheus_client.Gauge(
+        name,
+        documentation,
+        labelnames,
+        namespace=NAMESPACE,
+        multiprocess_mode="livesum",
+    )
+
+
+def histogram(name, documentation, labelnames=(), buckets=None):
+    """Returns conexample_<name> histogram, with the prometheus_client default buckets, unless
+    provided."""
+
+    if not ENABLED:
+        return _NullMetric()
+    return prometheus_client.Histogram(
+        name,
+        documentation,
+        labelnames,
+        namespace=NAMESPACE,
+        buckets=buckets or prometheus_client.Histogram.DEFAULT_BUCKETS,
+    )
+
+
+OPERATION_DURATION = histogram(
+    "operation_duration_seconds",
+    "Time spent in the application layers serving the operations",
+    ["operation", "layer"],
+    buckets=LATENCY_BUCKETS,
+)
+OPERATION_ERRORS = counter(
+    "operation_errors",
+    "Exceptions raised out of the application layers serving the operations",
+    ["operation", "layer", "exception"],
+)
+
+# Children of the metrics by their labels, looked up faster than with labels()
+_CHILDREN = {}
+
+
+def labelled(metric, *labels):
+    """Returns child of the metric with the label values."""
+
+    key = (id(metric),) + labels
+    child = _CHILDREN.get(key)
+    if child is None:
+        child = _CHILDREN[key] = metric.labels(*labels)
+    return child
+
+
+def observe_operation(layer, duration=None, error=None):
+    """Records duration (in seconds) of the call of the layer serving the current operation, if
+    provided, and the exception the call raised, if any."""
+
+    operation = OPERATION.get()
+
+    if duration is not None:
+        labelled(OPERATION_DURATION, operation, layer).observe(duration)
+
+    if error is not None:
+        labelled(OPERATION_ERRORS, operation, layer, type(error).__name__).inc()
+
+
+def exposition():
+    """Returns (content type, body) of the metrics in the Prometheus text format. In the
+    multiprocess mode, metrics of all the processes are aggregated."""
+
+    if not ENABLED:
+        raise RuntimeError("prometheus_client is not installed")
+
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+    if directory:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=directory)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return (
+        prometheus_client.CONTENT_TYPE_LATEST,
+        prometheus_client.generate_latest(registry),
+    )
+
+
+def process_started():
+    """Registers the process for the multiprocess mode cleanup. Gauges of the process are excluded
+    from the aggregation once it exits. Should be called in forked worker processes."""
+
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+    if ENABLED and directory:
+        atexit.register(multiprocess.mark_process_dead, os.getpid(), directory)
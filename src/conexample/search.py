@@ -0,0 +1,242 @@
+"""In-process search index of entry names"""
+import threading
+from array import array
+from collections import Counter
+from time import monotonic
+
+# Minimum trigram similarity of fuzzy matches, the same as pg_trgm default threshold
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(text):
+    """Returns set of trigrams of the lowercase text padded the way pg_trgm pads words."""
+
+    padded = "  %s " % text.lower()
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Index of names serving prefix and typo tolerant (fuzzy) case insensitive search.
+
+    Names are kept in a list sorted by their lowercase form (and by the names themselves, among the
+    names with the same lowercase form), so prefix matches are found with a
+    binary search. Fuzzy matches are found with an inverted index of the name trigrams, and ranked
+    by trigram similarity, as pg_trgm does. Postings are compact arrays of name ids. Removed names
+    are only unlinked from their ids, and their postings are dropped by the next build of the
+    index."""
+
+    def __init__(self, names=()):
+        self._names = []
+        self._ids = {}
+        self._sizes = array("H")
+        self._postings = {}
+        self._sorted = array("I")
+        self._lock = threading.Lock()
+
+        for name in names:
+            if name not in self._ids:
+                self._insert(name)
+
+        self._sorted = array("I", sorted(range(len(self._names)), key=self._key))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _insert(self, name):
+        """Indexes the name, except for the sorted list."""
+
+        index = len(self._names)
+        grams = trigrams(name)
+
+        self._names.append(name)
+        self._ids[name] = index
+        self._sizes.append(min(len(grams), 0xFFFF))
+
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("I")
+            postings.append(index)
+
+        return index
+
+    def _key(self, index):
+        name = self._names[index]
+        return name.lower(), name
+
+    def _position(self, key):
+        """Returns position of the first name of the sorted list with (lowercase form, name) key not
+        lower than the key."""
+
+        low, high = 0, len(self._sorted)
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(self._sorted[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def add(self, name):
+        """Adds the name to the index, if not indexed yet."""
+
+        with self._lock:
+            if name in self._ids:
+                return
+
+            index = self._insert(name)
+            self._sorted.insert(self._position((name.lower(), name)), index)
+
+    def discard(self, name):
+        """Removes the name from the index, if indexed."""
+
+        with self._lock:
+            index = self._ids.pop(name, None)
+            if index is None:
+                return
+
+            del self._sorted[self._position((name.lower(), name))]
+            self._names[index] = None
+
+    def _prefix_matches(self, key, limit):
+        matches = []
+        position = self._position((key, ""))
+
+        while len(matches) < limit and position < len(self._sorted):
+            name = self._names[self._sorted[position]]
+            if not name.lower().startswith(key):
+                break
+            matches.append(name)
+            position += 1
+
+        return matches
+
+    def _fuzzy_matches(self, key, limit, exclude):
+        grams = trigrams(key)
+        shared = Counter()
+
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                shared.update(postings)
+
+        # Similarity never exceeds shared / len(grams), so fewer shared trigrams are skipped upfront
+        required = SIMILARITY_THRESHOLD * len(grams)
+        matches = []
+
+        for index, count in shared.items():
+            if count < required:
+                continue
+
+            name = self._names[index]
+            if name is None or name in exclude:
+                continue
+
+            similarity = count / (len(grams) + self._sizes[index] - count)
+            if similarity >= SIMILARITY_THRESHOLD:
+                matches.append((-similarity, name))
+
+        matches.sort()
+        return [name for _, name in matches[:limit]]
+
+    def search(self, query, limit):
+        """Returns at most limit names matching the query. Names starting with the query come
+        first, in the name order, followed by names similar to the query, the most similar
+        first."""
+
+        key = query.lower()
+
+        with self._lock:
+            matches = self._prefix_matches(key, limit)
+
+            if len(matches) < limit:
+                matches += self._fuzzy_matches(key, limit - len(matches), set(matches))
+
+        return matches
+
+
+class SearchIndex:
+    """Trigram index of entry names loaded from the database and kept up to date by the writes of
+    the process.
+
+    Writes of other processes are not seen by the index, so it is considered stale ttl seconds after
+    it was loaded, and loaded again. Writes made while the index is loaded are applied to it once
+    loaded. Zero ttl disables reloads."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._index = None
+        self._loaded = None
+        self._changes = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """Whether the index was loaded."""
+        return self._index is not None
+
+    @property
+    def stale(self):
+        """Whether the index should be loaded again. False while the index is being loaded."""
+
+        with self._lock:
+            return self._changes is None and (
+                self._index is None
+                or (bool(self.ttl) and monotonic() - self._loaded > self.ttl)
+            )
+
+    def load(self, names, requested=None):
+        """Replaces the index with the index of the names, read from the database after the
+        requested time (monotonic, now by default). Loads are serialized. If another load completed
+        after the requested time, the names are not consumed and False is returned."""
+
+        requested = monotonic() if requested is None else requested
+
+        with self._load_lock:
+            with self._lock:
+                if self._loaded is not None and self._loaded > requested:
+                    return False
+                self._changes = []
+
+            try:
+                index = TrigramIndex(names)
+            except BaseException:
+                with self._lock:
+                    self._changes = None
+                raise
+
+            with self._lock:
+                for name, added in self._changes:
+                    if added:
+                        index.add(name)
+                    else:
+                        index.discard(name)
+
+                self._index = index
+                self._loaded = monotonic()
+                self._changes = None
+
+        return True
+
+    def update(self, added=(), removed=()):
+        """Applies names added and removed by a write."""
+
+        with self._lock:
+            for name in added:
+                if self._index is not None:
+                    self._index.add(name)
+                if self._changes is not None:
+                    self._changes.append((name, True))
+
+            for name in removed:
+                if self._index is not None:
+                    self._index.discard(name)
+                if self._changes is not None:
+                    self._changes.append((name, False))
+
+    def search(self, query, limit):
+        """See TrigramIndex.search. The index must be loaded."""
+        return self._index.search(query, limit)
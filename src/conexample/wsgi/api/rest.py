@@ -1,8 +1,29 @@
-"""example Connexion application WSGI application entrypoint"""
+"""example Connexion application WSGI application entrypoint
+
+Under uWSGI without lazy-apps, the application is loaded and prepared in the master process and
+workers are forked from it. Objects created while loading are then moved to the permanent
+generation with gc.freeze, so garbage collections in the workers do not write to (and copy) memory
+pages shared with the master. Process specific resources are re-initialized after fork, and then the
+workers are warmed up."""
+import gc
+
 from ...application import ConnexionExample
 
+try:
+    import uwsgi
+    from uwsgidecorators import postfork
+except ImportError:
+    uwsgi = None
+
 # pylint: disable=invalid-name
 
+# Worker id is 0 in the master process, workers forked from it are warmed up after fork
+preforked = uwsgi is not None and uwsgi.worker_id() == 0
+
 conexample = ConnexionExample()
-conexample.prepare()
+conexample.prepare(warm_up=not preforked)
 app = conexample.api
+
+if preforked:
+    postfork(conexample.post_fork)
+    gc.freeze()
@@ -1,6 +1,9 @@
+import asyncio
+import json
 import os
 import subprocess
 import tempfile
+import threading
 from datetime import datetime
 from unittest.mock import create_autospec
 
@@ -9,10 +12,13 @@ import virtualenv
 from dotenv import dotenv_values
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
+from werkzeug.serving import make_server
 
 import conexample
 import conexample.api.rest
+import conexample.api.rest.asgi
 import conexample.core
+import conexample.db.sql.aio
 import conexample.db.sql.db
 import conexample.db.sql.models
 
@@ -105,6 +111,45 @@ def coupled_db_session(db_connection):
     transaction.rollback()
 
 
+@pytest.fixture(scope="function")
+def file_db_engine(test_config, tmp_path):
+    test_config["DATABASE_SQL_DATABASE_URI"] = "sqlite:///%s" % (tmp_path / "db.sqlite")
+    engine = conexample.db.sql.db.create_engine(
+        connect_args={"check_same_thread": False}
+    )
+    conexample.db.sql.models.Base.metadata.create_all(engine)
+    conexample.db.sql.db.session_bind(engine)
+    yield engine
+    conexample.db.sql.db.Session = sessionmaker()
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def replicated_db_engines(test_config, tmp_path):
+    """Yields engines of the primary SQLite database and of its two "replicas". Replicas are
+    separate databases, nothing is replicated to them."""
+
+    uris = ["sqlite:///%s" % (tmp_path / name) for name in ("db", "r1", "r2")]
+    test_config["DATABASE_SQL_DATABASE_URI"] = uris[0]
+    test_config["DATABASE_SQL_REPLICA_URIS"] = " ".join(uris[1:])
+    test_config["DATABASE_SQL_REPLICA_RETRY"] = "30"
+
+    engines = [conexample.db.sql.db.create_engine(uri=uri) for uri in uris]
+    for engine in engines:
+        conexample.db.sql.models.Base.metadata.create_all(engine)
+
+    # Database handlers bind the engines configured by the settings on first access
+    conexample.db.sql.db.Session = sessionmaker()
+
+    yield engines
+
+    conexample.db.sql.db.engine_dispose()
+    conexample.db.sql.db.Session = sessionmaker()
+    conexample.db.sql.db.Replicas = conexample.db.sql.db.ReplicaSet()
+    for engine in engines:
+        engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def db():
     mock = create_autospec(conexample.interface.Database, instance=True)
@@ -117,23 +162,24 @@ def db():
         )
     )
     mock.set_entry_rating.configure_mock(return_value=True)
+    mock.set_entries_rating.configure_mock(
+        side_effect=lambda entries: [True for _ in entries]
+    )
     mock.delete_entry.configure_mock(return_value=True)
     mock.get_entries.configure_mock(
         return_value=[
-            conexample.interface.DatabaseEntry(
-                name="python",
-                rating=5,
-                created=datetime.utcnow(),
-                modified=datetime.utcnow(),
-            ),
-            conexample.interface.DatabaseEntry(
-                name="cassandra",
-                rating=1,
-                created=datetime.utcnow(),
-                modified=datetime.utcnow(),
-            ),
+            conexample.interface.EntryRecord(name="python", rating=5),
+            conexample.interface.EntryRecord(name="cassandra", rating=1),
         ]
     )
+    mock.get_top_entries.configure_mock(
+        side_effect=lambda limit: mock.get_entries.return_value[:limit]
+    )
+    mock.iter_entries.configure_mock(
+        side_effect=lambda after=None: iter(mock.get_entries.return_value)
+    )
+    mock.get_entries_version.configure_mock(return_value=1)
+    mock.get_rating_histogram.configure_mock(return_value={1: 1, 5: 1})
     return mock
 
 
@@ -141,13 +187,43 @@ def db():
 def core():
     mock = create_autospec(conexample.interface.Core, instance=True)
     mock.get_rating.configure_mock(return_value=5)
+    mock.get_entry.configure_mock(
+        return_value=conexample.interface.CoreEntryDetails(
+            name="python", rating=5, modified=datetime.utcnow()
+        )
+    )
     mock.set_entry_rating.configure_mock(return_value=True)
+    mock.set_entries_rating.configure_mock(
+        return_value=[
+            conexample.interface.CoreEntryWriteResult(
+                name="python", status=conexample.interface.CoreEntryWriteStatus.CREATED
+            ),
+            conexample.interface.CoreEntryWriteResult(
+                name="cassandra",
+                status=conexample.interface.CoreEntryWriteStatus.REJECTED,
+                details="cassandra cannot be rated above 1",
+            ),
+        ]
+    )
     mock.get_entries.configure_mock(
         return_value=[
             conexample.interface.CoreEntry(name="python", rating=5,),
             conexample.interface.CoreEntry(name="cassandra", rating=1,),
         ]
     )
+    mock.get_top_entries.configure_mock(
+        side_effect=lambda limit: mock.get_entries.return_value[:limit]
+    )
+    mock.iter_entries.configure_mock(
+        side_effect=lambda after=None: iter(mock.get_entries.return_value)
+    )
+    mock.get_entries_version.configure_mock(return_value=1)
+    mock.search_entries.configure_mock(return_value=["python", "cython"])
+    mock.get_rating_stats.configure_mock(
+        return_value=conexample.interface.CoreRatingStats(
+            count=2, sum=6, mean=3.0, min=1, max=5, histogram={1: 1, 5: 1}
+        )
+    )
     return mock
 
 
@@ -165,3 +241,108 @@ def stateful_api_client(test_config, coupled_db_session):
     flask_app = conexample.api.rest.RestApi(core).app
     with flask_app.test_client() as test_client:
         yield test_client
+
+
+@pytest.fixture(scope="function")
+def served_api(file_db_engine):
+    """Yields URL of the REST API served over HTTP by a threaded server of this process"""
+
+    core = conexample.core.ApplicationCore(conexample.db.sql.SQLDatabase())
+    server = make_server(
+        "127.0.0.1", 0, conexample.api.rest.RestApi(core).app, threaded=True
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield "http://127.0.0.1:%d/v1" % server.server_port
+
+    server.shutdown()
+    thread.join()
+
+
+class AsgiResponse:
+    def __init__(self, status_code, headers, data):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+
+    @property
+    def json(self):
+        return json.loads(self.data)
+
+
+class AsgiClient:
+    """Minimal ASGI application test client"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def _request(self, method, path, body, headers):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "method": method.upper(),
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            "server": ("localhost", 80),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send)
+
+        return AsgiResponse(
+            messages[0]["status"],
+            {
+                name.decode().title(): value.decode()
+                for name, value in messages[0]["headers"]
+            },
+            b"".join(message.get("body", b"") for message in messages[1:]),
+        )
+
+    def request(self, method, path, json=None, headers=None):
+        headers = dict(headers or {})
+        body = b""
+
+        if json is not None:
+            body = conexample.api.rest.encoding.StdlibJSON().dumps(json)
+            headers["Content-Type"] = "application/json"
+
+        return asyncio.run(self._request(method, path, body, headers))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+
+@pytest.fixture(scope="function")
+def async_db(db):
+    return conexample.db.sql.aio.AsyncSQLDatabase(db)
+
+
+@pytest.fixture(scope="function")
+def asgi_client(test_config, file_db_engine):
+    db = conexample.db.sql.aio.AsyncSQLDatabase()
+    core = conexample.core.AsyncApplicationCore(db)
+    return AsgiClient(conexample.api.rest.asgi.AsgiRestApi(core))
+
+
+@pytest.fixture(scope="function")
+def replicated_asgi_client(test_config, replicated_db_engines):
+    db = conexample.db.sql.aio.AsyncSQLDatabase()
+    core = conexample.core.AsyncApplicationCore(db)
+    return AsgiClient(conexample.api.rest.asgi.AsgiRestApi(core))
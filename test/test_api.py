@@ -1,14 +1,122 @@
+import asyncio
+import re
+from datetime import timedelta
+from time import time
+from unittest import mock
+from unittest.mock import patch
+
+import prometheus_client
 import pytest
 
+import conexample.api.rest.cache
+import conexample.api.rest.encoding
+import conexample.api.rest.specification
+import conexample.api.rest.validation
+import conexample.core
+import conexample.db.sql
 import conexample.interface
 
 
 class TestEntryRequests:
     class TestGet:
-        def test_success(self, api_client):
+        def test_success(self, api_client, core):
             response = api_client.get("/v1/entry")
             assert response.status_code == 200
             assert len(response.json) == 2
+            assert "Link" not in response.headers
+            core.get_entries.assert_called_with(limit=101, after=None)
+
+        def test_pagination(self, api_client, core):
+            response = api_client.get("/v1/entry?limit=1")
+            assert response.status_code == 200
+            assert response.json == [{"name": "python", "rating": 5}]
+
+            link = response.headers["Link"]
+            assert link.startswith("<http://localhost/v1/entry?limit=1&cursor=")
+            assert link.endswith('>; rel="next"')
+
+            response = api_client.get(link[link.index("/v1/") : link.index(">")])
+            assert response.status_code == 200
+            core.get_entries.assert_called_with(limit=2, after="python")
+
+        def test_serves_cached_response(self, api_client, core):
+            for _ in range(3):
+                response = api_client.get("/v1/entry?limit=1")
+                assert response.status_code == 200
+                assert response.json == [{"name": "python", "rating": 5}]
+                assert "Link" in response.headers
+
+            assert core.get_entries.call_count == 1
+
+            core.get_entries_version.return_value = 2
+            response = api_client.get("/v1/entry?limit=1")
+            assert response.status_code == 200
+            assert core.get_entries.call_count == 2
+
+        def test_streaming(self, api_client, core):
+            response = api_client.get("/v1/entry?stream=true&limit=1")
+            assert response.status_code == 200
+            assert response.json == [
+                {"name": "python", "rating": 5},
+                {"name": "cassandra", "rating": 1},
+            ]
+            core.iter_entries.assert_called_with(after=None)
+            assert not core.get_entries.called
+
+        @pytest.mark.parametrize("count", (0, 1, 999, 1000, 1001, 2500))
+        def test_streaming_chunks(self, api_client, core, count):
+            core.get_entries.return_value = [
+                conexample.interface.CoreEntry(name="entry%d" % index, rating=index)
+                for index in range(count)
+            ]
+            response = api_client.get("/v1/entry?stream=true")
+            assert response.status_code == 200
+            assert response.json == [
+                {"name": "entry%d" % index, "rating": index} for index in range(count)
+            ]
+
+        @pytest.mark.parametrize("query", ("", "?stream=true"))
+        def test_conditional_request(self, api_client, core, query):
+            response = api_client.get("/v1/entry" + query)
+            etag = response.headers["ETag"]
+
+            response = api_client.get(
+                "/v1/entry" + query, headers={"If-None-Match": etag}
+            )
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+            assert not response.data
+            assert core.get_entries.call_count + core.iter_entries.call_count == 1
+
+            core.get_entries_version.return_value = 2
+            response = api_client.get(
+                "/v1/entry" + query, headers={"If-None-Match": etag}
+            )
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
+            assert len(response.json) == 2
+
+        def test_streaming_error_propagation(self, api_client, core):
+            core.iter_entries.side_effect = conexample.interface.CoreException
+            response = api_client.get("/v1/entry?stream=true")
+            assert response.status_code == 500
+
+        @pytest.mark.parametrize(
+            "query",
+            (
+                "limit=0",
+                "limit=1001",
+                "limit=x",
+                "cursor=%C3%A9",
+                "cursor=_w",
+                "cursor=%25%25%25",
+                "cursor=!!!!",
+                "cursor=",
+            ),
+        )
+        def test_fails_for_bad_request(self, api_client, query):
+            response = api_client.get("/v1/entry?" + query)
+            assert response.status_code == 400
 
         def test_error_propagation(self, api_client, core):
             core.get_entries.side_effect = conexample.interface.CoreException
@@ -74,6 +182,154 @@ class TestEntryRequests:
             assert response.status_code == 500
 
 
+class TestEntryBatchRequests:
+    class TestPost:
+        def test_success(self, api_client, core):
+
+            entries = [
+                {"name": "python", "rating": 5},
+                {"name": "cassandra", "rating": 6},
+            ]
+
+            response = api_client.post("/v1/batch/entry", json=entries)
+
+            assert response.status_code == 200
+            assert response.json == [
+                {"name": "python", "status": "created"},
+                {
+                    "name": "cassandra",
+                    "status": "rejected",
+                    "details": "cassandra cannot be rated above 1",
+                },
+            ]
+            core.set_entries_rating.assert_called_with(
+                [conexample.interface.CoreEntry(**entry) for entry in entries]
+            )
+
+        @pytest.mark.parametrize(
+            "data",
+            (
+                [],
+                {"name": "python", "rating": 5},
+                [{"name": "python", "rating": 5}, {"name": "python"}],
+                [{"name": "python", "rating": -5}],
+                [{"name": "python", "rating": 5}] * 1001,
+            ),
+        )
+        def test_fails_for_bad_request(self, api_client, data):
+            response = api_client.post("/v1/batch/entry", json=data)
+            assert response.status_code == 400
+
+        def test_error_propagation(self, api_client, core):
+            core.set_entries_rating.side_effect = conexample.interface.CoreException
+            response = api_client.post(
+                "/v1/batch/entry", json=[{"name": "python", "rating": 5}]
+            )
+            assert response.status_code == 500
+
+
+class TestEntryTopRequests:
+    class TestGet:
+        def test_success(self, api_client, core):
+            response = api_client.get("/v1/top/entry")
+            assert response.status_code == 200
+            assert response.json == [
+                {"name": "python", "rating": 5},
+                {"name": "cassandra", "rating": 1},
+            ]
+            assert response.headers["ETag"]
+            core.get_top_entries.assert_called_with(10)
+
+            response = api_client.get("/v1/top/entry?n=1")
+            assert response.json == [{"name": "python", "rating": 5}]
+            core.get_top_entries.assert_called_with(1)
+
+        def test_serves_cached_response(self, api_client, core):
+            for _ in range(3):
+                response = api_client.get("/v1/top/entry?n=1")
+                assert response.status_code == 200
+
+            core.get_top_entries.assert_called_once_with(1)
+
+        def test_conditional_request(self, api_client, core):
+            etag = api_client.get("/v1/top/entry").headers["ETag"]
+
+            response = api_client.get("/v1/top/entry", headers={"If-None-Match": etag})
+            assert response.status_code == 304
+
+            core.get_entries_version.return_value = 2
+            response = api_client.get("/v1/top/entry", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+
+        @pytest.mark.parametrize("n", ("0", "1001", "many"))
+        def test_fails_for_bad_request(self, api_client, n):
+            response = api_client.get("/v1/top/entry?n=" + n)
+            assert response.status_code == 400
+
+        def test_error_propagation(self, api_client, core):
+            core.get_top_entries.side_effect = conexample.interface.CoreException
+            response = api_client.get("/v1/top/entry")
+            assert response.status_code == 500
+
+
+class TestEntrySearchRequests:
+    class TestGet:
+        def test_success(self, api_client, core):
+            response = api_client.get("/v1/search/entry?q=pyth")
+            assert response.status_code == 200
+            assert response.json == ["python", "cython"]
+            core.search_entries.assert_called_with("pyth", 10)
+
+            api_client.get("/v1/search/entry?q=pyth&limit=2")
+            core.search_entries.assert_called_with("pyth", 2)
+
+        @pytest.mark.parametrize(
+            "query", ("", "?q=", "?q=pyth&limit=0", "?q=" + "a" * 101)
+        )
+        def test_fails_for_bad_request(self, api_client, query):
+            response = api_client.get("/v1/search/entry" + query)
+            assert response.status_code == 400
+
+        def test_error_propagation(self, api_client, core):
+            core.search_entries.side_effect = conexample.interface.CoreException
+            response = api_client.get("/v1/search/entry?q=pyth")
+            assert response.status_code == 500
+
+
+class TestStatsRequests:
+    class TestGet:
+        def test_success(self, api_client, core):
+            response = api_client.get("/v1/stats")
+            assert response.status_code == 200
+            assert response.json == {
+                "count": 2,
+                "sum": 6,
+                "mean": 3.0,
+                "min": 1,
+                "max": 5,
+                "histogram": [{"rating": 1, "count": 1}, {"rating": 5, "count": 1}],
+            }
+
+            etag = response.headers["ETag"]
+            response = api_client.get("/v1/stats", headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            core.get_rating_stats.assert_called_once_with()
+
+        def test_on_empty_db(self, api_client, core):
+            core.get_rating_stats.return_value = conexample.interface.CoreRatingStats(
+                count=0, sum=0, mean=None, min=None, max=None, histogram={}
+            )
+            response = api_client.get("/v1/stats")
+            assert response.status_code == 200
+            assert response.json["mean"] is None
+            assert response.json["histogram"] == []
+
+        def test_error_propagation(self, api_client, core):
+            core.get_rating_stats.side_effect = conexample.interface.CoreException
+            response = api_client.get("/v1/stats")
+            assert response.status_code == 500
+
+
 class TestEntryElementRequests:
     class TestGet:
         def test_success(self, api_client):
@@ -81,17 +337,45 @@ class TestEntryElementRequests:
             assert response.status_code == 200
             assert response.json["name"] == "python"
             assert response.json["rating"] == 5
+            assert response.headers["ETag"]
+
+        def test_conditional_request(self, api_client, core):
+            etag = api_client.get("/v1/entry/python").headers["ETag"]
+
+            response = api_client.get(
+                "/v1/entry/python", headers={"If-None-Match": etag}
+            )
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+            assert not response.data
+
+            core.get_entry.return_value = conexample.interface.CoreEntryDetails(
+                name="python",
+                rating=5,
+                modified=core.get_entry.return_value.modified + timedelta(seconds=1),
+            )
+            response = api_client.get(
+                "/v1/entry/python", headers={"If-None-Match": etag}
+            )
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
 
         def test_error_propagation(self, api_client, core):
-            core.get_rating.side_effect = conexample.interface.CoreException
+            core.get_entry.side_effect = conexample.interface.CoreException
             response = api_client.get("/v1/entry/python")
             assert response.status_code == 500
 
         def test_on_no_entry(self, api_client, core):
-            core.get_rating.side_effect = conexample.interface.CoreEntryNotFound
+            core.get_entry.side_effect = conexample.interface.CoreEntryNotFound
             response = api_client.get("/v1/entry/python")
             assert response.status_code == 404
 
+        def test_top_is_valid_entry_name(self, api_client, core):
+            response = api_client.get("/v1/entry/top")
+
+            assert response.status_code == 200
+            core.get_entry.assert_called_with("top")
+
     class TestPost:
         def test_success(self, api_client, core):
 
@@ -104,6 +388,12 @@ class TestEntryElementRequests:
             assert response.headers["Location"].endswith("/v1/entry/" + name)
             core.set_entry_rating.assert_called_with(name, rating)
 
+        def test_batch_is_valid_entry_name(self, api_client, core):
+            response = api_client.post("/v1/entry/batch", json={"rating": 3})
+
+            assert response.status_code == 201
+            core.set_entry_rating.assert_called_with("batch", 3)
+
         def test_on_entry_already_exists(self, api_client, core):
 
             core.set_entry_rating.return_value = False
@@ -150,6 +440,475 @@ class TestEntryElementRequests:
             assert response.status_code == 500
 
 
+class TestResponseCache:
+    def test_caches_responses_of_current_version(self):
+        cache = conexample.api.rest.cache.ResponseCache(size=10, max_body=100)
+
+        cache.set(1, "key", (b"[]", None))
+        assert cache.get(1, "key") == (b"[]", None)
+        assert cache.get(2, "key") is None
+        assert cache.get(1, "key") is None
+
+        cache.set(1, "key", (b"[]", None))
+        assert cache.get(2, "key") is None
+
+        stats = cache.stats
+        assert stats.hits == 1
+        assert stats.misses == 2
+        assert stats.invalidations == 1
+
+    def test_does_not_cache_oversized_responses(self):
+        cache = conexample.api.rest.cache.ResponseCache(size=10, max_body=1)
+
+        cache.set(1, "key", (b"[]", None))
+        assert cache.get(1, "key") is None
+        assert cache.stats.oversized == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = conexample.api.rest.cache.ResponseCache(size=1, max_body=100)
+
+        cache.set(1, "python", (b"[]", None))
+        cache.set(1, "flask", (b"[]", None))
+        assert cache.get(1, "python") is None
+        assert cache.stats.evictions == 1
+
+    def test_takes_parameters_from_settings(self, test_config):
+        test_config["API_REST_RESPONSE_CACHE_SIZE"] = "0"
+        cache = conexample.api.rest.cache.ResponseCache()
+
+        cache.set(1, "key", (b"[]", None))
+        assert cache.get(1, "key") is None
+
+
+class TestReadYourWrites:
+    @pytest.fixture
+    def flask_app(self, replicated_db_engines):
+        db = conexample.db.sql.SQLDatabase()
+        return conexample.api.rest.RestApi(conexample.core.ApplicationCore(db)).app
+
+    def test_reads_own_writes_from_primary(self, flask_app):
+        with flask_app.test_client() as client:
+            response = client.post("/v1/entry", json={"name": "python", "rating": 5})
+            assert response.status_code == 201
+            assert "conexample-write=" in response.headers["Set-Cookie"]
+
+            # Replicas are never written to, so only the primary serves the entry
+            assert client.get("/v1/entry/python").status_code == 200
+
+        with flask_app.test_client() as client:
+            assert client.get("/v1/entry/python").status_code == 404
+
+    def test_write_window_expires(self, flask_app):
+        with flask_app.test_client() as client:
+            client.post("/v1/entry", json={"name": "python", "rating": 5})
+
+            with patch("conexample.api.rest.time", return_value=time() + 6):
+                assert client.get("/v1/entry/python").status_code == 404
+
+    def test_asgi(self, replicated_asgi_client):
+        response = replicated_asgi_client.post(
+            "/v1/entry", json={"name": "python", "rating": 5}
+        )
+        cookie = response.headers["Set-Cookie"].split(";")[0]
+
+        assert replicated_asgi_client.get("/v1/entry/python").status_code == 404
+        response = replicated_asgi_client.get(
+            "/v1/entry/python", headers={"Cookie": cookie}
+        )
+        assert response.status_code == 200
+
+
+class TestOperationMetrics:
+    @staticmethod
+    def _sample(name, **labels):
+        return (
+            prometheus_client.REGISTRY.get_sample_value(
+                "conexample_operation_" + name, labels
+            )
+            or 0
+        )
+
+    def test_records_layers_of_operation(self, stateful_api_client):
+        operation = "conexample.api.entry.element.get"
+        counts = {
+            layer: self._sample(
+                "duration_seconds_count", operation=operation, layer=layer
+            )
+            for layer in ("api", "core", "database")
+        }
+        errors = {
+            (layer, exception): self._sample(
+                "errors_total", operation=operation, layer=layer, exception=exception
+            )
+            for layer, exception in (
+                ("api", "NotFound"),
+                ("core", "CoreEntryNotFound"),
+                ("database", "DatabaseEntryNotFound"),
+            )
+        }
+
+        assert stateful_api_client.get("/v1/entry/python").status_code == 404
+
+        for layer, count in counts.items():
+            assert (
+                self._sample("duration_seconds_count", operation=operation, layer=layer)
+                == count + 1
+            )
+
+        for (layer, exception), count in errors.items():
+            assert (
+                self._sample(
+                    "errors_total",
+                    operation=operation,
+                    layer=layer,
+                    exception=exception,
+                )
+                == count + 1
+            )
+
+    def test_reports_queries_in_server_timing(self, stateful_api_client, asgi_client):
+        for client in (stateful_api_client, asgi_client):
+            response = client.get("/v1/entry")
+            assert re.fullmatch(
+                r'db;desc="2 queries";dur=\d+\.\d{3}', response.headers["Server-Timing"]
+            )
+
+            response = client.get("/v1/entry?cursor=!")
+            assert response.status_code == 400
+            assert response.headers["Server-Timing"].startswith('db;desc="0 queries"')
+
+    def test_asgi_operation_ids(self, asgi_client):
+        operation = "conexample.api.entry.top.get"
+        count = self._sample("duration_seconds_count", operation=operation, layer="api")
+
+        asgi_client.get("/v1/top/entry")
+
+        assert (
+            self._sample("duration_seconds_count", operation=operation, layer="api")
+            == count + 1
+        )
+
+
+@pytest.mark.parametrize("name", ["stdlib", "orjson"])
+class TestJSONBackends:
+    def test_encodes_entry_records(self, name):
+        backend = conexample.api.rest.encoding.get_backend(name)
+        assert backend.name == name
+
+        document = backend.dumps(
+            {"entries": [conexample.interface.EntryRecord("python", 5)], "count": 1}
+        )
+        assert backend.loads(document) == {
+            "entries": [{"name": "python", "rating": 5}],
+            "count": 1,
+        }
+
+    def test_serves_requests(self, name, test_config, core):
+        test_config["API_REST_JSON_ENCODER"] = name
+        api = conexample.api.rest.RestApi(core)
+        assert api.json.name == name
+
+        with api.app.test_client() as client:
+            response = client.get("/v1/entry?stream=true")
+            assert response.json == [
+                {"name": "python", "rating": 5},
+                {"name": "cassandra", "rating": 1},
+            ]
+
+            response = client.post("/v1/entry", json={"name": "python", "rating": 5})
+            assert response.status_code == 201
+            assert response.json["title"] == "Created"
+
+            response = client.post(
+                "/v1/entry", data="{", content_type="application/json"
+            )
+            assert response.status_code == 400
+
+
+def test_unknown_json_backend():
+    with pytest.raises(ValueError):
+        conexample.api.rest.encoding.get_backend("yaml")
+
+
+class TestCompiledValidation:
+    @pytest.fixture
+    def api_clients(self, test_config, core):
+        clients = []
+
+        for mode in ("interpreted", "compiled"):
+            test_config["API_REST_VALIDATION"] = mode
+            with conexample.api.rest.RestApi(core).app.test_client() as client:
+                clients.append(client)
+
+        return clients
+
+    @pytest.mark.parametrize(
+        "path,data",
+        [
+            ("/v1/entry", {"name": "python", "rating": 5}),
+            ("/v1/entry", {"name": "", "rating": 5}),
+            ("/v1/entry", {"name": "python", "rating": -1}),
+            ("/v1/entry", {"name": "python", "rating": 5.0}),
+            ("/v1/entry", {"name": "python", "rating": True}),
+            ("/v1/entry", {"name": "python"}),
+            ("/v1/entry", ["python"]),
+            ("/v1/entry", None),
+            ("/v1/entry/python", {"rating": 5}),
+            ("/v1/entry/python", {"rating": "5"}),
+            ("/v1/batch/entry", [{"name": "python", "rating": 5}]),
+            ("/v1/batch/entry", []),
+            ("/v1/batch/entry", [{"name": "python", "rating": 5}, {"name": 5}]),
+        ],
+    )
+    def test_responses_match_interpreted_validation(self, api_clients, path, data):
+        interpreted, compiled = [client.post(path, json=data) for client in api_clients]
+
+        assert compiled.status_code == interpreted.status_code
+        assert compiled.json == interpreted.json
+
+    def test_skips_schemas_with_interpreted_keywords(self):
+        schema = {"type": "object", "properties": {"name": {"nullable": True}}}
+        assert conexample.api.rest.validation.compile_schema(schema) is None
+
+        schema = {"type": "object", "properties": {"name": {"type": "string"}}}
+        assert conexample.api.rest.validation.compile_schema(schema) is not None
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            conexample.api.rest.validation.get_validator_map("lazy")
+
+
+class TestSpecificationCache:
+    def test_serves_requests_with_cached_specification(
+        self, test_config, tmp_path, core
+    ):
+        test_config["API_REST_SPEC_CACHE_DIR"] = str(tmp_path)
+
+        conexample.api.rest.RestApi(core)
+        assert len(list(tmp_path.glob("api-*.json"))) == 1
+
+        cache = conexample.api.rest.specification.SpecificationCache()
+        assert cache.load()["paths"].keys() == {
+            "/entry",
+            "/batch/entry",
+            "/top/entry",
+            "/search/entry",
+            "/stats",
+            "/entry/{name}",
+        }
+
+        with conexample.api.rest.RestApi(core).app.test_client() as client:
+            response = client.get("/v1/entry/python")
+            assert response.status_code == 200
+
+    def test_invalidated_by_specification_change(self, tmp_path):
+        spec_path = tmp_path / "api.yml"
+        spec_path.write_text("openapi: 3.0.0\n")
+
+        cache = conexample.api.rest.specification.SpecificationCache(str(tmp_path))
+        cache.store(mock.Mock(raw={"openapi": "3.0.0"}), str(spec_path))
+        assert cache.load(str(spec_path)) == {"openapi": "3.0.0"}
+
+        spec_path.write_text("openapi: 3.0.1\n")
+        assert cache.load(str(spec_path)) is None
+
+    def test_ignores_corrupted_cache(self, tmp_path):
+        cache = conexample.api.rest.specification.SpecificationCache(str(tmp_path))
+        cache.store(mock.Mock(raw={}))
+
+        for path in tmp_path.glob("api-*.json"):
+            path.write_text("{")
+
+        assert cache.load() is None
+
+    def test_disabled_by_default(self, test_config):
+        cache = conexample.api.rest.specification.SpecificationCache()
+        assert cache.directory is None
+        assert cache.load() is None
+
+
+class TestAsgiRestApi:
+    def test_entries_flow(self, asgi_client):
+        response = asgi_client.post("/v1/entry", json={"name": "python", "rating": 5})
+        assert response.status_code == 201
+        assert response.headers["Location"] == "entry/python"
+
+        response = asgi_client.post(
+            "/v1/batch/entry",
+            json=[{"name": "flask", "rating": 4}, {"name": "cassandra", "rating": 5}],
+        )
+        assert response.status_code == 200
+        assert [item["status"] for item in response.json] == ["created", "rejected"]
+
+        response = asgi_client.post("/v1/entry/python", json={"rating": 4})
+        assert response.status_code == 200
+
+        response = asgi_client.get("/v1/entry/python")
+        assert response.status_code == 200
+        assert response.json == {"name": "python", "rating": 4}
+
+        response = asgi_client.get("/v1/top/entry?n=1")
+        assert response.status_code == 200
+        assert response.json == [{"name": "flask", "rating": 4}]
+
+        response = asgi_client.get("/v1/stats")
+        assert response.status_code == 200
+        assert response.json["histogram"] == [{"rating": 4, "count": 2}]
+
+        response = asgi_client.get("/v1/search/entry?q=flsk")
+        assert response.status_code == 200
+        assert response.json == ["flask"]
+
+        response = asgi_client.delete("/v1/entry/python")
+        assert response.status_code == 200
+
+        response = asgi_client.get("/v1/entry/python")
+        assert response.status_code == 404
+
+    def test_serves_specification(self, asgi_client, api_client):
+        response = asgi_client.get("/v1/openapi.json")
+
+        assert response.status_code == 200
+        assert response.json == api_client.get("/v1/openapi.json").json
+
+    def test_serves_metrics(self, asgi_client, api_client):
+        asgi_client.get("/v1/entry")
+
+        response = asgi_client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert (
+            b'conexample_db_pool_checkouts_total{database="primary"}' in response.data
+        )
+
+        response = api_client.get("/metrics")
+        assert response.status_code == 200
+        assert (
+            b'conexample_db_pool_checkouts_total{database="primary"}' in response.data
+        )
+
+    def test_pagination(self, asgi_client):
+        for name in ("python", "flask", "cassandra"):
+            asgi_client.post("/v1/entry", json={"name": name, "rating": 1})
+
+        response = asgi_client.get("/v1/entry?limit=2")
+        assert response.json == [
+            {"name": "cassandra", "rating": 1},
+            {"name": "flask", "rating": 1},
+        ]
+
+        link = response.headers["Link"]
+        response = asgi_client.get(link[link.index("/v1/") : link.index(">")])
+        assert response.json == [{"name": "python", "rating": 1}]
+        assert "Link" not in response.headers
+
+    @patch("conexample.api.rest.STREAM_CHUNK_SIZE", 2)
+    def test_streaming(self, asgi_client):
+        response = asgi_client.get("/v1/entry?stream=true")
+        assert response.json == []
+
+        for name in ("python", "flask", "cassandra"):
+            asgi_client.post("/v1/entry", json={"name": name, "rating": 1})
+
+        response = asgi_client.get("/v1/entry?stream=true")
+        assert [entry["name"] for entry in response.json] == [
+            "cassandra",
+            "flask",
+            "python",
+        ]
+
+    def test_conditional_requests(self, asgi_client):
+        asgi_client.post("/v1/entry", json={"name": "python", "rating": 5})
+
+        for path in ("/v1/entry", "/v1/entry/python"):
+            etag = asgi_client.get(path).headers["Etag"]
+
+            response = asgi_client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.data == b""
+
+    @pytest.mark.parametrize(
+        "method,path,data",
+        [
+            ("get", "/v1/entry?limit=0", None),
+            ("get", "/v1/entry?limit=many", None),
+            ("get", "/v1/entry?stream=maybe", None),
+            ("get", "/v1/entry?unknown=1", None),
+            ("get", "/v1/entry?cursor=%C3%A9", None),
+            ("get", "/v1/entry?cursor=!!!!", None),
+            ("get", "/v1/top/entry?n=0", None),
+            ("get", "/v1/search/entry", None),
+            ("get", "/v1/search/entry?q=", None),
+            ("post", "/v1/entry", {"name": "", "rating": 5}),
+            ("post", "/v1/entry", {"name": "python"}),
+            ("post", "/v1/entry/python", {"rating": "5"}),
+            ("post", "/v1/batch/entry", [{"name": "python", "rating": -1}]),
+            ("post", "/v1/batch/entry", []),
+        ],
+    )
+    def test_errors_match_wsgi_api(self, asgi_client, api_client, method, path, data):
+        kwargs = {"json": data} if data is not None else {}
+
+        expected = getattr(api_client, method)(path, **kwargs)
+        response = getattr(asgi_client, method)(path, **kwargs)
+
+        assert response.status_code == expected.status_code
+        assert response.json == expected.json
+
+    def test_unknown_routes(self, asgi_client):
+        assert asgi_client.get("/v1/unknown").status_code == 404
+        assert asgi_client.delete("/v1/entry").status_code == 405
+
+
+class TestReadiness:
+    def test_reports_readiness(self, core):
+        api = conexample.api.rest.RestApi(core)
+
+        with api.app.test_client() as client:
+            response = client.get("/ready")
+            assert response.status_code == 503
+            assert response.json == {"ready": False}
+
+            api.ready = True
+            response = client.get("/ready")
+            assert response.status_code == 200
+            assert response.json == {"ready": True}
+
+    def test_asgi_reports_readiness_after_startup(self, asgi_client):
+        api = asgi_client.app
+
+        async def warm_up():
+            api.ready = True
+
+        api.startup_hooks.append(warm_up)
+
+        assert asgi_client.get("/ready").status_code == 503
+
+        async def lifespan():
+            messages = iter(
+                [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+            )
+            sent = []
+
+            async def receive():
+                return next(messages)
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await api({"type": "lifespan"}, receive, send)
+            return sent
+
+        assert asyncio.run(lifespan()) == [
+            "lifespan.startup.complete",
+            "lifespan.shutdown.complete",
+        ]
+
+        response = asgi_client.get("/ready")
+        assert response.status_code == 200
+        assert response.json == {"ready": True}
+
+
 def test_connexion_resolver_on_invalid_func_id(core):
     api = conexample.api.rest.RestApi(core)
     with pytest.raises(ImportError):
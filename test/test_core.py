@@ -1,7 +1,13 @@
+import asyncio
+from unittest.mock import patch
+
+import prometheus_client
 import pytest
 
 import conexample.core
 import conexample.interface
+import conexample.metrics
+import conexample.search
 
 
 class TestCalls:
@@ -23,6 +29,20 @@ class TestCalls:
             with pytest.raises(conexample.interface.CoreInternalError):
                 core.get_rating("python")
 
+    class TestGetEntry:
+        def test_on_succes(self, db):
+            core = conexample.core.ApplicationCore(db)
+            ret = core.get_entry("python")
+            assert ret.name == db.get_entry.return_value.name
+            assert ret.rating == db.get_entry.return_value.rating
+            assert ret.modified == db.get_entry.return_value.modified
+
+        def test_on_no_entry(self, db):
+            db.get_entry.side_effect = conexample.interface.DatabaseEntryNotFound
+            core = conexample.core.ApplicationCore(db)
+            with pytest.raises(conexample.interface.CoreEntryNotFound):
+                core.get_entry("python")
+
     class TestSetEntryRating:
         def test_on_success(self, db):
 
@@ -47,6 +67,66 @@ class TestCalls:
             with pytest.raises(conexample.interface.CoreInternalError):
                 core.set_entry_rating("python", 6)
 
+    class TestSetEntriesRating:
+        def test_on_success(self, db):
+
+            db.set_entries_rating.side_effect = None
+            db.set_entries_rating.return_value = [True, False]
+
+            core = conexample.core.ApplicationCore(db)
+            ret = core.set_entries_rating(
+                [
+                    conexample.interface.CoreEntry(name="python", rating=5),
+                    conexample.interface.CoreEntry(name="flask", rating=4),
+                ]
+            )
+
+            assert [(result.name, result.status) for result in ret] == [
+                ("python", conexample.interface.CoreEntryWriteStatus.CREATED),
+                ("flask", conexample.interface.CoreEntryWriteStatus.UPDATED),
+            ]
+            db.set_entries_rating.assert_called_once_with([("python", 5), ("flask", 4)])
+
+        def test_cassandra_case(self, db):
+
+            core = conexample.core.ApplicationCore(db)
+            ret = core.set_entries_rating(
+                [
+                    conexample.interface.CoreEntry(name="cassandra", rating=6),
+                    conexample.interface.CoreEntry(name="python", rating=5),
+                    conexample.interface.CoreEntry(name="cassandra", rating=1),
+                ]
+            )
+
+            assert [result.status for result in ret] == [
+                conexample.interface.CoreEntryWriteStatus.REJECTED,
+                conexample.interface.CoreEntryWriteStatus.CREATED,
+                conexample.interface.CoreEntryWriteStatus.CREATED,
+            ]
+            assert ret[0].details
+            db.set_entries_rating.assert_called_once_with(
+                [("python", 5), ("cassandra", 1)]
+            )
+
+        def test_on_all_rejected(self, db):
+
+            core = conexample.core.ApplicationCore(db)
+            ret = core.set_entries_rating(
+                [conexample.interface.CoreEntry(name="cassandra", rating=6)]
+            )
+
+            assert ret[0].status == conexample.interface.CoreEntryWriteStatus.REJECTED
+            assert not db.set_entries_rating.called
+
+        def test_on_db_error(self, db):
+
+            db.set_entries_rating.side_effect = conexample.interface.DatabaseException
+            core = conexample.core.ApplicationCore(db)
+            with pytest.raises(conexample.interface.CoreInternalError):
+                core.set_entries_rating(
+                    [conexample.interface.CoreEntry(name="python", rating=5)]
+                )
+
     class TestDeleteEntry:
         def test_on_succes(self, db):
             core = conexample.core.ApplicationCore(db)
@@ -73,6 +153,17 @@ class TestCalls:
             for entry in ret:
                 assert isinstance(entry, conexample.interface.CoreEntry)
 
+        def test_passes_records_through(self, db):
+            core = conexample.core.ApplicationCore(db)
+            ret = core.get_entries()
+            for entry, record in zip(ret, db.get_entries.return_value):
+                assert entry is record
+
+        def test_passes_page_bounds(self, db):
+            core = conexample.core.ApplicationCore(db)
+            core.get_entries(limit=10, after="python")
+            db.get_entries.assert_called_once_with(limit=10, after="python")
+
         def test_on_empty_db(self, db):
             db.get_entries.return_value = []
             core = conexample.core.ApplicationCore(db)
@@ -84,3 +175,312 @@ class TestCalls:
             core = conexample.core.ApplicationCore(db)
             with pytest.raises(conexample.interface.CoreInternalError):
                 core.get_entries()
+
+    class TestGetTopEntries:
+        def test_on_succes(self, db):
+            core = conexample.core.ApplicationCore(db)
+            ret = core.get_top_entries(1)
+            assert ret == db.get_entries.return_value[:1]
+            db.get_top_entries.assert_called_once_with(1)
+
+        def test_on_db_error(self, db):
+            db.get_top_entries.side_effect = conexample.interface.DatabaseException
+            core = conexample.core.ApplicationCore(db)
+            with pytest.raises(conexample.interface.CoreInternalError):
+                core.get_top_entries(10)
+
+    class TestIterEntries:
+        def test_on_succes(self, db):
+            core = conexample.core.ApplicationCore(db)
+            ret = list(core.iter_entries(after="cassandra"))
+            assert len(ret) == len(db.get_entries.return_value)
+            for entry in ret:
+                assert isinstance(entry, conexample.interface.CoreEntry)
+            db.iter_entries.assert_called_once_with(after="cassandra")
+
+        def test_on_db_error(self, db):
+            def failing_iter(after=None):
+                yield db.get_entries.return_value[0]
+                raise conexample.interface.DatabaseException
+
+            db.iter_entries.side_effect = failing_iter
+            core = conexample.core.ApplicationCore(db)
+            entries = core.iter_entries()
+            assert next(entries).name == db.get_entries.return_value[0].name
+            with pytest.raises(conexample.interface.CoreInternalError):
+                next(entries)
+
+    class TestGetEntriesVersion:
+        def test_on_succes(self, db):
+            core = conexample.core.ApplicationCore(db)
+            assert core.get_entries_version() == db.get_entries_version.return_value
+
+        def test_on_db_error(self, db):
+            db.get_entries_version.side_effect = conexample.interface.DatabaseException
+            core = conexample.core.ApplicationCore(db)
+            with pytest.raises(conexample.interface.CoreInternalError):
+                core.get_entries_version()
+
+    class TestGetRatingStats:
+        def test_on_succes(self, db):
+            db.get_rating_histogram.return_value = {5: 2, 1: 1}
+            core = conexample.core.ApplicationCore(db)
+            assert core.get_rating_stats() == conexample.interface.CoreRatingStats(
+                count=3, sum=11, mean=11 / 3, min=1, max=5, histogram={1: 1, 5: 2}
+            )
+
+        def test_on_empty_db(self, db):
+            db.get_rating_histogram.return_value = {}
+            core = conexample.core.ApplicationCore(db)
+            assert core.get_rating_stats() == conexample.interface.CoreRatingStats(
+                count=0, sum=0, mean=None, min=None, max=None, histogram={}
+            )
+
+        def test_on_db_error(self, db):
+            db.get_rating_histogram.side_effect = conexample.interface.DatabaseException
+            core = conexample.core.ApplicationCore(db)
+            with pytest.raises(conexample.interface.CoreInternalError):
+                core.get_rating_stats()
+
+    class TestSearchEntries:
+        def test_loads_index_on_first_search(self, db):
+            core = conexample.core.ApplicationCore(db)
+
+            assert core.search_entries("PYT", 10) == ["python"]
+            assert core.search_entries("casandra", 10) == ["cassandra"]
+            db.iter_entries.assert_called_once_with()
+
+        def test_follows_writes(self, db):
+            core = conexample.core.ApplicationCore(db)
+            core.load_search_index()
+
+            core.set_entry_rating("pythran", 3)
+            db.set_entry_rating.return_value = False
+            core.set_entry_rating("pyramid", 3)
+            assert core.search_entries("py", 10) == ["python", "pythran"]
+
+            core.set_entries_rating(
+                [
+                    conexample.interface.CoreEntry(name="pyramid", rating=3),
+                    conexample.interface.CoreEntry(name="cassandra", rating=5),
+                ]
+            )
+            core.delete_entry("python")
+            assert core.search_entries("py", 10) == ["pyramid", "pythran"]
+
+        @patch("conexample.core.threading.Thread")
+        @patch("conexample.search.monotonic")
+        def test_reloads_stale_index(self, monotonic, thread, db, test_config):
+            test_config["CORE_SEARCH_INDEX_TTL"] = "60"
+            monotonic.return_value = 0
+            core = conexample.core.ApplicationCore(db)
+            core.load_search_index()
+
+            monotonic.return_value = 61
+            db.get_entries.return_value = [conexample.interface.CoreEntry("flask", 4)]
+            assert core.search_entries("flask", 10) == []
+
+            thread.return_value.start.assert_called_once_with()
+            thread.call_args[1]["target"]()
+            assert core.search_entries("flask", 10) == ["flask"]
+
+        def test_on_db_error(self, db):
+            db.iter_entries.side_effect = conexample.interface.DatabaseException
+            core = conexample.core.ApplicationCore(db)
+            with pytest.raises(conexample.interface.CoreInternalError):
+                core.search_entries("python", 10)
+
+    class TestWarmUp:
+        def test_warms_database_up(self, db):
+            core = conexample.core.ApplicationCore(db)
+            core.warm_up(4, 10)
+            db.warm_up.assert_called_once_with(4, 10)
+
+        def test_database_unavailable(self, db):
+            db.warm_up.side_effect = conexample.interface.DatabaseStorageUnavailable
+            core = conexample.core.ApplicationCore(db)
+
+            with pytest.raises(conexample.interface.CoreException):
+                core.warm_up(4, 10)
+
+
+class TestSearchIndex:
+    def test_ranks_prefix_matches_first(self):
+        index = conexample.search.TrigramIndex(
+            ["cython", "Python", "pythran", "jython", "perl"]
+        )
+
+        assert index.search("pyth", 10) == ["Python", "pythran"]
+        assert index.search("pyth", 1) == ["Python"]
+        assert index.search("python", 10) == ["Python", "cython", "jython", "pythran"]
+        assert index.search("python", 2) == ["Python", "cython"]
+
+    def test_matches_typos(self):
+        index = conexample.search.TrigramIndex(["postgresql", "mongodb", "cassandra"])
+
+        assert index.search("postgersql", 10) == ["postgresql"]
+        assert index.search("mangodb", 10) == ["mongodb"]
+        assert index.search("sql server", 10) == []
+
+    def test_adds_and_discards_names(self):
+        index = conexample.search.TrigramIndex(["flask"])
+
+        index.add("Flask")
+        index.add("flask-restful")
+        index.add("flask")
+        assert len(index) == 3
+        assert index.search("fla", 10) == ["Flask", "flask", "flask-restful"]
+
+        index.discard("flask")
+        index.discard("django")
+        assert len(index) == 2
+        assert index.search("fla", 10) == ["Flask", "flask-restful"]
+
+    def test_applies_writes_made_while_loading(self):
+        search_index = conexample.search.SearchIndex(ttl=0)
+
+        def names():
+            yield "python"
+            yield "flask"
+            search_index.update(added=["django"], removed=["flask"])
+
+        assert search_index.stale
+        search_index.load(names())
+        assert not search_index.stale
+        assert search_index.search("django", 10) == ["django"]
+        assert search_index.search("flask", 10) == []
+        assert search_index.search("python", 10) == ["python"]
+
+
+class TestOperationMetrics:
+    @staticmethod
+    def _sample(name, **labels):
+        return prometheus_client.REGISTRY.get_sample_value(
+            "conexample_operation_" + name, labels
+        )
+
+    def test_times_calls_and_counts_errors(self, db):
+        core = conexample.core.ApplicationCore(db)
+        labels = {"operation": "test.get_rating", "layer": "core"}
+
+        token = conexample.metrics.OPERATION.set("test.get_rating")
+        try:
+            core.get_rating("python")
+            db.get_entry.side_effect = conexample.interface.DatabaseStorageUnavailable
+            with pytest.raises(conexample.interface.CoreInternalError):
+                core.get_rating("python")
+        finally:
+            conexample.metrics.OPERATION.reset(token)
+
+        assert self._sample("duration_seconds_count", **labels) == 2
+        assert (
+            self._sample("errors_total", exception="CoreInternalError", **labels) == 1
+        )
+
+    def test_counts_errors_of_generators(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        db.get_entries.side_effect = conexample.interface.DatabaseStorageUnavailable
+
+        async def iterate():
+            conexample.metrics.OPERATION.set("test.iter_entries")
+            return [entry async for entry in core.iter_entries()]
+
+        with pytest.raises(conexample.interface.CoreInternalError):
+            asyncio.run(iterate())
+
+        assert (
+            self._sample(
+                "errors_total",
+                operation="test.iter_entries",
+                layer="core",
+                exception="CoreInternalError",
+            )
+            == 1
+        )
+
+
+class TestAsyncCalls:
+    def test_get_entry(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        ret = asyncio.run(core.get_entry("python"))
+        assert ret.name == db.get_entry.return_value.name
+
+        db.get_entry.side_effect = conexample.interface.DatabaseEntryNotFound
+        with pytest.raises(conexample.interface.CoreEntryNotFound):
+            asyncio.run(core.get_entry("python"))
+
+    def test_set_entry_rating(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        assert asyncio.run(core.set_entry_rating("python", 5))
+        db.set_entry_rating.assert_called_once_with("python", 5)
+
+        with pytest.raises(conexample.interface.CoreInvalidRequest):
+            asyncio.run(core.set_entry_rating("cassandra", 5))
+
+    def test_set_entries_rating(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        results = asyncio.run(
+            core.set_entries_rating(
+                [
+                    conexample.interface.CoreEntry("python", 5),
+                    conexample.interface.CoreEntry("cassandra", 5),
+                ]
+            )
+        )
+
+        assert [result.status for result in results] == [
+            conexample.interface.CoreEntryWriteStatus.CREATED,
+            conexample.interface.CoreEntryWriteStatus.REJECTED,
+        ]
+        db.set_entries_rating.assert_called_once_with([("python", 5)])
+
+    def test_delete_entry(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        asyncio.run(core.delete_entry("python"))
+
+        db.delete_entry.return_value = False
+        with pytest.raises(conexample.interface.CoreEntryNotFound):
+            asyncio.run(core.delete_entry("python"))
+
+    def test_get_entries(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        entries = asyncio.run(core.get_entries(limit=10, after="flask"))
+
+        assert entries == db.get_entries.return_value
+        db.get_entries.assert_called_once_with(limit=10, after="flask")
+        assert asyncio.run(core.get_entries_version()) == 1
+
+    def test_get_top_entries(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+
+        assert asyncio.run(core.get_top_entries(10)) == db.get_entries.return_value
+        db.get_top_entries.assert_called_once_with(10)
+
+    def test_search_entries(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+
+        assert asyncio.run(core.search_entries("cass", 10)) == ["cassandra"]
+        asyncio.run(core.set_entry_rating("cassius", 1))
+        assert asyncio.run(core.search_entries("cass", 10)) == ["cassandra", "cassius"]
+
+    def test_get_rating_stats(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+
+        assert asyncio.run(core.get_rating_stats()).histogram == {1: 1, 5: 1}
+
+    def test_iter_entries(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+
+        async def collect():
+            return [entry async for entry in core.iter_entries()]
+
+        assert asyncio.run(collect()) == db.get_entries.return_value
+
+        db.get_entries.side_effect = conexample.interface.DatabaseException
+        with pytest.raises(conexample.interface.CoreInternalError):
+            asyncio.run(collect())
+
+    def test_warm_up(self, async_db, db):
+        core = conexample.core.AsyncApplicationCore(async_db)
+        asyncio.run(core.warm_up(4, 10))
+        db.warm_up.assert_called_once_with(4, 10)
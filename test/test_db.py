@@ -1,13 +1,26 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from time import sleep
-from unittest.mock import patch
+from unittest import mock
+from unittest.mock import Mock, patch
 
+import prometheus_client
 import pytest
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
 
+import conexample.db.batch
+import conexample.db.cache
 import conexample.db.sql
+import conexample.db.sql.aio
 import conexample.db.sql.db
 import conexample.db.sql.models
+import conexample.db.sql.stats
+import conexample.interface
+import conexample.metrics
 
 
 class TestDbConnection:
@@ -19,9 +32,10 @@ class TestDbConnection:
 
         assert conexample.db.sql.db.Session.kw["bind"]
 
+    @patch("conexample.db.sql.db.event")
     @patch("conexample.db.sql.db.create_engine_full")
     def test_configures_pool_parameters(
-        self, create_engine_full, db_session, test_config
+        self, create_engine_full, event, db_session, test_config
     ):
         db = conexample.db.sql.SQLDatabase()
 
@@ -40,6 +54,86 @@ class TestDbConnection:
             test_config["DATABASE_SQL_DATABASE_URI"],
             pool_size=pool_size,
             max_overflow=pool_overflow,
+            poolclass=mock.ANY,
+        )
+
+        # Pool class measures the checkout wait time
+        poolclass = create_engine_full.call_args[1]["poolclass"]
+        assert issubclass(poolclass, conexample.db.sql.db.TimedQueuePool)
+        assert poolclass.database == "primary"
+
+    def test_engine_dispose_replaces_connection_pool(self, file_db_engine):
+        db = conexample.db.sql.SQLDatabase()
+        db.get_entries()
+        pool = file_db_engine.pool
+
+        conexample.db.sql.db.engine_dispose()
+        assert file_db_engine.pool is not pool
+
+        # New connections are opened on demand
+        db.get_entries()
+
+    def test_engine_dispose_ignores_bound_connection(self, coupled_db_session):
+        conexample.db.sql.db.engine_dispose()
+
+    def test_exports_pool_metrics(self, test_config, tmp_path):
+        engine = conexample.db.sql.db.create_engine(
+            uri="sqlite:///%s" % (tmp_path / "db.sqlite"),
+            database="pool-test",
+            pool_size=1,
+            max_overflow=1,
+        )
+
+        def sample(name):
+            return prometheus_client.REGISTRY.get_sample_value(
+                "conexample_db_pool_" + name, {"database": "pool-test"}
+            )
+
+        with engine.connect(), engine.connect():
+            assert sample("checked_out") == 2
+            assert sample("overflow") == 1
+
+        assert sample("connects_total") == 2
+        assert sample("overflow_connects_total") == 1
+        assert sample("checkouts_total") == 2
+        assert sample("checkins_total") == 2
+        assert sample("checked_out") == 0
+        assert sample("checkout_wait_seconds_count") == 2
+
+        # Metrics are collected by the pool recreated on dispose
+        engine.dispose()
+        engine.connect().close()
+        assert sample("checkouts_total") == 3
+        assert sample("checkout_wait_seconds_count") == 3
+
+    def test_times_queries(self, test_config, caplog):
+        test_config["DATABASE_SQL_SLOW_QUERY"] = "0.000001"
+        engine = conexample.db.sql.db.create_engine(
+            uri="sqlite://", database="query-test"
+        )
+        queries = conexample.metrics.RequestQueries()
+        token = conexample.metrics.REQUEST_QUERIES.set(queries)
+
+        try:
+            with engine.connect() as connection:
+                connection.execute("SELECT 1")
+                with pytest.raises(SQLAlchemyError):
+                    connection.execute("SELECT * FROM missing")
+                connection.execute("SELECT 2")
+        finally:
+            conexample.metrics.REQUEST_QUERIES.reset(token)
+
+        assert queries.count == 2
+        assert queries.duration > 0
+        assert (
+            prometheus_client.REGISTRY.get_sample_value(
+                "conexample_db_query_duration_seconds_count",
+                {"operation": "internal", "database": "query-test"},
+            )
+            == 2
+        )
+        assert [record.getMessage() for record in caplog.records][-1].endswith(
+            "SELECT 2"
         )
 
     def test_fails_on_db_unreachable(self):
@@ -50,6 +144,129 @@ class TestDbConnection:
             db.get_entries()
 
 
+class TestWarmUp:
+    def test_opens_pooled_connections(self, test_config, tmp_path):
+        engine = conexample.db.sql.db.create_engine(
+            pool_size=3, max_overflow=5, uri="sqlite:///%s" % (tmp_path / "db")
+        )
+
+        try:
+            conexample.db.sql.db.engine_warm_up(engine, 10)
+
+            # Connections above the pool size would be closed on return anyway
+            assert engine.pool.checkedin() == 3
+            assert engine.pool.checkedout() == 0
+        finally:
+            engine.dispose()
+
+    def test_reads_hot_entries(self, file_db_engine):
+        db = conexample.db.sql.SQLDatabase()
+        db.set_entries_rating([("python", 5), ("flask", 4), ("cassandra", 1)])
+
+        with patch.object(db, "get_entry", wraps=db.get_entry) as get_entry:
+            db.warm_up(2, 2)
+
+        assert [call[0][0] for call in get_entry.call_args_list] == ["python", "flask"]
+
+    def test_reports_unavailable_database(self, test_config, tmp_path):
+        test_config["DATABASE_SQL_DATABASE_URI"] = "sqlite:///%s" % (
+            tmp_path / "missing" / "db"
+        )
+        conexample.db.sql.db.Session = sessionmaker()
+
+        try:
+            with pytest.raises(conexample.interface.DatabaseStorageUnavailable):
+                conexample.db.sql.SQLDatabase().warm_up(1, 0)
+        finally:
+            conexample.db.sql.db.engine_dispose()
+            conexample.db.sql.db.Session = sessionmaker()
+
+
+class TestReplicas:
+    @staticmethod
+    def _insert(engine, name):
+        engine.execute(
+            conexample.db.sql.models.Entry.__table__.insert(), name=name, rating=1
+        )
+
+    @staticmethod
+    def _names(db):
+        return [entry.name for entry in db.get_entries()]
+
+    def test_routes_reads_to_replicas(self, replicated_db_engines):
+        db = conexample.db.sql.SQLDatabase()
+        assert db.set_entry_rating("python", 5)
+
+        # Nothing is replicated to the replicas
+        assert db.get_entries() == []
+        assert not db.set_entry_rating("python", 4)
+
+        token = conexample.interface.READ_ROUTING.set(
+            conexample.interface.ReadRouting(primary=True)
+        )
+        try:
+            assert self._names(db) == ["python"]
+        finally:
+            conexample.interface.READ_ROUTING.reset(token)
+
+    def test_balances_reads(self, replicated_db_engines):
+        _, first, second = replicated_db_engines
+        self._insert(first, "flask")
+        self._insert(second, "django")
+
+        db = conexample.db.sql.SQLDatabase()
+        served = [self._names(db) for _ in range(4)]
+        assert sorted(served) == [["django"], ["django"], ["flask"], ["flask"]]
+        assert served[0] != served[1]
+
+        # All reads of a request are served by the same replica
+        token = conexample.interface.READ_ROUTING.set(
+            conexample.interface.ReadRouting()
+        )
+        try:
+            assert len({tuple(self._names(db)) for _ in range(4)}) == 1
+        finally:
+            conexample.interface.READ_ROUTING.reset(token)
+
+    def test_skips_failed_replicas(self, replicated_db_engines, tmp_path):
+        primary, _, second = replicated_db_engines
+        self._insert(primary, "python")
+        self._insert(second, "django")
+
+        db = conexample.db.sql.SQLDatabase()
+        db.get_entries()
+
+        failing = conexample.db.sql.db.create_engine(
+            uri="sqlite:///%s" % (tmp_path / "missing" / "db")
+        )
+        conexample.db.sql.db.replicas_bind([failing, second])
+
+        assert [self._names(db) for _ in range(3)] == [["django"]] * 3
+        assert conexample.db.sql.db.Replicas.candidates() == [second]
+
+        # Reads fall back to the primary database
+        conexample.db.sql.db.Replicas.mark_failed(second)
+        assert self._names(db) == ["python"]
+
+        with patch(
+            "conexample.db.sql.db.monotonic", return_value=datetime.max.timestamp(),
+        ):
+            assert len(conexample.db.sql.db.Replicas.candidates()) == 2
+
+    def test_async_routing(self, replicated_db_engines):
+        self._insert(replicated_db_engines[0], "python")
+        db = conexample.db.sql.aio.AsyncSQLDatabase()
+
+        async def names(primary):
+            conexample.interface.READ_ROUTING.set(
+                conexample.interface.ReadRouting(primary=primary)
+            )
+            return [entry.name for entry in await db.get_entries()]
+
+        assert asyncio.run(names(False)) == []
+        assert asyncio.run(names(True)) == ["python"]
+
+
 class TestCalls:
     @patch("sqlalchemy.orm.query.Query")
     def test_generic_error_handler(self, query):
@@ -57,7 +274,7 @@ class TestCalls:
         db = conexample.db.sql.SQLDatabase()
 
         with pytest.raises(conexample.interface.DatabaseException) as excinfo:
-            db.get_entries()
+            db.get_entry("python")
         assert type(excinfo.value.args[0]) is SQLAlchemyError
 
     class TestSetEntryRating:
@@ -108,6 +325,72 @@ class TestCalls:
             assert entry.created != entry.modified
             assert datetime.utcnow() - entry.modified < timedelta(seconds=1)
 
+        def test_concurrent_writes_of_same_entry(self, file_db_engine):
+
+            db = conexample.db.sql.SQLDatabase()
+            workers = 8
+
+            for name in ("python", "flask", "cassandra"):
+                barrier = threading.Barrier(workers)
+
+                def write(rating, name=name, barrier=barrier):
+                    barrier.wait()
+                    return db.set_entry_rating(name, rating)
+
+                with ThreadPoolExecutor(workers) as executor:
+                    results = list(executor.map(write, range(workers)))
+
+                assert results.count(True) == 1
+                assert db.get_entry(name).rating in range(workers)
+
+            assert len(db.get_entries()) == 3
+            assert sum(db.get_rating_histogram().values()) == 3
+            assert conexample.db.sql.stats.check_rating_counts(db) == {}
+
+    class TestSetEntriesRating:
+        def test_on_success(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+            db.set_entry_rating("flask", 3)
+
+            ret = db.set_entries_rating(
+                [("python", 5), ("flask", 4), ("python", 6), ("cassandra", 0)]
+            )
+
+            assert ret == [True, False, False, True]
+            assert {(entry.name, entry.rating) for entry in db.get_entries()} == {
+                ("python", 6),
+                ("flask", 4),
+                ("cassandra", 0),
+            }
+
+        def test_postgresql_statement(self):
+
+            statement = conexample.db.sql._postgresql_upsert(
+                [("python", 5), ("flask", 4)]
+            )
+            sql = str(statement.compile(dialect=postgresql.dialect()))
+
+            assert "ON CONFLICT (name) DO UPDATE" in sql
+            assert "RETURNING entries.name, xmax = 0" in sql
+
+        @patch("conexample.db.sql.POSTGRESQL_BULK_CHUNK", 2)
+        @patch("conexample.db.sql._postgresql_upsert")
+        def test_postgresql_writes_chunks_in_name_order(self, upsert):
+            session = Mock()
+            session.get_bind.return_value.dialect.name = "postgresql"
+            session.execute.return_value.fetchall.return_value = [("flask", True)]
+
+            created = conexample.db.sql.SQLDatabase._upsert_entries(
+                session, [("python", 5), ("flask", 4), ("cassandra", 3), ("python", 2)]
+            )
+
+            assert created == [False, True, False, False]
+            assert [call[0][0] for call in upsert.call_args_list] == [
+                [("cassandra", 3), ("flask", 4)],
+                [("python", 2)],
+            ]
+
     class TestGetEntry:
         def test_on_success(self, coupled_db_session):
 
@@ -172,5 +455,562 @@ class TestCalls:
             ret = db.get_entries()
 
             for entry in ret:
+                assert isinstance(entry, conexample.interface.EntryRecord)
                 assert {"name": entry.name, "rating": entry.rating} in entries
             assert len(ret) == len(entries)
+
+        def test_pagination(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            for name in ("python", "flask", "cassandra", "django", "mongo"):
+                db.set_entry_rating(name, 3)
+
+            pages = [
+                [entry.name for entry in db.get_entries(limit=2, after=after)]
+                for after in (None, "django", "mongo", "python")
+            ]
+
+            assert pages == [
+                ["cassandra", "django"],
+                ["flask", "mongo"],
+                ["python"],
+                [],
+            ]
+
+    class TestGetTopEntries:
+        def test_on_empty_db(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            assert db.get_top_entries(10) == []
+
+        def test_on_success(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            for name, rating in (
+                ("cassandra", 0),
+                ("python", 5),
+                ("flask", 4),
+                ("django", 5),
+            ):
+                db.set_entry_rating(name, rating)
+
+            assert db.get_top_entries(3) == [
+                conexample.interface.EntryRecord("django", 5),
+                conexample.interface.EntryRecord("python", 5),
+                conexample.interface.EntryRecord("flask", 4),
+            ]
+
+        def test_reads_rating_index(self, coupled_db_session):
+
+            plan = coupled_db_session.execute(
+                "EXPLAIN QUERY PLAN SELECT name, rating FROM entries "
+                "ORDER BY rating DESC, name LIMIT 10"
+            ).fetchall()
+
+            assert "ix_entries_rating_name" in str(plan)
+            assert "TEMP B-TREE" not in str(plan)
+
+    class TestGetRatingHistogram:
+        def test_on_empty_db(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            assert db.get_rating_histogram() == {}
+
+        def test_maintained_by_writes(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            db.set_entry_rating("python", 5)
+            db.set_entry_rating("flask", 5)
+            assert db.get_rating_histogram() == {5: 2}
+
+            db.set_entry_rating("python", 3)
+            db.set_entry_rating("python", 3)
+            assert db.get_rating_histogram() == {3: 1, 5: 1}
+
+            db.set_entries_rating(
+                [("flask", 4), ("cassandra", 1), ("flask", 3), ("python", 1)]
+            )
+            assert db.get_rating_histogram() == {1: 2, 3: 1}
+
+            db.delete_entry("cassandra")
+            db.delete_entry("cassandra")
+            assert db.get_rating_histogram() == {1: 1, 3: 1}
+
+            assert conexample.db.sql.stats.check_rating_counts(db) == {}
+
+        def test_retries_write_of_concurrently_created_entry(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+            db.set_entry_rating("python", 5)
+
+            # The entry appears missing to the first attempt, as if it was created concurrently
+            with patch.object(
+                conexample.db.sql.SQLDatabase,
+                "_lock_ratings",
+                side_effect=[{}, {"python": 5}],
+            ) as lock_ratings:
+                assert not db.set_entry_rating("python", 3)
+
+            assert lock_ratings.call_count == 2
+            assert db.get_entry("python").rating == 3
+            assert db.get_rating_histogram() == {3: 1}
+
+        def test_gives_up_on_repeated_concurrent_creations(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+            db.set_entry_rating("python", 5)
+
+            with patch.object(
+                conexample.db.sql.SQLDatabase, "_lock_ratings", return_value={}
+            ):
+                with pytest.raises(conexample.interface.DatabaseException):
+                    db.set_entry_rating("python", 3)
+
+            assert db.get_rating_histogram() == {5: 1}
+
+    class TestCheckRatingCounts:
+        def test_reports_and_repairs_differences(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+            db.set_entries_rating([("python", 5), ("flask", 4), ("django", 4)])
+
+            table = conexample.db.sql.models.RatingCount.__table__
+            coupled_db_session.execute(
+                table.update().where(table.c.rating == 4).values(count=7)
+            )
+            coupled_db_session.execute(table.insert().values(rating=9, count=1))
+
+            differences = {4: (7, 2), 9: (1, 0)}
+            assert conexample.db.sql.stats.check_rating_counts(db) == differences
+            assert (
+                conexample.db.sql.stats.check_rating_counts(db, repair=True)
+                == differences
+            )
+            assert conexample.db.sql.stats.check_rating_counts(db) == {}
+            assert db.get_rating_histogram() == {4: 2, 5: 1}
+
+        def test_command_fails_on_differences(self, coupled_db_session, capsys):
+
+            table = conexample.db.sql.models.RatingCount.__table__
+            coupled_db_session.execute(table.insert().values(rating=9, count=1))
+
+            with patch("sys.argv", ["stats"]):
+                with pytest.raises(SystemExit):
+                    conexample.db.sql.stats.main()
+
+            assert capsys.readouterr().out == "rating 9: stored 1, recomputed 0\n"
+
+    class TestGetEntriesVersion:
+        def test_on_empty_db(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            assert db.get_entries_version() == 0
+
+        def test_changes_on_modifications(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+            versions = [db.get_entries_version()]
+
+            for modify in (
+                lambda: db.set_entry_rating("python", 5),
+                lambda: db.set_entry_rating("python", 4),
+                lambda: db.set_entries_rating([("flask", 4), ("python", 3)]),
+                lambda: db.delete_entry("python"),
+            ):
+                modify()
+                versions.append(db.get_entries_version())
+
+            assert len(set(versions)) == len(versions)
+
+            db.delete_entry("python")
+            db.get_entries()
+            assert db.get_entries_version() == versions[-1]
+
+    class TestIterEntries:
+        def test_on_success(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            for name in ("python", "flask", "cassandra"):
+                db.set_entry_rating(name, 3)
+
+            assert [entry.name for entry in db.iter_entries()] == [
+                "cassandra",
+                "flask",
+                "python",
+            ]
+            assert [entry.name for entry in db.iter_entries(after="cassandra")] == [
+                "flask",
+                "python",
+            ]
+
+        @patch("conexample.db.sql.STREAM_BATCH_SIZE", 2)
+        def test_releases_session_on_close(self, coupled_db_session):
+
+            db = conexample.db.sql.SQLDatabase()
+
+            for name in ("python", "flask", "cassandra"):
+                db.set_entry_rating(name, 3)
+
+            entries = db.iter_entries()
+            next(entries)
+
+            with patch.object(db.session_maker.registry(), "close") as close:
+                entries.close()
+
+            assert close.called
+
+
+class TestCachedDatabase:
+    def test_serves_entry_from_cache(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        assert cached.get_entry("python") is db.get_entry.return_value
+        assert cached.get_entry("python") is db.get_entry.return_value
+
+        db.get_entry.assert_called_once_with("python")
+        assert cached.stats["entries"].hits == 1
+        assert cached.stats["entries"].misses == 1
+
+    def test_does_not_cache_missing_entries(self, db):
+        db.get_entry.side_effect = conexample.interface.DatabaseEntryNotFound
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        for _ in range(2):
+            with pytest.raises(conexample.interface.DatabaseEntryNotFound):
+                cached.get_entry("python")
+
+        assert db.get_entry.call_count == 2
+
+    def test_serves_entries_from_cache(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        assert len(cached.get_entries()) == len(db.get_entries.return_value)
+        assert len(cached.get_entries()) == len(db.get_entries.return_value)
+
+        db.get_entries.assert_called_once_with(limit=None, after=None)
+
+    def test_caches_entries_pages_separately(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        cached.get_entries(limit=2)
+        cached.get_entries(limit=2, after="python")
+        cached.get_entries(limit=2)
+
+        assert db.get_entries.call_count == 2
+
+    @pytest.mark.parametrize(
+        "call",
+        (
+            lambda db: db.set_entry_rating("python", 4),
+            lambda db: db.delete_entry("python"),
+        ),
+    )
+    def test_invalidates_on_write(self, db, call):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        cached.get_entry("python")
+        cached.get_entries()
+        call(cached)
+        cached.get_entry("python")
+        cached.get_entries()
+
+        assert db.get_entry.call_count == 2
+        assert db.get_entries.call_count == 2
+
+    def test_caches_entries_version(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        assert cached.get_entries_version() == db.get_entries_version.return_value
+        assert cached.get_entries_version() == db.get_entries_version.return_value
+        cached.delete_entry("python")
+        cached.get_entries_version()
+
+        assert db.get_entries_version.call_count == 2
+
+    def test_caches_top_entries(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        assert cached.get_top_entries(1) == cached.get_top_entries(1)
+        cached.get_top_entries(2)
+        cached.set_entry_rating("python", 4)
+        cached.get_top_entries(1)
+
+        assert db.get_top_entries.call_count == 3
+
+    def test_caches_rating_histogram(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        assert cached.get_rating_histogram() == db.get_rating_histogram.return_value
+        cached.get_rating_histogram()
+        cached.delete_entry("python")
+        cached.get_rating_histogram()
+
+        assert db.get_rating_histogram.call_count == 2
+
+    def test_does_not_cache_streamed_entries(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        for _ in range(2):
+            assert len(list(cached.iter_entries(after="flask"))) == 2
+
+        assert db.iter_entries.call_count == 2
+
+    def test_invalidates_on_batch_write(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        cached.get_entry("python")
+        cached.get_entry("flask")
+        assert cached.set_entries_rating(iter([("python", 4)])) == [True]
+        db.set_entries_rating.assert_called_once_with([("python", 4)])
+        cached.get_entry("python")
+        cached.get_entry("flask")
+
+        assert db.get_entry.call_count == 3
+
+    def test_invalidates_on_failed_write(self, db):
+        db.set_entry_rating.side_effect = conexample.interface.DatabaseException
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        cached.get_entry("python")
+        with pytest.raises(conexample.interface.DatabaseException):
+            cached.set_entry_rating("python", 4)
+        cached.get_entry("python")
+
+        assert db.get_entry.call_count == 2
+
+    def test_evicts_least_recently_used(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=2, ttl=60)
+
+        for name in ("python", "flask", "python", "cassandra", "python", "flask"):
+            cached.get_entry(name)
+
+        assert db.get_entry.call_count == 4
+        assert cached.stats["entries"].evictions == 2
+        assert cached.stats["entries"].size == 2
+
+    @patch("conexample.cache.monotonic")
+    def test_expires_entries(self, monotonic, db):
+        monotonic.return_value = 100
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=5)
+
+        cached.get_entry("python")
+        monotonic.return_value = 104
+        cached.get_entry("python")
+        monotonic.return_value = 105
+        cached.get_entry("python")
+
+        assert db.get_entry.call_count == 2
+        assert cached.stats["entries"].expirations == 1
+
+    def test_does_not_cache_value_loaded_before_invalidation(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+        stale = db.get_entry.return_value
+
+        def concurrent_write(name):
+            # Another thread writes while the stale row is being loaded
+            cached.set_entry_rating(name, 4)
+            return stale
+
+        db.get_entry.side_effect = concurrent_write
+        assert cached.get_entry("python") is stale
+        db.get_entry.side_effect = None
+        cached.get_entry("python")
+
+        assert db.get_entry.call_count == 2
+
+    @pytest.mark.parametrize("size, ttl", ((0, 60), (10, 0)))
+    def test_zero_parameters_disable_cache(self, db, size, ttl):
+        cached = conexample.db.cache.CachedDatabase(db, size=size, ttl=ttl)
+
+        for _ in range(2):
+            cached.get_entry("python")
+            cached.get_entries()
+
+        assert db.get_entry.call_count == 2
+        assert db.get_entries.call_count == 2
+
+    @patch("conexample.cache.monotonic")
+    def test_drops_listings_older_than_loaded_version(self, monotonic, db):
+        monotonic.return_value = 100
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=5)
+
+        cached.get_entries_version()
+        monotonic.return_value = 102
+        cached.get_entries()
+
+        # Version expires before the listing and a write of another process is observed
+        db.get_entries_version.return_value = 2
+        monotonic.return_value = 105
+        assert cached.get_entries_version() == 2
+        cached.get_entries()
+
+        assert db.get_entries.call_count == 2
+
+    def test_takes_parameters_from_settings(self, db, test_config):
+        test_config["DATABASE_CACHE_SIZE"] = "1"
+        test_config["DATABASE_CACHE_TTL"] = "60"
+        cached = conexample.db.cache.CachedDatabase(db)
+
+        cached.get_entry("python")
+        cached.get_entry("flask")
+        cached.get_entry("flask")
+
+        assert db.get_entry.call_count == 2
+        assert cached.stats["entries"].evictions == 1
+
+    def test_warm_up_caches_hot_entries(self, db):
+        cached = conexample.db.cache.CachedDatabase(db, size=10, ttl=60)
+
+        cached.warm_up(3, 2)
+        cached.get_entry("python")
+        cached.get_entry("cassandra")
+
+        db.warm_up.assert_called_once_with(3, 0)
+        db.get_top_entries.assert_called_once_with(2)
+        assert db.get_entry.call_count == 2
+
+
+class TestBatchingDatabase:
+    @staticmethod
+    def _write_concurrently(batching, entries):
+        with ThreadPoolExecutor(max_workers=len(entries)) as executor:
+            return list(
+                executor.map(lambda entry: batching.set_entry_rating(*entry), entries)
+            )
+
+    def test_commits_concurrent_writes_together(self, db):
+        db.set_entries_rating.side_effect = lambda entries: [
+            name == "python" for name, _ in entries
+        ]
+        batching = conexample.db.batch.BatchingDatabase(db, size=4, delay=60)
+        entries = [("python", 5), ("flask", 4), ("cassandra", 3), ("sqlalchemy", 2)]
+
+        assert self._write_concurrently(batching, entries) == [
+            True,
+            False,
+            False,
+            False,
+        ]
+
+        db.set_entries_rating.assert_called_once()
+        assert sorted(db.set_entries_rating.call_args[0][0]) == sorted(entries)
+        assert batching.stats == conexample.db.batch.BatchStats(batches=1, writes=4)
+
+    def test_flushes_after_delay(self, db):
+        db.set_entries_rating.return_value = [True]
+        batching = conexample.db.batch.BatchingDatabase(db, size=100, delay=0.01)
+
+        assert batching.set_entry_rating("python", 5) is True
+        assert batching.set_entry_rating("python", 4) is True
+
+        assert db.set_entries_rating.call_count == 2
+        assert batching.stats.writes == 2
+
+    def test_last_queued_write_wins(self, file_db_engine):
+        database = conexample.db.sql.SQLDatabase()
+        batching = conexample.db.batch.BatchingDatabase(database, size=2, delay=60)
+        first, second = Future(), Future()
+
+        # Both writes are queued before the flusher may complete the batch
+        pending = batching._pending()
+        pending.put(("python", 5, first))
+        pending.put(("python", 4, second))
+
+        assert first.result(timeout=10) is True
+        assert second.result(timeout=10) is False
+        assert database.get_entry("python").rating == 4
+        assert database.get_entries_version() == 1
+
+    def test_survives_mismatched_results(self, db):
+        db.set_entries_rating.side_effect = [[], [True]]
+        batching = conexample.db.batch.BatchingDatabase(db, size=1, delay=0)
+
+        with pytest.raises(conexample.interface.DatabaseException):
+            batching.set_entry_rating("python", 5)
+        assert batching.set_entry_rating("python", 5) is True
+
+    def test_raises_batch_failure_to_all_callers(self, db):
+        db.set_entries_rating.side_effect = (
+            conexample.interface.DatabaseStorageUnavailable
+        )
+        batching = conexample.db.batch.BatchingDatabase(db, size=2, delay=60)
+
+        with pytest.raises(conexample.interface.DatabaseStorageUnavailable):
+            self._write_concurrently(batching, [("python", 5), ("flask", 4)])
+
+        db.set_entries_rating.assert_called_once()
+        assert batching.stats.batches == 0
+
+    def test_passes_other_calls(self, db):
+        batching = conexample.db.batch.BatchingDatabase(db, size=2, delay=60)
+
+        assert batching.get_entry("python") is db.get_entry.return_value
+        assert batching.set_entries_rating([("python", 4)]) == [True]
+        assert batching.delete_entry("python") is db.delete_entry.return_value
+        assert len(batching.get_entries(limit=2)) == len(db.get_entries.return_value)
+        assert len(batching.get_top_entries(1)) == 1
+        assert batching.get_rating_histogram() == {1: 1, 5: 1}
+        assert len(list(batching.iter_entries(after="flask"))) == 2
+
+        db.set_entry_rating.assert_not_called()
+
+    def test_takes_parameters_from_settings(self, db, test_config):
+        test_config["DATABASE_BATCH_SIZE"] = "16"
+        test_config["DATABASE_BATCH_DELAY"] = "0.5"
+        batching = conexample.db.batch.BatchingDatabase(db)
+
+        assert batching.size == 16
+        assert batching.delay == 0.5
+
+
+class TestAsyncSQLDatabase:
+    def test_offloads_calls(self, file_db_engine):
+        db = conexample.db.sql.aio.AsyncSQLDatabase()
+
+        async def scenario():
+            assert await db.set_entry_rating("python", 5)
+            assert await db.set_entries_rating([("python", 4), ("flask", 3)]) == [
+                False,
+                True,
+            ]
+            assert (await db.get_entry("python")).rating == 4
+            assert await db.get_top_entries(1) == [("python", 4)]
+            assert await db.get_rating_histogram() == {3: 1, 4: 1}
+            assert await db.get_entries_version() == 2
+            assert await db.delete_entry("flask")
+
+            with pytest.raises(conexample.interface.DatabaseEntryNotFound):
+                await db.get_entry("flask")
+
+        asyncio.run(scenario())
+
+    @patch("conexample.db.sql.aio.STREAM_BATCH_SIZE", 2)
+    def test_iter_entries_in_pages(self, file_db_engine):
+        db = conexample.db.sql.aio.AsyncSQLDatabase()
+        get_entries = db.database.get_entries = Mock(
+            side_effect=db.database.get_entries
+        )
+
+        async def collect(after=None):
+            return [entry.name async for entry in db.iter_entries(after=after)]
+
+        for name in ("python", "flask", "cassandra"):
+            db.database.set_entry_rating(name, 3)
+
+        assert asyncio.run(collect()) == ["cassandra", "flask", "python"]
+        assert get_entries.call_count == 2
+        assert asyncio.run(collect(after="flask")) == ["python"]
+
+    def test_executor_size_follows_pool_limits(self, test_config, db):
+        test_config["DATABASE_SQL_CONNECTION_POOL"] = "3"
+        test_config["DATABASE_SQL_POOL_OVERFLOW"] = "2"
+
+        db = conexample.db.sql.aio.AsyncSQLDatabase(db)
+        assert db._executor._max_workers == 5
@@ -1,5 +1,11 @@
 import logging
+import os
+import random
+import re
 import socket
+import subprocess
+import sys
+from collections import Counter
 from multiprocessing import Process
 from textwrap import dedent
 from time import sleep
@@ -8,10 +14,18 @@ from unittest.mock import patch
 import pytest
 
 import conexample.application
+import conexample.db.batch
+import conexample.db.cache
 import conexample.entrypoint
+import conexample.importtime
+import conexample.load
+import conexample.metrics
 
 SUBPROCESS_WAIT = 3
 
+# Maximum cold start import time of conexample.application, in milliseconds
+IMPORT_BUDGET = 250
+
 
 def _port_in_use(port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -68,6 +82,23 @@ class TestIntegration:
         response = stateful_api_client.delete("/v1/entry/cassandra")
         assert response.status_code == 404
 
+        # Step 9. To save some time, he imports the rest of his notes at once. Still, some of his
+        # old mistakes are not welcome here.
+        response = stateful_api_client.post(
+            "/v1/batch/entry",
+            json=[
+                {"name": "python", "rating": 6},
+                {"name": "django", "rating": 4},
+                {"name": "cassandra", "rating": 5},
+            ],
+        )
+        assert response.status_code == 200
+        assert [result["status"] for result in response.json] == [
+            "updated",
+            "created",
+            "rejected",
+        ]
+
 
 class TestEntrypoints:
     def test_fall_back_on_invalid_logging_level(self):
@@ -102,6 +133,97 @@ class TestEntrypoints:
         finally:
             app.stop()
 
+    @patch("conexample.application.Db")
+    @patch("conexample.application.Core")
+    @patch("conexample.application.Api")
+    def test_prepare_enables_database_cache(self, api, core, db, test_config):
+
+        test_config["DATABASE_CACHE_SIZE"] = "100"
+
+        app = conexample.application.ConnexionExample()
+        app.prepare()
+
+        assert isinstance(app.database, conexample.db.cache.CachedDatabase)
+        assert app.database.database is db.return_value
+        core.assert_called_with(database=app.database)
+
+    @patch("conexample.application.Db")
+    @patch("conexample.application.Core")
+    @patch("conexample.application.Api")
+    def test_prepare_enables_write_batching(self, api, core, db, test_config):
+
+        test_config["DATABASE_BATCH_SIZE"] = "32"
+        test_config["DATABASE_CACHE_SIZE"] = "100"
+
+        app = conexample.application.ConnexionExample()
+        app.prepare()
+
+        assert isinstance(app.database, conexample.db.cache.CachedDatabase)
+        assert isinstance(app.database.database, conexample.db.batch.BatchingDatabase)
+        assert app.database.database.database is db.return_value
+        assert app.database.database.size == 32
+
+    @patch("conexample.application.Db")
+    @patch("conexample.application.Core")
+    @patch("conexample.application.Api")
+    def test_prepare_loads_search_index(self, api, core, db, test_config):
+
+        core.return_value.load_search_index.side_effect = (
+            conexample.interface.CoreInternalError
+        )
+
+        app = conexample.application.ConnexionExample()
+        app.prepare()
+        core.return_value.load_search_index.assert_called_once_with()
+
+        test_config["CORE_SEARCH_INDEX_PRELOAD"] = "false"
+        app.prepare()
+        core.return_value.load_search_index.assert_called_once_with()
+
+    @patch("conexample.application.Db")
+    @patch("conexample.application.Core")
+    @patch("conexample.application.Api")
+    def test_prepare_warms_up(self, api, core, db, test_config):
+
+        test_config["DATABASE_WARMUP_CONNECTIONS"] = "4"
+        test_config["DATABASE_WARMUP_HOT_ENTRIES"] = "100"
+
+        app = conexample.application.ConnexionExample()
+        app.prepare(warm_up=False)
+
+        assert not core.return_value.warm_up.called
+
+        core.return_value.warm_up.side_effect = conexample.interface.CoreInternalError
+        app.warm_up()
+
+        # Failed warm-up leaves the connections to be opened on demand
+        core.return_value.warm_up.assert_called_once_with(4, 100)
+        assert api.return_value.ready is True
+
+    @patch("conexample.application.engine_dispose")
+    @patch("conexample.application.Db")
+    @patch("conexample.application.Core")
+    @patch("conexample.application.Api")
+    def test_post_fork_warms_up(self, api, core, db, engine_dispose, test_config):
+
+        test_config["DATABASE_WARMUP_CONNECTIONS"] = "4"
+
+        app = conexample.application.ConnexionExample()
+        app.prepare(warm_up=False)
+        app.post_fork()
+
+        engine_dispose.assert_called_once_with()
+        core.return_value.warm_up.assert_called_once_with(4, 0)
+        assert api.return_value.ready is True
+
+    @patch("conexample.application.engine_dispose")
+    def test_post_fork_disposes_engine(self, engine_dispose, test_config):
+
+        app = conexample.application.ConnexionExample()
+        app.post_fork()
+
+        engine_dispose.assert_called_once_with()
+
     def test_entrypoint_exits_clearly(self, test_config):
 
         proc = Process(target=conexample.entrypoint.run_dev)
@@ -127,6 +249,89 @@ class TestEntrypoints:
         import conexample.wsgi.api.rest
 
 
+class TestImportTime:
+    def test_application_imports_layers_lazily(self):
+
+        records = conexample.importtime.measure("conexample.application", repeat=3)
+        packages = conexample.importtime.by_package(records)
+
+        assert records[-1].name == "conexample.application"
+        assert not {"connexion", "flask", "sqlalchemy", "prometheus_client"} & set(
+            packages
+        )
+        assert conexample.importtime.total(records) < IMPORT_BUDGET * 1000
+
+    def test_resolves_lazily_imported_names(self):
+
+        import conexample.db.sql
+
+        assert conexample.application.Db is conexample.db.sql.SQLDatabase
+
+        with pytest.raises(AttributeError):
+            conexample.application.Database
+
+
+class TestMetrics:
+    def test_aggregates_metrics_of_processes(self, tmp_path):
+        directory = tmp_path / "metrics"
+        directory.mkdir()
+
+        script = dedent(
+            """\
+            import conexample.db.sql.db
+            engine = conexample.db.sql.db.create_engine(
+                uri="sqlite://", database="multiprocess-test"
+            )
+            engine.connect().close()
+            """
+        )
+
+        for _ in range(2):
+            subprocess.run(
+                [sys.executable, "-c", script],
+                env=dict(os.environ, METRICS_MULTIPROC_DIR=str(directory)),
+                check=True,
+            )
+
+        with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(directory)}):
+            _, body = conexample.metrics.exposition()
+
+        assert (
+            b'conexample_db_pool_checkouts_total{database="multiprocess-test"} 2.0'
+            in body
+        )
+
+
+class TestLoad:
+    def test_zipf_keys_favor_hot_keys(self):
+
+        keys = conexample.load.Keys(1000, "zipf", exponent=1.2, name_length=8)
+        generator = random.Random(0)
+        drawn = Counter(keys.draw(generator) for _ in range(10000))
+
+        assert drawn[0] > drawn[1] > drawn[10] > drawn.get(999, 0)
+        assert keys.name(42) == "k0000042"
+
+    def test_rejects_unknown_operation(self):
+
+        with pytest.raises(ValueError):
+            conexample.load.parse_mix("get=1,truncate=1")
+
+    @pytest.mark.parametrize("mode", ["threads", "asyncio"])
+    def test_reports_load(self, served_api, mode, capsys):
+
+        conexample.load.main(
+            ["--url", served_api, "--mode", mode, "--duration", "0.5"]
+            + ["--concurrency", "2", "--keys", "50", "--prefill", "--seed", "1"]
+            + ["--mix", "get=2,set=1,batch=1,list=1,top=1,search=1"]
+        )
+
+        output = capsys.readouterr().out
+        assert " 0 errors " in output
+        assert "latency [ms]" in output
+        assert re.search(r"^ +200 +\d+", output, re.MULTILINE)
+
+
 class TestPackage:
     def test_dev_app_starts(self, venv_call, test_config):
 